@@ -1,25 +1,32 @@
+import os
+import sys
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from changepoint import detect_breakpoints, load_frozen_area
+from figure_service import configure_fonts, plt
+
 # 设置中文字体
-plt.rcParams["font.family"] = ["SimHei", "Microsoft YaHei"]
-plt.rcParams["axes.unicode_minus"] = False  # 正确显示负号
+configure_fonts(("SimHei", "Microsoft YaHei"))
+
+# 1. 准备数据：由面积统计表自动分段，计算各段年均退化速率与加速点
+
+analysis_dir = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\analysis"
+area_df = load_frozen_area(os.path.join(analysis_dir, "冻土面积统计.csv"))  # frozen_trend61-20.py 的输出
+result = detect_breakpoints(area_df, x_col="end_year", y_col="frozen_area_km2", method="pelt")
+segments = result["segments"]
 
-# 1. 准备数据（基于之前的分段结果）
 data = {
-    "阶段": [
-        "1961-1970", "1971-1980", "1981-1990",
-        "1991-2000", "2001-2010", "2011-2020"
-    ],
-    "年平均退化速率（km²/年）": [
-        -19.4, -30.2, -224.9,
-        107.5, -1073.1, -781.0
-    ],
-    "加速点标注年份": [None, None, None, None, 2000, 2015]  # 加速点对应的年份
+    "阶段": [f"{int(a)}-{int(b)}" for a, b in zip(segments["start_year"], segments["end_year"])],
+    "年平均退化速率（km²/年）": segments["rate_km2_per_year"].round(1).tolist(),
+    # 速率绝对值较上一段增大的分段，以其起始年份作为加速点
+    "加速点标注年份": [int(y) if acc else None for y, acc in zip(segments["start_year"], segments["accelerated"])]
 }
 
 df = pd.DataFrame(data)
+print(f"突变点年份: {result['breakpoints']} | Pettitt突变年份: {result['pettitt']['change_year']} "
+      f"(P={result['pettitt']['p_value']:.4f})")
 
 # 2. 创建图表
 plt.figure(figsize=(12, 6))
@@ -34,10 +41,10 @@ bars = plt.bar(
 
 # 3. 标注加速点
 for i, (rate, year) in enumerate(zip(df["年平均退化速率（km²/年）"], df["加速点标注年份"])):
-    if year is not None:
+    if pd.notna(year):
         # 箭头指向对应柱子，标注年份和速率
         plt.annotate(
-            f"加速点（{year}年）\n速率: {rate:.1f} km²/年",
+            f"加速点（{int(year)}年）\n速率: {rate:.1f} km²/年",
             xy=(i, rate),
             xytext=(i+0.5, rate-500 if rate < 0 else rate+500),
             arrowprops=dict(facecolor="red", shrink=0.05, width=2),
@@ -69,5 +76,4 @@ plt.tight_layout()
 output_path = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\picture\冻土退化速率分段对比.png"
 plt.savefig(output_path, dpi=300, bbox_inches="tight")
 print(f"图表已保存至: {output_path}")
-
-plt.show()
\ No newline at end of file
+plt.close()
\ No newline at end of file
@@ -0,0 +1,167 @@
+import os
+import sys
+import numpy as np
+import rasterio
+from glob import glob
+from rasterio.windows import Window
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from raster_io import with_gdal_env, write_profile
+from tracing import span, traced
+
+DEGRADATION_NODATA = 255  # uint8 输出统一的nodata值
+
+
+def period_label(path):
+    """从文件名提取时段标签，如 fused_1961_1965_TTOP.tif → 1961_1965"""
+    return os.path.basename(path).replace("fused_", "").replace("_TTOP.tif", "")
+
+
+def _open_outputs(output_folder, labels, meta, outputs):
+    """按需创建全部输出栅格，返回 {输出名: [数据集, ...]}"""
+    dsts = {}
+    if "adjacent" in outputs:
+        dsts["adjacent"] = [
+            rasterio.open(os.path.join(output_folder, f"degradation_{labels[i]}_{labels[i + 1]}.tif"), "w", **meta)
+            for i in range(len(labels) - 1)
+        ]
+    if "baseline" in outputs:
+        dsts["baseline"] = [
+            rasterio.open(os.path.join(output_folder, f"baseline_degradation_{labels[i]}.tif"), "w", **meta)
+            for i in range(1, len(labels))
+        ]
+    for name, file_name in [("total", "total_degradation.tif"),
+                            ("first_degradation", "first_degradation_period.tif"),
+                            ("first_aggradation", "first_aggradation_period.tif")]:
+        if name in outputs:
+            dsts[name] = [rasterio.open(os.path.join(output_folder, file_name), "w", **meta)]
+    return dsts
+
+
+def degradation_block(stack, invalid):
+    """
+    对一个数据块计算全部退化结果
+
+    :param stack: (期数, 行, 列) uint8 数组，1=冻土，0=非冻土
+    :param invalid: (期数, 行, 列) 布尔数组，True 表示该期为nodata
+    :return: {输出名: [(行, 列) uint8 数组, ...]}
+    """
+    frozen = stack == 1
+    thawed = stack == 0
+
+    # 相邻时段：前期=1且后期=0 → 3，否则保留前期值（与 逐时段退化区.calculate_degradation 一致）
+    adjacent = []
+    for i in range(stack.shape[0] - 1):
+        out = stack[i].copy()
+        out[frozen[i] & thawed[i + 1]] = 3
+        out[invalid[i] | invalid[i + 1]] = DEGRADATION_NODATA
+        adjacent.append(out)
+
+    # 相对基准期：基准=1且当前期=0 → 2，否则保留当前期值（与 11期基准退化.py 一致）
+    baseline = []
+    for i in range(1, stack.shape[0]):
+        out = stack[i].copy()
+        out[frozen[0] & thawed[i]] = 2
+        out[invalid[0] | invalid[i]] = DEGRADATION_NODATA
+        baseline.append(out)
+
+    # 总退化：首期=1且末期=0 → 3，否则保留末期值（与 总退化.calculate_total_degradation 一致）
+    total = stack[-1].copy()
+    total[frozen[0] & thawed[-1]] = 3
+    total[invalid[0] | invalid[-1]] = DEGRADATION_NODATA
+
+    # 首次退化/首次恢复（0→1）发生的时段序号（1 表示第1期→第2期），0 表示从未发生
+    any_invalid = invalid.any(axis=0)
+    first_periods = []
+    for events in (frozen[:-1] & thawed[1:], thawed[:-1] & frozen[1:]):
+        first = np.where(events.any(axis=0), events.argmax(axis=0) + 1, 0).astype(np.uint8)
+        first[any_invalid] = DEGRADATION_NODATA
+        first_periods.append(first)
+
+    return {
+        "adjacent": adjacent,
+        "baseline": baseline,
+        "total": [total],
+        "first_degradation": [first_periods[0]],
+        "first_aggradation": [first_periods[1]]
+    }
+
+
+@traced("degradation.engine")
+@with_gdal_env
+def run_degradation_engine(input_folder, output_folder, block_rows=512,
+                           outputs=("adjacent", "baseline", "total", "first_degradation", "first_aggradation"),
+                           profile="class-uint8-fast"):
+    """
+    多期冻土退化一体化计算：按块流式读取全部时段，一次读取同时输出
+    逐时段退化、相对基准期退化、总退化、首次退化时段和首次恢复时段栅格
+
+    :param input_folder: 包含 fused_*.tif 多期冻土数据的文件夹
+    :param output_folder: 输出文件夹
+    :param block_rows: 每次读取的行数（整行条带，与输出分块高度对齐）
+    :param outputs: 需要输出的结果类型
+    :param profile: 输出写出配置（见 raster_io.WRITE_PROFILES）
+    :return: 输出文件路径列表
+    """
+    raster_paths = sorted(glob(os.path.join(input_folder, "fused_*.tif")))
+    if len(raster_paths) < 2:
+        raise ValueError("输入文件夹中至少需要两期栅格数据")
+
+    os.makedirs(output_folder, exist_ok=True)
+    labels = [period_label(p) for p in raster_paths]
+
+    sources = [rasterio.open(p) for p in raster_paths]
+    dsts = {}
+    try:
+        # 网格一致性只检查一次
+        ref = sources[0]
+        for src, label in zip(sources[1:], labels[1:]):
+            assert src.shape == ref.shape, f"{label} 与基准数据形状不一致"
+            assert src.transform == ref.transform, f"{label} 与基准数据地理变换不一致"
+            assert src.crs == ref.crs, f"{label} 与基准数据坐标系不一致"
+
+        meta = write_profile(ref.meta, profile, count=1, dtype="uint8", nodata=DEGRADATION_NODATA)
+        dsts = _open_outputs(output_folder, labels, meta, outputs)
+
+        for row in range(0, ref.height, block_rows):
+            window = Window(0, row, ref.width, min(block_rows, ref.height - row))
+
+            stack = np.empty((len(sources), int(window.height), ref.width), dtype=np.uint8)
+            invalid = np.zeros(stack.shape, dtype=bool)
+            for i, src in enumerate(sources):
+                data = src.read(1, window=window)
+                if src.nodata is not None:
+                    invalid[i] = data == src.nodata
+                if np.issubdtype(data.dtype, np.floating):
+                    invalid[i] |= ~np.isfinite(data)
+                # 冻土数据只有0/1，其余值统一视为nodata
+                invalid[i] |= (data != 0) & (data != 1)
+                stack[i] = np.where(invalid[i], DEGRADATION_NODATA, data)
+
+            with span("degradation.engine.block", row=row, bytes_read=stack.nbytes):
+                results = degradation_block(stack, invalid)
+                for name, datasets in dsts.items():
+                    for dst, block in zip(datasets, results[name]):
+                        dst.write(block, 1, window=window)
+
+            print(f"\r退化计算进度: {min(row + block_rows, ref.height) / ref.height:.1%}", end="")
+        print()
+    finally:
+        for src in sources:
+            src.close()
+        for datasets in dsts.values():
+            for dst in datasets:
+                dst.close()
+
+    output_paths = [dst.name for datasets in dsts.values() for dst in datasets]
+    print(f"共输出 {len(output_paths)} 个退化结果栅格至: {output_folder}")
+    return output_paths
+
+
+if __name__ == "__main__":
+    # 输入文件夹，包含 12 期冻土数据
+    input_folder = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\result1"
+    # 输出文件夹
+    output_folder = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\degradation_engine"
+
+    run_degradation_engine(input_folder, output_folder)
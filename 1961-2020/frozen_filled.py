@@ -1,56 +1,53 @@
-import rasterio
 import numpy as np
 import os
+import sys
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from block_executor import check_grid, map_blocks
 
-def con_single_base(frozen_path, base_path, output_path):
+
+def fill_block(frozen, base):
+    """冻土 NoData（掩膜）→ 取基础栅格值；否则取冻土值"""
+    return np.where(np.ma.getmaskarray(frozen), base.data, frozen.data)
+
+
+def con_single_base(frozen_path, base_path, output_path, num_workers=None):
     """
     单基础栅格与单期冻土栅格融合：
     冻土 NoData → 取基础栅格值；否则取冻土值
     :param frozen_path: 单期冻土栅格路径（含 NoData）
     :param base_path: 唯一基础栅格路径（覆盖全区）
     :param output_path: 输出融合结果路径
+    :param num_workers: 并行进程数（默认 CPU 核数）
     """
-    with rasterio.open(frozen_path) as frozen_ds, \
-            rasterio.open(base_path) as base_ds:
-        # 检查空间参考、像元大小（不一致则需预处理，这里简化）
-        assert frozen_ds.crs == base_ds.crs, "CRS 不匹配！"
-        assert np.allclose(frozen_ds.transform, base_ds.transform), "像元大小/变换不匹配！"
-
-        # 读取数据与掩码
-        frozen_arr = frozen_ds.read(1)
-        frozen_mask = frozen_ds.read_masks(1) == 0  # True 表示 NoData
-
-        base_arr = base_ds.read(1)
-
-        # 核心逻辑：NoData 区域填基础值，否则保留冻土值
-        output_arr = np.where(frozen_mask, base_arr, frozen_arr)
-
-        # 写入结果（复用冻土栅格的元数据）
-        profile = frozen_ds.profile
-        profile.update(dtype=output_arr.dtype, count=1)
-
-        with rasterio.open(output_path, 'w', **profile) as dst:
-            dst.write(output_arr, 1)
+    # 网格一致性由执行器统一检查；输出类型与整体读取时 np.where 的结果一致
+    frozen_meta, base_meta = check_grid([frozen_path, base_path])
+    dtype = np.result_type(frozen_meta["dtype"], base_meta["dtype"])
 
+    # 按掩膜读取（NoData 与 read_masks 一致），同时保存类别统计，冻土面积统计可直接复用
+    map_blocks(fill_block, [frozen_path, base_path], output_path, output_meta={"dtype": dtype.name},
+               num_workers=num_workers, masked=True, stats=True)
 
-# 批量处理配置
-frozen_dir = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\TTOP_albers_1km_alignedd"  # 多期冻土栅格文件夹
-base_path = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\zero.tif"  # 唯一基础栅格
-output_dir = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\result"  # 输出文件夹
 
-os.makedirs(output_dir, exist_ok=True)
+def batch_con_single_base(frozen_dir, base_path, output_dir):
+    """遍历多期冻土栅格，逐个与基础栅格融合"""
+    os.makedirs(output_dir, exist_ok=True)
+    for frozen_name in os.listdir(frozen_dir):
+        if frozen_name.endswith(".tif"):
+            frozen_path = os.path.join(frozen_dir, frozen_name)
+            output_path = os.path.join(output_dir, f"fused_{frozen_name}")
 
-# 遍历多期冻土栅格，逐个与基础栅格融合
-for frozen_name in os.listdir(frozen_dir):
-    if frozen_name.endswith(".tif"):
-        frozen_path = os.path.join(frozen_dir, frozen_name)
-        output_path = os.path.join(output_dir, f"fused_{frozen_name}")
+            con_single_base(frozen_path, base_path, output_path)
+            print(f"已处理 {frozen_name} → 输出至 {output_path}")
 
-        con_single_base(frozen_path, base_path, output_path)
-        print(f"已处理 {frozen_name} → 输出至 {output_path}")
 
+if __name__ == "__main__":
+    # 批量处理配置
+    frozen_dir = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\TTOP_albers_1km_alignedd"  # 多期冻土栅格文件夹
+    base_path = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\zero.tif"  # 唯一基础栅格
+    output_dir = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\result"  # 输出文件夹
 
+    batch_con_single_base(frozen_dir, base_path, output_dir)
 
 
 #成功运行！！Con(IsNull("冻土栅格"), "基础栅格", "冻土栅格")
@@ -1,28 +1,40 @@
 import os
+import sys
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
 import rasterio
 from glob import glob
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from figure_service import configure_fonts, plt
+from raster_stats import load_stats
+from tracing import traced
+
 
 # --------------------------
 # 修正1：解决数值溢出与面积异常
 # --------------------------
+@traced("statistics.frozen_area", resources=False)
 def calculate_frozen_area(raster_path, cell_size=None):
+    # 写出时已保存类别直方图的栅格直接取像元数，不再整图读取
+    saved = load_stats(raster_path)
     with rasterio.open(raster_path) as src:
-        data = src.read(1)
+        if saved and saved.get("histogram") is not None:
+            min_value = saved["min"] if saved["min"] is not None else 0
+            frozen_pixels = np.uint64(saved["histogram"].get("1", 0))
+        else:
+            data = src.read(1)
+            min_value = np.min(data)
+            # 统计冻土像元数量（用uint64避免溢出）
+            frozen_pixels = np.sum(data == 1, dtype=np.uint64)  # 强制用无符号64位整数
 
         # 关键：确保冻土像元值为1（若实际值不同，需修改此处）
         # 检查数据范围，避免负值干扰
-        if np.min(data) < 0:
+        if min_value < 0:
             print(f"警告：{os.path.basename(raster_path)} 中存在负值，可能数据异常")
 
-        # 统计冻土像元数量（用uint64避免溢出）
-        frozen_pixels = np.sum(data == 1, dtype=np.uint64)  # 强制用无符号64位整数
-
         # 获取像元大小
         if cell_size is None:
             cell_size = src.res[0]
@@ -43,14 +55,14 @@ def calculate_frozen_area(raster_path, cell_size=None):
 # --------------------------
 def set_matplotlib_font():
     # 优先使用系统中已安装的中文字体（Windows常见字体）
-    plt.rcParams["font.family"] = ["SimHei", "Microsoft YaHei", "Heiti TC"]
-    plt.rcParams["axes.unicode_minus"] = False  # 正确显示负号
-    plt.rcParams["font.size"] = 10  # 调整默认字体大小
+    # 字体、负号与默认字号
+    configure_fonts()
 
 
 # --------------------------
 # 主分析函数（沿用之前逻辑，加入修正）
 # --------------------------
+@traced("statistics.frozen_trend")
 def analyze_frozen_trend(data_dir, output_dir=None, cell_size=None, prefix="fused_"):
     set_matplotlib_font()  # 应用字体设置
 
@@ -119,13 +131,14 @@ def plot_area_trend(df, output_dir):
     for x, y in zip(df['end_year'], df['frozen_area_km2']):
         plt.annotate(f'{y:.1f}', (x, y), xytext=(0, 5), textcoords='offset points', ha='center')
 
+    plt.tight_layout()
     if output_dir:
         plot_path = os.path.join(output_dir, "冻土面积变化趋势.png")
         plt.savefig(plot_path, dpi=300, bbox_inches='tight')
         print(f"趋势图已保存至: {plot_path}")
 
-    plt.tight_layout()
-    plt.show()
+    # 无界面后端下直接关闭图形，批量运行不阻塞
+    plt.close()
 
 
 def trend_analysis(df, output_dir):
@@ -1,26 +1,34 @@
-import rasterio
+import os
+import sys
 import numpy as np
 
-input_tif = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\TTOP_albers_1km_alignedd\1961_1965_TTOP.tif"
-output_tif = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\result\1961_1965_TTOP0.tif"
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from block_executor import check_grid, map_blocks
 
-with rasterio.open(input_tif) as src:
-    data = src.read(1)
-    meta = src.meta.copy()
-    nodata = src.nodata
 
+def zero_block(data, nodata=None):
+    """把所有NoData变为0，并确保只有0和1"""
     # 把所有NoData变为0
     if nodata is not None:
         data_filled = np.where(data == nodata, 0, data)
     else:
-        data_filled = data
+        data_filled = data.copy()
 
     # 确保只有0和1
     data_filled[data_filled != 1] = 0
+    return data_filled.astype('uint8')
 
-    # 修改元数据，不再设nodata
-    meta.update({'nodata': 0, 'dtype': 'uint8'})
 
-    with rasterio.open(output_tif, 'w', **meta) as dst:
-        dst.write(data_filled.astype('uint8'), 1)
-print("所有NoData已变为0，输出完成！")
\ No newline at end of file
+def nodata_to_zero(input_tif, output_tif, num_workers=None):
+    """NoData 置 0、非 1 值置 0，输出 uint8（nodata 记为 0，逐块并行）"""
+    nodata = check_grid([input_tif])[0]["nodata"]
+    map_blocks(zero_block, input_tif, output_tif, output_meta={'nodata': 0, 'dtype': 'uint8'},
+               params={"nodata": nodata}, num_workers=num_workers)
+
+
+if __name__ == "__main__":
+    input_tif = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\TTOP_albers_1km_alignedd\1961_1965_TTOP.tif"
+    output_tif = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\result\1961_1965_TTOP0.tif"
+
+    nodata_to_zero(input_tif, output_tif)
+    print("所有NoData已变为0，输出完成！")
@@ -1,14 +1,22 @@
-import rasterio
+import os
+import sys
 
-input_path = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\zero_template.tif"
-output_path = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\zero.tif"
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from block_executor import map_blocks
 
-with rasterio.open(input_path) as src:
-    data = src.read(1)
-    meta = src.meta.copy()
-    meta.update({"nodata": None})  # 不要设nodata
 
-    with rasterio.open(output_path, "w", **meta) as dst:
-        dst.write(data, 1)
+def copy_block(data):
+    return data
 
-print(f"nodata已去除，结果保存到: {output_path}")
+
+def drop_nodata(input_path, output_path, num_workers=None):
+    """原样复制像元值，输出不设 nodata（逐块并行）"""
+    map_blocks(copy_block, input_path, output_path, output_meta={"nodata": None}, num_workers=num_workers)
+
+
+if __name__ == "__main__":
+    input_path = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\zero_template.tif"
+    output_path = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\zero.tif"
+
+    drop_nodata(input_path, output_path)
+    print(f"nodata已去除，结果保存到: {output_path}")
@@ -1,9 +1,16 @@
+import os
+import sys
 import matplotlib.pyplot as plt
 import numpy as np
 
-# 假设这些是你已有的年份数据和冻土面积数据
-years = np.array([1965, 1970, 1975, 1980, 1985, 1990, 1995,2000, 2005,2010, 2015, 2020])
-frozen_area = np.array([148561.0, 148464.0, 148350.0, 148162.0, 147271.0, 145913.0, 145869.0, 146988.0, 140593.0, 136257.0, 141153.0, 128447.0])
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from changepoint import load_frozen_area
+
+# 年份和冻土面积来自 frozen_trend61-20.py 输出的面积统计表
+analysis_dir = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\analysis"
+area_df = load_frozen_area(os.path.join(analysis_dir, "冻土面积统计.csv"))
+years = area_df['end_year'].to_numpy()
+frozen_area = area_df['frozen_area_km2'].to_numpy()
 
 # 绘制原始数据
 plt.plot(years, frozen_area, marker='o', label='Frozen Area')
@@ -1,51 +1,39 @@
 import os
+import sys
 import rasterio
 import numpy as np
 from glob import glob
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from block_executor import check_grid, map_blocks
+from tracing import traced
 
-def calculate_total_degradation(t0_path, t11_path, output_path):
-    """
-    计算1961-2020年总退化区域（T0=1961年，T11=2020年）
-    输出栅格：1=冻土，0=非冻土，3=总退化区，保留原始nodata值
-    """
-    with rasterio.open(t0_path) as t0_ds, rasterio.open(t11_path) as t11_ds:
-        # 读取栅格数据
-        t0_data = t0_ds.read(1)
-        t11_data = t11_ds.read(1)
-
-        # 获取原始nodata值
-        t0_nodata = t0_ds.nodata
-        t11_nodata = t11_ds.nodata
-
-        # 确保两个栅格的形状和地理信息一致
-        assert t0_data.shape == t11_data.shape, "两个栅格数据形状不一致"
-        assert t0_ds.meta["transform"] == t11_ds.meta["transform"], "两个栅格地理变换不一致"
-        assert t0_ds.meta["crs"] == t11_ds.meta["crs"], "两个栅格坐标系不一致"
 
-        # 初始化输出数组，默认为T11的状态（0=非冻土，1=冻土）
-        # 先转换为float32，避免int32无法存储nodata的问题
-        output = t11_data.copy().astype(np.float32)
+def total_degradation_block(t0_data, t11_data, t0_nodata=None, t11_nodata=None):
+    """一个数据块的总退化：T0=1且T11=0 → 3，否则取T11的状态；任意一期为nodata时保留原始nodata值"""
+    # 先转换为float32，避免int32无法存储nodata的问题
+    output = t11_data.astype(np.float32)
+    output = np.where((t0_data == 1) & (t11_data == 0), 3, output)
+    if t0_nodata is not None:
+        output = np.where(t0_data == t0_nodata, t0_nodata, output)
+    if t11_nodata is not None:
+        output = np.where(t11_data == t11_nodata, t11_nodata, output)
+    return output
 
-        # 标记总退化区：T0=1且T11=0的区域标记为3
-        output = np.where((t0_data == 1) & (t11_data == 0), 3, output)
 
-        # 恢复原始nodata值（如果T0或T11是nodata，则输出也为nodata）
-        if t0_nodata is not None:
-            output = np.where(t0_data == t0_nodata, t0_nodata, output)
-        if t11_nodata is not None:
-            output = np.where(t11_data == t11_nodata, t11_nodata, output)
-
-        # 更新元数据：使用float32存储nodata值
-        meta = t0_ds.meta.copy()
-        meta.update(
-            dtype=rasterio.float32,  # 改用float32存储数据
-            nodata=t0_nodata  # 保持原始nodata值
-        )
+@traced("degradation.total")
+def calculate_total_degradation(t0_path, t11_path, output_path, num_workers=None):
+    """
+    计算1961-2020年总退化区域（T0=1961年，T11=2020年）
+    输出栅格：1=冻土，0=非冻土，3=总退化区，保留原始nodata值（逐块并行写出）
+    """
+    t0_meta, t11_meta = check_grid([t0_path, t11_path])
 
-        # 保存结果栅格
-        with rasterio.open(output_path, 'w', **meta) as output_ds:
-            output_ds.write(output, 1)
+    # 使用float32存储数据，保持原始nodata值
+    map_blocks(total_degradation_block, [t0_path, t11_path], output_path,
+               output_meta={"dtype": rasterio.float32, "nodata": t0_meta["nodata"]},
+               params={"t0_nodata": t0_meta["nodata"], "t11_nodata": t11_meta["nodata"]},
+               profile="float-fast", num_workers=num_workers)
 
 
 def main():
@@ -1,9 +1,12 @@
 import os
+import sys
 import rasterio
 import numpy as np
-import matplotlib.pyplot as plt
 from glob import glob
-from matplotlib.colors import ListedColormap
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from figure_service import get_boundary_norm, get_listed_cmap, plt
+from preview_render import panel_pixel_shape, read_preview
 
 
 def calculate_total_degradation(t0_path, t11_path, output_path):
@@ -54,10 +57,10 @@ def plot_and_save_result(output_data, nodata, output_fig_path):
         output_data = np.ma.masked_equal(output_data, nodata)
 
     # 自定义颜色映射：0-蓝色（非冻土）、1-白色（冻土）、3-红色（总退化区），nodata-灰色
-    colors = ['#0000FF', '#FFFFFF', '#FF0000', '#808080']
-    cmap = ListedColormap(colors)
-    bounds = [0, 1, 3, np.finfo(np.float32).max]  # 颜色分段边界
-    norm = plt.matplotlib.colors.BoundaryNorm(bounds, cmap.N)
+    colors = ('#0000FF', '#FFFFFF', '#FF0000', '#808080')
+    cmap = get_listed_cmap(colors)
+    bounds = (0, 1, 3, float(np.finfo(np.float32).max))  # 颜色分段边界
+    norm = get_boundary_norm(bounds, cmap.N)
 
     plt.figure(figsize=(10, 8))
     im = plt.imshow(output_data, cmap=cmap, norm=norm)
@@ -86,8 +89,10 @@ def main():
     t0_path = raster_paths[0]
     t11_path = raster_paths[-1]
 
-    output_data, nodata = calculate_total_degradation(t0_path, t11_path, output_raster_path)
-    plot_and_save_result(output_data, nodata, output_fig_path)
+    _, nodata = calculate_total_degradation(t0_path, t11_path, output_raster_path)
+    # 按图幅实际像素大小读取结果预览绘图，避免全分辨率数组参与渲染
+    preview = read_preview(output_raster_path, panel_pixel_shape((10, 8), 300))
+    plot_and_save_result(preview, nodata, output_fig_path)
     print(f"总退化区域栅格已保存至: {output_raster_path}")
     print(f"总退化区域可视化图片已保存至: {output_fig_path}")
 
@@ -1,9 +1,12 @@
-import rasterio
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from glob import glob
 import os
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from preview_render import panel_pixel_shape, read_previews
+
 # 1. Path configuration
 folder = r'E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\result1'
 file_list = sorted(glob(os.path.join(folder, 'fused_*.tif')))  # Sort files by filename
@@ -16,23 +19,23 @@ from matplotlib.colors import ListedColormap
 
 cmap = ListedColormap(['#e5e5e5', '#1565c0'])  # 0=gray, 1=blue, adjustable
 
-# 4. Plotting
-fig, axes = plt.subplots(nrows, ncols, figsize=(18, 10), constrained_layout=True)
+# 4. Read every period at the panel's pixel size (overviews or decimated mode reads)
+figsize = (18, 10)
+previews = read_previews(file_list, panel_pixel_shape(figsize, 100, nrows, ncols))
+
+# 5. Plotting
+fig, axes = plt.subplots(nrows, ncols, figsize=figsize, constrained_layout=True)
 
-for i, file in enumerate(file_list):
+for i, (file, data) in enumerate(zip(file_list, previews)):
     row = i // ncols
     col = i % ncols
     ax = axes[row, col]
 
-    # Open raster file
-    with rasterio.open(file) as src:
-        data = src.read(1)
-
     # Clean up NoData values and keep only 0 or 1
-    data = np.where((data == 1) | (data == 0), data, 0)
+    data = np.where((data.data == 1) & ~np.ma.getmaskarray(data), 1, 0)
 
     # Display the raster data
-    im = ax.imshow(data, cmap=cmap, vmin=0, vmax=1)
+    im = ax.imshow(data, cmap=cmap, vmin=0, vmax=1, interpolation='nearest')
 
     # Extract period (year range) from the filename
     period = os.path.basename(file).replace('fused_', '').replace('_TTOP.tif', '')
@@ -42,7 +45,7 @@ for i, file in enumerate(file_list):
     # Add a north arrow (north indicator)
     ax.annotate('N', xy=(0.95, 0.95), xycoords='axes fraction', fontsize=15, ha='center', va='center', color='black')
 
-# 5. Add colorbar (legend for 0=Non-Frozen, 1=Frozen)
+# 6. Add colorbar (legend for 0=Non-Frozen, 1=Frozen)
 fig.colorbar(im, ax=axes, orientation='horizontal', fraction=0.03, pad=0.03,
              ticks=[0, 1], label='Frozen Ground Distribution (0=Non-Frozen, 1=Frozen)')
 
@@ -1,20 +1,21 @@
+import os
+import sys
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.lines import Line2D
 
-# Input data: Periods and corresponding frozen area values
-years = np.array([1961, 1966, 1971, 1976, 1981, 1986, 1991, 1996, 2001, 2006, 2011, 2016])
-frozen_area = np.array([148561, 148464, 146350, 148162, 147271, 145913, 145869, 146988, 140593, 136257, 141153, 128447])
-
-# Calculate average values for each decade
-decade_avg = {
-    '1966-1970': np.mean(frozen_area[:2]),
-    '1971-1980': np.mean(frozen_area[2:4]),
-    '1981-1990': np.mean(frozen_area[4:6]),
-    '1991-2000': np.mean(frozen_area[6:8]),
-    '2001-2010': np.mean(frozen_area[8:10]),
-    '2011-2020': np.mean(frozen_area[10:])
-}
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from changepoint import load_frozen_area
+
+# Input data: periods and frozen area from the table written by frozen_trend61-20.py
+analysis_dir = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\analysis"
+area_df = load_frozen_area(os.path.join(analysis_dir, "冻土面积统计.csv"))
+years = area_df['start_year'].to_numpy()
+frozen_area = area_df['frozen_area_km2'].to_numpy()
+
+# Calculate average values for each decade (1961-1970, 1971-1980, ...)
+decade = (years - 1) // 10 * 10 + 1
+decade_avg = {f"{d}-{d + 9}": np.mean(frozen_area[decade == d]) for d in np.unique(decade)}
 
 # Plot the graph
 plt.figure(figsize=(10, 6))
@@ -1,10 +1,13 @@
 import os
-import rasterio
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
 from glob import glob
 from matplotlib.colors import LinearSegmentedColormap
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from figure_service import plt
+from preview_render import panel_pixel_shape, read_previews, render_panel_grid
+
 # --------------------------
 # 1. 配置参数
 # --------------------------
@@ -44,44 +47,25 @@ cmap = LinearSegmentedColormap('custom_cmap', cdict)
 # 2. 读取栅格数据 & 提取时间信息
 # --------------------------
 raster_paths = sorted(glob(os.path.join(input_folder, "*.tif")))  # 按文件名排序
-data_list = []
-time_labels = []
-
-for path in raster_paths:
-    # 读取栅格
-    with rasterio.open(path) as ds:
-        data = ds.read(1)
-        data_list.append(data)
-
-        # 从文件名提取时间标签（需适配实际命名，这里假设是 degradation_YYYYMMDD_YYYYMMDD.tif 格式）
-        fname = os.path.basename(path).replace("degradation_", "").replace(".tif", "")
-        time_labels.append(fname)  # 如 "1961_1965_1966_1970" 等
-
-# --------------------------
-# 3. 绘制时间序列图
-# --------------------------
 rows = 4  # 行数，按需调整
 cols = 3  # 列数，按需调整
-fig, axes = plt.subplots(rows, cols, figsize=(15, 20))
-axes = axes.flatten()  # 转为一维数组方便遍历
-
-for i, (data, ax) in enumerate(zip(data_list, axes)):
-    # 绘制栅格
-    im = ax.imshow(data, cmap=cmap, vmin=values.min(), vmax=values.max())
-    ax.set_title(time_labels[i], fontsize=10)
-    ax.axis('off')  # 隐藏坐标轴
+figsize = (15, 20)
+dpi = 300
 
-# 调整布局
-plt.tight_layout()
+# 按子图像素大小读取预览（众数重采样，保持分类值）
+data_list = read_previews(raster_paths, panel_pixel_shape(figsize, dpi, rows, cols))
 
-# 添加统一颜色条（可选）
-fig.subplots_adjust(right=0.85)  # 预留颜色条位置
-cbar_ax = fig.add_axes([0.87, 0.15, 0.02, 0.7])  # 颜色条位置 [左, 下, 宽, 高]
-sm = plt.cm.ScalarMappable(cmap=cmap, norm=plt.Normalize(vmin=values.min(), vmax=values.max()))
-sm.set_array([])  # 必须设置一个空数组，否则颜色条可能不显示
-fig.colorbar(sm, cax=cbar_ax, ticks=values, label='Permafrost Status\n0 = Non - Permafrost, 1 = Permafrost, 3 = Degraded Area')
+# 从文件名提取时间标签（需适配实际命名，这里假设是 degradation_YYYYMMDD_YYYYMMDD.tif 格式）
+time_labels = [os.path.basename(path).replace("degradation_", "").replace(".tif", "")
+               for path in raster_paths]  # 如 "1961_1965_1966_1970" 等
 
-# 保存图片（可选）
-if output_fig_path:
-    plt.savefig(output_fig_path, dpi=300, bbox_inches='tight')
-plt.show()
\ No newline at end of file
+# --------------------------
+# 3. 绘制时间序列图（带统一颜色条）
+# --------------------------
+render_panel_grid(
+    data_list, time_labels, output_fig_path, rows, cols, figsize, dpi=dpi,
+    cmap=cmap, vmin=values.min(), vmax=values.max(), title_fontsize=10,
+    colorbar={"ticks": values,
+              "label": "Permafrost Status\n0 = Non - Permafrost, 1 = Permafrost, 3 = Degraded Area"}
+)
+plt.close("all")
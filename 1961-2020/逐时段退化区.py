@@ -1,70 +1,87 @@
 import os
+import sys
 import rasterio
 import numpy as np
 from glob import glob
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from block_executor import check_grid, map_blocks
+from change_events import ChangeEvents, build_change_events
+from raster_catalog import RasterCatalog
+from raster_io import with_gdal_env, write_profile
+from tracing import traced
 
-def calculate_degradation(t1_path, t2_path, output_path):
+
+def degradation_block(t1_data, t2_data, t1_nodata=None, t2_nodata=None, new_nodata=None):
+    """
+    一个数据块的退化区域：前期是冻土（T1 == 1）且后期变为非冻土（T2 == 0），编码为 3，否则保留前期值；
+    任意一期为 nodata 时输出 nodata（new_nodata 不为空时替换为该值）
     """
-    计算两个相邻时段的冻土退化区域
+    degradation = np.where((t1_data == 1) & (t2_data == 0), 3, t1_data)
+
+    # 处理nodata值（如果两个输入栅格中任意一个是nodata，则输出也设为nodata）
+    if t1_nodata is not None:
+        degradation = np.where(t1_data == t1_nodata, t1_nodata, degradation)
+    if t2_nodata is not None:
+        degradation = np.where(t2_data == t2_nodata, t2_nodata, degradation)
+
+    if new_nodata is not None:
+        degradation = np.where(degradation == t1_nodata, new_nodata, degradation)
+        degradation = np.where(degradation == t2_nodata, new_nodata, degradation)
+    return degradation
+
+
+@traced("degradation.pair", resources=False)
+def calculate_degradation(t1_path, t2_path, output_path, num_workers=None):
+    """
+    计算两个相邻时段的冻土退化区域（逐块并行，网格一致性由执行器检查）
     :param t1_path: 前期冻土数据路径（T1）
     :param t2_path: 后期冻土数据路径（T2）
     :param output_path: 退化区域结果输出路径
+    :param num_workers: 并行进程数（默认 CPU 核数）
     """
-    with rasterio.open(t1_path) as t1_ds, rasterio.open(t2_path) as t2_ds:
-        # 读取栅格数据
-        t1_data = t1_ds.read(1)
-        t2_data = t2_ds.read(1)
-
-        # 确保两个栅格的形状和地理信息一致
-        assert t1_data.shape == t2_data.shape, "两个栅格数据形状不一致"
-        assert t1_ds.meta["transform"] == t2_ds.meta["transform"], "两个栅格地理变换不一致"
-        assert t1_ds.meta["crs"] == t2_ds.meta["crs"], "两个栅格坐标系不一致"
-
-        # 获取原始栅格的nodata值
-        t1_nodata = t1_ds.nodata
-        t2_nodata = t2_ds.nodata
-
-        # 计算退化区域：前期是冻土（T1 == 1）且后期变为非冻土（T2 == 0），编码为 3
-        degradation = np.where((t1_data == 1) & (t2_data == 0), 3, t1_data)
-
-        # 处理nodata值（如果两个输入栅格中任意一个是nodata，则输出也设为nodata）
-        if t1_nodata is not None:
-            degradation = np.where(t1_data == t1_nodata, t1_nodata, degradation)
-        if t2_nodata is not None:
-            degradation = np.where(t2_data == t2_nodata, t2_nodata, degradation)
-
-        # 更新元数据
-        meta = t1_ds.meta.copy()
-
-        # 检查原始nodata值是否适用于int32类型
-        if (t1_nodata is not None and not isinstance(t1_nodata, int)) or \
-                (t2_nodata is not None and not isinstance(t2_nodata, int)):
-            # 如果原始nodata不是整数，设置新的int32范围内的nodata值
-            new_nodata = -9999  # 选择一个不会出现在正常数据中的整数值
-            degradation = np.where(degradation == t1_nodata, new_nodata, degradation)
-            degradation = np.where(degradation == t2_nodata, new_nodata, degradation)
-            meta.update(nodata=new_nodata)
-        else:
-            # 否则保持原始nodata值
-            meta.update(nodata=t1_nodata)
-
-        # 设置数据类型为int32
-        meta.update(dtype=rasterio.int32)
-
-        # 保存结果栅格
-        with rasterio.open(output_path, 'w', **meta) as output_ds:
-            output_ds.write(degradation, 1)
-
-
-def batch_process_degradation(input_folder, output_folder):
+    t1_meta, t2_meta = check_grid([t1_path, t2_path])
+    t1_nodata, t2_nodata = t1_meta["nodata"], t2_meta["nodata"]
+
+    # 检查原始nodata值是否适用于int32类型
+    new_nodata = None
+    if (t1_nodata is not None and not isinstance(t1_nodata, int)) or \
+            (t2_nodata is not None and not isinstance(t2_nodata, int)):
+        # 如果原始nodata不是整数，设置新的int32范围内的nodata值
+        new_nodata = -9999  # 选择一个不会出现在正常数据中的整数值
+
+    # 设置数据类型为int32（分块压缩写出）
+    map_blocks(degradation_block, [t1_path, t2_path], output_path,
+               output_meta={"dtype": rasterio.int32, "nodata": new_nodata if new_nodata is not None else t1_nodata},
+               params={"t1_nodata": t1_nodata, "t2_nodata": t2_nodata, "new_nodata": new_nodata},
+               num_workers=num_workers)
+
+
+@traced("degradation.adjacent")
+@with_gdal_env
+def batch_process_degradation(input_folder, output_folder, catalog=None):
     """
     批量处理逐时段冻土退化区域计算
     :param input_folder: 输入栅格数据所在文件夹，包含 12 期冻土数据
     :param output_folder: 输出退化区域结果的文件夹
+    :param catalog: 可选，栅格目录数据库路径（raster_catalog）；提供时从目录取文件列表，
+                    并在处理前按网格签名一次性检查各期是否对齐，无需逐个打开文件
     """
     # 获取输入文件夹中的栅格数据路径，按文件名排序
-    raster_paths = sorted(glob(os.path.join(input_folder, "fused_*.tif")))
+    if catalog:
+        with RasterCatalog(catalog) as cat:
+            cat.refresh(input_folder)
+            groups = cat.grid_groups(pattern="fused_*.tif", root=input_folder)
+        # 目录按前缀匹配会包含子文件夹中的文件，只保留直接位于输入文件夹下的（与 glob 一致）
+        folder = os.path.abspath(input_folder)
+        groups = {sig: [p for p in paths if os.path.dirname(p) == folder] for sig, paths in groups.items()}
+        groups = {sig: paths for sig, paths in groups.items() if paths}
+        if len(groups) > 1:
+            detail = "; ".join(f"{sig}: {len(paths)} 期" for sig, paths in groups.items())
+            raise ValueError(f"各期栅格网格不一致（{detail}）")
+        raster_paths = sorted(p for paths in groups.values() for p in paths)
+    else:
+        raster_paths = sorted(glob(os.path.join(input_folder, "fused_*.tif")))
 
     # 检查是否至少有两期数据
     if len(raster_paths) < 2:
@@ -89,6 +106,41 @@ def batch_process_degradation(input_folder, output_folder):
         print(f"已处理 {t1_name} - {t2_name} 时段，结果保存至 {output_path}")
 
 
+def build_degradation_events(input_folder, store_path):
+    """
+    逐时段退化的稀疏替代：只保存首期栅格与变化像元事件（.npz），
+    各时段退化栅格由 degradation_from_events 按需重建，无需写出全部 int32 结果
+    :return: ChangeEvents
+    """
+    raster_paths = sorted(glob(os.path.join(input_folder, "fused_*.tif")))
+    labels = [os.path.basename(p).replace("fused_", "").replace("_TTOP.tif", "") for p in raster_paths]
+    events = build_change_events(raster_paths, labels)
+    events.save(store_path)
+    return events
+
+
+def degradation_from_events(events, k, output_path=None):
+    """
+    由事件存储重建第 k 时段（第 k-1 期 → 第 k 期）的退化栅格，与 calculate_degradation 的输出一致
+    （各期 nodata 相同）
+    :param events: ChangeEvents 或 .npz 路径
+    :param output_path: 可选，写出 GeoTIFF
+    :return: int32 数组
+    """
+    if isinstance(events, str):
+        events = ChangeEvents.load(events)
+    nodata = events.nodata
+    new_nodata = -9999 if nodata is not None and not isinstance(nodata, int) else None
+    degradation = events.pair_raster(k, degradation_block, t1_nodata=nodata, t2_nodata=nodata,
+                                     new_nodata=new_nodata).astype(np.int32)
+    if output_path:
+        meta = write_profile(events.meta("int32", new_nodata if new_nodata is not None else nodata),
+                             "class-uint8-fast")
+        with rasterio.open(output_path, "w", **meta) as dst:
+            dst.write(degradation, 1)
+    return degradation
+
+
 if __name__ == "__main__":
     # 输入文件夹，包含 12 期冻土数据
     input_folder = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\result1"
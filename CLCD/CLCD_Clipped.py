@@ -1,8 +1,12 @@
 import os
+import sys
 from osgeo import gdal
 import multiprocessing
 from tqdm import tqdm
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracing import traced
+
 
 def process_tif(args):
     """
@@ -25,6 +29,7 @@ def process_tif(args):
         return False, f"{input_path} - {str(e)}"
 
 
+@traced("clip.clcd")
 def batch_clip(input_folder, output_folder, mask_shp, nodata=0, num_workers=4):
     """
     批量处理函数
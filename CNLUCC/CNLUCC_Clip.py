@@ -1,11 +1,19 @@
 import os
+import sys
 import glob
 import rasterio
 from rasterio.mask import mask
 import fiona
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from raster_io import with_gdal_env, write_profile
+from raster_stats import StatsAccumulator
+from tracing import span, traced
 
-def batch_clip_raster(input_dir, output_dir, clip_shapefile):
+
+@traced("clip.cnlucc")
+@with_gdal_env
+def batch_clip_raster(input_dir, output_dir, clip_shapefile, profile="class-uint8-fast"):
     """
     批量裁剪栅格数据
 
@@ -13,6 +21,7 @@ def batch_clip_raster(input_dir, output_dir, clip_shapefile):
         input_dir: 输入文件夹路径（包含各年份子文件夹）
         output_dir: 输出文件夹路径
         clip_shapefile: 用于裁剪的矢量文件路径
+        profile: 输出写出配置（见 raster_io.WRITE_PROFILES）
     """
     # 确保输出目录存在
     os.makedirs(output_dir, exist_ok=True)
@@ -37,21 +46,21 @@ def batch_clip_raster(input_dir, output_dir, clip_shapefile):
                 output_file = os.path.join(year_output_dir, filename)
 
                 # 执行裁剪操作
-                with rasterio.open(tif_file) as src:
+                with span("clip.cnlucc.file", file=filename), rasterio.open(tif_file) as src:
                     out_image, out_transform = mask(src, shapes, crop=True)
-                    out_meta = src.meta.copy()
-
-                    # 更新元数据
-                    out_meta.update({
-                        "driver": "GTiff",
-                        "height": out_image.shape[1],
-                        "width": out_image.shape[2],
-                        "transform": out_transform
-                    })
+                    # 更新元数据（分块压缩写出）
+                    out_meta = write_profile(src.meta, profile,
+                                             height=out_image.shape[1],
+                                             width=out_image.shape[2],
+                                             transform=out_transform)
 
-                    # 写入输出文件
+                    # 写入输出文件（同时保存类别统计，面积统计脚本可直接复用）
+                    stats = StatsAccumulator(out_meta["dtype"], out_meta.get("nodata"))
+                    stats.update(out_image)
                     with rasterio.open(output_file, "w", **out_meta) as dest:
                         dest.write(out_image)
+                        stats.write_tags(dest)
+                    stats.write_sidecar(output_file)
 
                 print(f"已裁剪并保存: {output_file}")
 
@@ -1,13 +1,24 @@
 import glob
 import os
+import sys
 import numpy as np
 import pandas as pd
 import rasterio
-import matplotlib.pyplot as plt
-from scipy import stats
-from sklearn.linear_model import LinearRegression
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from figure_service import get_style, plt, render_figures
+from landscape_metrics import landscape_metrics
+from raster_stats import class_counts
+from tracing import traced
+from trend_engine import batch_trend_stats
 
+TREND_COLUMNS = ['Total_Grassland', 'High_Cover', 'Medium_Cover', 'Low_Cover']
+# 景观指数的类别：各覆盖度草地及草地合计（31-33）
+GRASS_CLASS_GROUPS = {'High_Cover': [31], 'Medium_Cover': [32], 'Low_Cover': [33],
+                      'Total_Grassland': [31, 32, 33]}
+
+
+@traced("statistics.grassland_change")
 def analyze_grassland_change(input_dir, output_dir):
     """
     分析草地类型变化
@@ -34,16 +45,22 @@ def analyze_grassland_change(input_dir, output_dir):
 
             tif_file = tif_files[0]
 
-            # 读取数据并计算各类草地面积
+            # 读取数据并计算各类草地面积（写出时已保存类别直方图的栅格不再整图读取）
+            counts = class_counts(tif_file)
             with rasterio.open(tif_file) as src:
-                data = src.read(1)
                 transform = src.transform
                 pixel_area = abs(transform.a * transform.e) / 1000000  # 单位: km²
 
                 # 计算各类草地像元数
-                high_cover = np.sum((data >= 31) & (data < 32))
-                medium_cover = np.sum((data >= 32) & (data < 33))
-                low_cover = np.sum((data >= 33) & (data < 34))
+                if counts is not None:
+                    high_cover = counts.get(31, 0)
+                    medium_cover = counts.get(32, 0)
+                    low_cover = counts.get(33, 0)
+                else:
+                    data = src.read(1)
+                    high_cover = np.sum((data >= 31) & (data < 32))
+                    medium_cover = np.sum((data >= 32) & (data < 33))
+                    low_cover = np.sum((data >= 33) & (data < 34))
                 total_grass = high_cover + medium_cover + low_cover
 
                 # 计算面积(km²)
@@ -75,127 +92,154 @@ def analyze_grassland_change(input_dir, output_dir):
     return results
 
 
-def analyze_trends(df, output_dir):
+@traced("statistics.grassland_fragmentation")
+def analyze_grassland_fragmentation(input_dir, output_dir, num_workers=4):
     """
-    进行趋势分析并绘制图表 - 优化版
+    草地破碎化分析：逐年计算各类草地的斑块数、平均斑块面积、边缘密度和最大斑块指数
+    （分块流式斑块标记，多年份并行）
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 每个年份文件夹取一个TIF（与 analyze_grassland_change 一致）
+    tif_files, years = [], []
+    for year_dir in sorted(glob.glob(os.path.join(input_dir, "*"))):
+        tifs = glob.glob(os.path.join(year_dir, "*.tif")) if os.path.isdir(year_dir) else []
+        if tifs:
+            tif_files.append(tifs[0])
+            years.append(int(os.path.basename(year_dir)))
+
+    metrics = landscape_metrics(tif_files, labels=years, class_groups=GRASS_CLASS_GROUPS, num_workers=num_workers)
+    metrics = metrics.rename(columns={'label': 'Year', 'class': 'Class'})
+    metrics.to_csv(os.path.join(output_dir, 'grassland_fragmentation.csv'), index=False)
+    return metrics
+
+
+# 颜色方案（与样式独立）
+GRASS_COLORS = {
+    'High_Cover': '#2ca02c',  # 绿色
+    'Medium_Cover': '#ff7f0e',  # 橙色
+    'Low_Cover': '#d62728',  # 红色
+    'Total': '#1f77b4'  # 蓝色
+}
+
+
+def plot_total_grassland(df, output_path):
+    """草地总面积变化趋势图"""
+    plt.figure(figsize=(12, 6))
+    ax = plt.gca()
+    df.plot(x='Year', y='Total_Grassland', ax=ax,
+            marker='o', linestyle='-', color=GRASS_COLORS['Total'],
+            linewidth=2, markersize=8, label='Total Grassland')
+
+    plt.title('Total Grassland Area Change (1980-2023)', fontsize=14)
+    plt.xlabel('Year', fontsize=12)
+    plt.ylabel('Area (km²)', fontsize=12)
+    plt.grid(True, linestyle='--', alpha=0.6)
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.close()
+    return output_path
+
+
+def plot_grassland_by_type(df, output_path):
+    """不同类型草地面积变化图"""
+    plt.figure(figsize=(12, 6))
+    ax = plt.gca()
+
+    df.plot(x='Year', y='High_Cover', ax=ax,
+            marker='o', linestyle='-', color=GRASS_COLORS['High_Cover'],
+            linewidth=2, markersize=8, label='High Cover (31)')
+
+    df.plot(x='Year', y='Medium_Cover', ax=ax,
+            marker='s', linestyle='--', color=GRASS_COLORS['Medium_Cover'],
+            linewidth=2, markersize=8, label='Medium Cover (32)')
+
+    df.plot(x='Year', y='Low_Cover', ax=ax,
+            marker='^', linestyle='-.', color=GRASS_COLORS['Low_Cover'],
+            linewidth=2, markersize=8, label='Low Cover (33)')
+
+    plt.title('Grassland Area Change by Cover Type (1980-2023)', fontsize=14)
+    plt.xlabel('Year', fontsize=12)
+    plt.ylabel('Area (km²)', fontsize=12)
+    plt.legend(fontsize=10, framealpha=0.9)
+    plt.grid(True, linestyle='--', alpha=0.6)
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.close()
+    return output_path
+
+
+def plot_grassland_composition(df, output_path):
+    """不同类型草地比例变化（堆叠面积图）"""
+    plt.figure(figsize=(12, 6))
+    ax = plt.gca()
+
+    ax.stackplot(df['Year'],
+                 df['High_Percent'],
+                 df['Medium_Percent'],
+                 df['Low_Percent'],
+                 df['Other_Percent'],
+                 colors=[GRASS_COLORS['High_Cover'],
+                         GRASS_COLORS['Medium_Cover'],
+                         GRASS_COLORS['Low_Cover'],
+                         'lightgray'],
+                 labels=['High Cover %', 'Medium Cover %', 'Low Cover %', 'Other %'],
+                 alpha=0.8)
+
+    plt.title('Grassland Composition Change (1980-2023)', fontsize=14)
+    plt.xlabel('Year', fontsize=12)
+    plt.ylabel('Percentage (%)', fontsize=12)
+    plt.legend(loc='upper left', fontsize=10, framealpha=0.9)
+    plt.grid(True, linestyle='--', alpha=0.6)
+    plt.ylim(0, 100)
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.close()
+    return output_path
+
+
+def analyze_trends(df, output_dir, num_workers=3):
+    """
+    进行趋势分析并绘制图表 - 优化版（图表在无界面进程池中并行生成）
     """
     try:
-        # 设置绘图风格 - 从可用样式中选择最佳方案
-        preferred_order = [
-            'seaborn-v0_8',  # 最接近原始seaborn样式
-            'seaborn-v0_8-darkgrid',  # 带灰色网格
-            'ggplot',  # R语言ggplot2风格
-            'fivethirtyeight',  # 538网站风格
-            'bmh',  # Bayesian Methods for Hackers风格
-            'default'  # 最后回退到默认
-        ]
-
-        # 选择第一个可用的样式
-        selected_style = next((style for style in preferred_order
-                               if style in plt.style.available), 'default')
-        plt.style.use(selected_style)
+        # 设置绘图风格 - 从可用样式中选择最佳方案（结果缓存）
+        selected_style = get_style()
         print(f"使用的绘图样式: {selected_style}")
 
         # 创建输出目录
         os.makedirs(output_dir, exist_ok=True)
 
-        # 设置颜色方案（与样式独立）
-        colors = {
-            'High_Cover': '#2ca02c',  # 绿色
-            'Medium_Cover': '#ff7f0e',  # 橙色
-            'Low_Cover': '#d62728',  # 红色
-            'Total': '#1f77b4'  # 蓝色
-        }
-
-        # 1. 草地总面积变化趋势
-        plt.figure(figsize=(12, 6))
-        ax = plt.gca()
-        df.plot(x='Year', y='Total_Grassland', ax=ax,
-                marker='o', linestyle='-', color=colors['Total'],
-                linewidth=2, markersize=8, label='Total Grassland')
-
-        plt.title('Total Grassland Area Change (1980-2023)', fontsize=14)
-        plt.xlabel('Year', fontsize=12)
-        plt.ylabel('Area (km²)', fontsize=12)
-        plt.grid(True, linestyle='--', alpha=0.6)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, '1_total_grassland_trend.png'),
-                    dpi=300, bbox_inches='tight')
-        plt.close()
-
-        # 2. 不同类型草地面积变化
-        plt.figure(figsize=(12, 6))
-        ax = plt.gca()
-
-        df.plot(x='Year', y='High_Cover', ax=ax,
-                marker='o', linestyle='-', color=colors['High_Cover'],
-                linewidth=2, markersize=8, label='High Cover (31)')
-
-        df.plot(x='Year', y='Medium_Cover', ax=ax,
-                marker='s', linestyle='--', color=colors['Medium_Cover'],
-                linewidth=2, markersize=8, label='Medium Cover (32)')
-
-        df.plot(x='Year', y='Low_Cover', ax=ax,
-                marker='^', linestyle='-.', color=colors['Low_Cover'],
-                linewidth=2, markersize=8, label='Low Cover (33)')
-
-        plt.title('Grassland Area Change by Cover Type (1980-2023)', fontsize=14)
-        plt.xlabel('Year', fontsize=12)
-        plt.ylabel('Area (km²)', fontsize=12)
-        plt.legend(fontsize=10, framealpha=0.9)
-        plt.grid(True, linestyle='--', alpha=0.6)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, '2_grassland_by_type_trend.png'),
-                    dpi=300, bbox_inches='tight')
-        plt.close()
-
-        # 3. 不同类型草地比例变化（堆叠面积图）
-        plt.figure(figsize=(12, 6))
-        ax = plt.gca()
-
         # 计算堆叠数据
         df['Other_Percent'] = 100 - df[['High_Percent', 'Medium_Percent', 'Low_Percent']].sum(axis=1)
 
-        ax.stackplot(df['Year'],
-                     df['High_Percent'],
-                     df['Medium_Percent'],
-                     df['Low_Percent'],
-                     df['Other_Percent'],
-                     colors=[colors['High_Cover'],
-                             colors['Medium_Cover'],
-                             colors['Low_Cover'],
-                             'lightgray'],
-                     labels=['High Cover %', 'Medium Cover %', 'Low Cover %', 'Other %'],
-                     alpha=0.8)
-
-        plt.title('Grassland Composition Change (1980-2023)', fontsize=14)
-        plt.xlabel('Year', fontsize=12)
-        plt.ylabel('Percentage (%)', fontsize=12)
-        plt.legend(loc='upper left', fontsize=10, framealpha=0.9)
-        plt.grid(True, linestyle='--', alpha=0.6)
-        plt.ylim(0, 100)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, '3_grassland_composition_stack.png'),
-                    dpi=300, bbox_inches='tight')
-        plt.close()
-
-        # 4. 趋势显著性检验
+        # 1-3. 面积趋势、分类型面积、构成堆叠图并行出图
+        render_figures([
+            (plot_total_grassland, (df, os.path.join(output_dir, '1_total_grassland_trend.png')),
+             {'style': selected_style}),
+            (plot_grassland_by_type, (df, os.path.join(output_dir, '2_grassland_by_type_trend.png')),
+             {'style': selected_style}),
+            (plot_grassland_composition, (df, os.path.join(output_dir, '3_grassland_composition_stack.png')),
+             {'style': selected_style}),
+        ], num_workers=num_workers)
+
+        # 4. 趋势显著性检验（所有序列一次性批量计算，报告直接复用）
+        trend = batch_trend_stats(df[TREND_COLUMNS].to_numpy(dtype=float).T,
+                                  df['Year'].to_numpy(dtype=float),
+                                  names=TREND_COLUMNS)
+
         print("\n=== 趋势显著性检验(Mann-Kendall) ===")
-        for col in ['Total_Grassland', 'High_Cover', 'Medium_Cover', 'Low_Cover']:
-            tau, p_value = stats.kendalltau(df['Year'], df[col])
-            trend = "↑ 显著上升" if tau > 0 and p_value < 0.05 else \
+        for col, row in trend.iterrows():
+            tau, p_value = row['tau'], row['p_value']
+            trend_label = "↑ 显著上升" if tau > 0 and p_value < 0.05 else \
                 "↓ 显著下降" if tau < 0 and p_value < 0.05 else \
                     "→ 无显著趋势"
-            print(f"{col:15s}: tau={tau:+.3f}, p={p_value:.4f} {trend}")
+            print(f"{col:15s}: tau={tau:+.3f}, p={p_value:.4f} {trend_label}")
 
         # 5. 变化速率计算
         print("\n=== 年均变化速率 ===")
-        X = df['Year'].values.reshape(-1, 1)
-        for col in ['Total_Grassland', 'High_Cover', 'Medium_Cover', 'Low_Cover']:
-            model = LinearRegression().fit(X, df[col])
-            change_rate = model.coef_[0]
-            change_percent = change_rate / df[col].mean() * 100 if df[col].mean() != 0 else 0
-            print(f"{col:15s}: {change_rate:+.2f} km²/年 | {change_percent:+.2f}%/年")
+        for col, row in trend.iterrows():
+            print(f"{col:15s}: {row['slope']:+.2f} km²/年 | {row['change_percent']:+.2f}%/年")
 
         # 6. 保存分析结果
         result_report = os.path.join(output_dir, 'analysis_report.txt')
@@ -209,18 +253,18 @@ def analyze_trends(df, output_dir):
             f.write("\n\n")
 
             f.write("趋势检验结果:\n")
-            for col in ['Total_Grassland', 'High_Cover', 'Medium_Cover', 'Low_Cover']:
-                tau, p_value = stats.kendalltau(df['Year'], df[col])
-                f.write(f"{col:15s}: tau={tau:+.3f}, p={p_value:.4f}\n")
+            for col, row in trend.iterrows():
+                f.write(f"{col:15s}: tau={row['tau']:+.3f}, p={row['p_value']:.4f}\n")
 
             f.write("\n变化速率:\n")
-            for col in ['Total_Grassland', 'High_Cover', 'Medium_Cover', 'Low_Cover']:
-                model = LinearRegression().fit(X, df[col])
+            for col, row in trend.iterrows():
                 # 使用km2代替km²避免编码问题
-                change_rate = model.coef_[0]
-                f.write(f"{col:15s}: {change_rate:+.2f} km2/年\n")
+                f.write(f"{col:15s}: {row['slope']:+.2f} km2/年\n")
+
+        trend.to_csv(os.path.join(output_dir, 'trend_statistics.csv'), index_label='Series')
 
         print(f"\n分析完成! 结果已保存至: {output_dir}")
+        return trend
 
     except Exception as e:
         print(f"分析过程中发生错误: {str(e)}")
@@ -234,5 +278,6 @@ if __name__ == "__main__":
 
     # 执行分析
     results = analyze_grassland_change(input_directory, output_directory)
+    fragmentation = analyze_grassland_fragmentation(input_directory, output_directory)
     print("分析完成！结果已保存至:", output_directory)
     #成功运行
\ No newline at end of file
@@ -1,19 +1,32 @@
 import os
-os.add_dll_directory(r"D:\Anaconda\envs\gis_final\Library\bin")  # Python 3.8+ 专用
+import sys
+DLL_DIR = r"D:\Anaconda\envs\gis_final\Library\bin"
+# 仅 Windows 的 Python 3.8+ 提供 add_dll_directory，其他平台直接跳过
+if hasattr(os, "add_dll_directory") and os.path.isdir(DLL_DIR):
+    os.add_dll_directory(DLL_DIR)
 import shapely  # 现在应该能正常导入
 
 import numpy as np
 import rasterio
+import math
+import queue
+import threading
 import psutil
 import logging
 
 from rasterio.mask import mask
 from rasterio.windows import Window
-from concurrent.futures import ThreadPoolExecutor
-from scipy import stats
+from multiprocessing import shared_memory
+from rasterio.enums import MaskFlags
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 import geopandas as gpd
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from archive_vfs import find_rasters
+from raster_stats import StatsAccumulator
+from tracing import span, traced
+
 # 初始化日志系统
 logging.basicConfig(
     filename='../raster_merge.log',
@@ -53,6 +66,151 @@ def calculate_optimal_chunk(tiff_files, safety_factor=0.6):
     return chunk_size, estimated_mem
 
 
+class MemoryGovernor:
+    """
+    内存调度器：以本进程实测常驻内存（RSS）和单窗口已知开销为预算依据，
+    启动时确定与源数据内部分块对齐的固定窗口形状，运行中通过限制在途窗口数量施加背压，
+    不再轮询系统内存占比、中途缩放分块
+
+    :param budget_mb: 本次合并可额外使用的内存（MB），默认取启动时可用内存 × safety_factor
+    :param safety_factor: 未指定预算时占可用内存的比例
+    :param max_inflight: 在途窗口数上限（已提交读取、尚未写出的窗口）
+    """
+
+    # 单窗口内每个源像元的额外开销：堆叠副本 + 众数计算的排序/计数缓冲
+    MODE_BUFFER = 3
+    # modal_reduce 每个输出像元的计数缓冲（best、best_count、count、比较与替换掩膜），与源文件数无关
+    MODE_WORK = 7
+
+    def __init__(self, budget_mb=None, safety_factor=0.6, max_inflight=4):
+        self.process = psutil.Process()
+        self.baseline_rss = self.process.memory_info().rss
+        if budget_mb is None:
+            budget_mb = psutil.virtual_memory().available * safety_factor / 1024 ** 2
+        self.budget = int(budget_mb * 1024 ** 2)
+        self.max_inflight = max(1, max_inflight)
+        self.max_windows = self.max_inflight
+        self.in_flight = 0
+        self.count = 0
+        self.peak_rss = self.baseline_rss
+        self.stalls = 0
+        self._cond = threading.Condition()
+
+    def window_cost(self, shape, n_files, dtype_size):
+        """单个窗口的内存开销（字节）：n_files 个源块 × 众数缓冲（源文件少时不低于堆叠 + 计数缓冲）+ uint8 输出块"""
+        pixels = shape[0] * shape[1]
+        stack = n_files * dtype_size
+        return pixels * (max(stack * self.MODE_BUFFER, stack + self.MODE_WORK) + 1)
+
+    def plan_windows(self, src, n_files, out_block=(256, 256)):
+        """
+        按预算规划窗口：源数据为分块存储时取内部分块（与输出分块）公倍数的整数倍，
+        条带存储时取整行宽度的条带
+
+        :return: (窗口列表, 单窗口开销, 在途窗口上限)
+        """
+        height, width = src.height, src.width
+        dtype_size = np.dtype(src.dtypes[0]).itemsize
+        block_h, block_w = src.block_shapes[0]
+        align_h = math.lcm(block_h, out_block[0])
+        striped = block_w >= width
+
+        per_pixel = self.window_cost((1, 1), n_files, dtype_size)
+        target_pixels = self.budget // self.max_inflight // per_pixel
+        if striped or width * align_h <= target_pixels:
+            # 整行条带：行数取对齐高度的整数倍
+            rows = max(1, target_pixels // (width * align_h)) * align_h
+            shape = (min(rows, height), width)
+        else:
+            align_w = math.lcm(block_w, out_block[1])
+            k = max(1, math.isqrt(target_pixels // (align_h * align_w)))
+            shape = (min(k * align_h, height), min(k * align_w, width))
+
+        windows = [Window(col, row, min(shape[1], width - col), min(shape[0], height - row))
+                   for row in range(0, height, shape[0])
+                   for col in range(0, width, shape[1])]
+        cost = self.window_cost(shape, n_files, dtype_size)
+        inflight = max(1, min(self.max_inflight, self.budget // cost))
+        self.max_windows = inflight
+        logger.info(
+            f"内存调度 | 预算: {self.budget / 1024 ** 2:.1f}MB | 源分块: {block_h}x{block_w} | "
+            f"窗口: {shape[0]}x{shape[1]} 共 {len(windows)} 个 | "
+            f"单窗口开销: {cost / 1024 ** 2:.1f}MB | 在途上限: {inflight}"
+        )
+        return windows, cost, inflight
+
+    def rss_growth(self):
+        """本进程相对启动时的常驻内存增长（字节）"""
+        rss = self.process.memory_info().rss
+        self.peak_rss = max(self.peak_rss, rss)
+        return rss - self.baseline_rss
+
+    def acquire(self, cost, stop=None):
+        """
+        登记一个窗口的开销；在途窗口已达上限、登记开销或实测RSS增长超出预算时阻塞，
+        直到写出线程释放已完成的窗口（没有在途窗口时总是放行，避免单窗口超预算时死锁）
+
+        :param stop: threading.Event，流水线出错时置位以解除等待
+        """
+        with self._cond:
+            stalled = False
+            while self.count and not (stop is not None and stop.is_set()) and (
+                    self.count >= self.max_windows
+                    or self.in_flight + cost > self.budget
+                    or self.rss_growth() > self.budget):
+                stalled = True
+                self._cond.wait(timeout=0.05)
+            self.stalls += stalled
+            self.in_flight += cost
+            self.count += 1
+
+    def release(self, cost):
+        with self._cond:
+            self.in_flight -= cost
+            self.count -= 1
+            self._cond.notify_all()
+
+
+BINCOUNT_CHUNK_PIXELS = 1 << 16
+
+
+def modal_reduce(stacked):
+    """
+    沿第0轴取众数：逐类别计数（ESA分类只有十余个类别，比排序求众数快且省内存），
+    票数相同时取较小类别值，与 scipy.stats.mode 结果一致
+
+    :param stacked: (n, H, W) 整型数组
+    :return: (H, W) uint8
+    """
+    first = stacked[0, 0, 0]
+    if all(np.all(band == first) for band in stacked):
+        return np.full(stacked.shape[1:], first, dtype=np.uint8)
+
+    best = np.zeros(stacked.shape[1:], dtype=np.uint8)
+    best_count = np.zeros(stacked.shape[1:], dtype=np.uint16)
+    if stacked.dtype.kind == "u":
+        # 按行分段计数得到出现的类别（线性时间、不排序；bincount 会把输入转为 int64，
+        # 分段后临时数组固定约 512KB，不随窗口增大而突破 MODE_BUFFER 预算）
+        present = np.zeros(max(256, int(stacked.max()) + 1), dtype=bool)
+        rows = max(1, BINCOUNT_CHUNK_PIXELS // max(stacked.shape[2], 1))
+        for band in stacked:
+            for row in range(0, band.shape[0], rows):
+                present |= np.bincount(band[row:row + rows].ravel(), minlength=present.size) > 0
+        values = present.nonzero()[0]
+    else:
+        values = np.unique(stacked)
+    count = np.empty(stacked.shape[1:], dtype=np.uint16)
+    for value in values:  # 升序，严格大于才替换 → 平票保留较小值
+        # 逐层累加计数：临时数组只有单层大小（count_nonzero(axis=0) 会生成 int64 计数）
+        count[:] = 0
+        for band in stacked:
+            count += band == value
+        better = count > best_count
+        best[better] = value
+        best_count[better] = count[better]
+    return best
+
+
 def process_window(files, window, nodata):
     """带错误处理的并行窗口处理"""
 
@@ -72,28 +230,253 @@ def process_window(files, window, nodata):
         if not chunk_data:
             raise ValueError("所有文件读取失败")
 
-        stacked = np.stack(chunk_data)
-        if np.all(stacked == stacked[0, 0, 0]):
-            return np.full(stacked.shape[1:], stacked[0, 0, 0], dtype=np.uint8)
-
-        merged, _ = stats.mode(stacked, axis=0, keepdims=True)
-        return merged.squeeze(0).astype(np.uint8)
+        return modal_reduce(np.stack(chunk_data))
     except Exception as e:
         logger.error(f"窗口处理失败: {str(e)}")
         raise
 
 
-def memory_safe_merge(input_folder, output_path, boundary_shp=None):
-    """完整的内存安全合并流程"""
+# --------------------------
+# 读取 → 计算 → 写出 流水线
+# --------------------------
+_DONE = object()
+
+
+def run_merge_pipeline(tiff_files, windows, dst, nodata, governor, window_cost, read_workers=2, compute_workers=4,
+                       stats=None):
+    """
+    三级流水线：读取线程预取后续窗口，计算线程求众数，单个写出线程按窗口顺序写入，
+    各级之间为有界队列，磁盘读取、CPU计算与写出同时进行；
+    每个读取线程只打开一次全部源文件（rasterio 数据集不可跨线程共享）
+
+    :param dst: 已打开的输出数据集（只在写出线程中使用）
+    :param governor: MemoryGovernor，提交窗口前登记开销，写出后释放
+    :param stats: StatsAccumulator，写出线程逐块累计统计量（可选）
+    """
+    depth = governor.max_windows
+    read_q, compute_q, write_q = (queue.Queue(maxsize=depth) for _ in range(3))
+    stop = threading.Event()
+    errors = []
+    local = threading.local()
+    handles, handles_lock = [], threading.Lock()
+
+    def fail(e, window):
+        logger.error(f"窗口({window.row_off},{window.col_off})失败: {str(e)}")
+        errors.append(e)
+        stop.set()
+
+    def read_stack(window, _):
+        datasets = getattr(local, "datasets", None)
+        if datasets is None:
+            datasets = local.datasets = [rasterio.open(f) for f in tiff_files]
+            with handles_lock:
+                handles.extend(datasets)
+        chunk_data = []
+        for src in datasets:
+            try:
+                data = src.read(1, window=window, masked=True)
+                chunk_data.append(data.filled(src.nodata if src.nodata is not None else nodata))
+            except Exception as e:
+                logger.error(f"文件 {os.path.basename(src.name)} 读取失败: {str(e)}")
+        if not chunk_data:
+            raise ValueError("所有文件读取失败")
+        return np.stack(chunk_data)
+
+    def stage(in_q, out_q, func, name):
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                in_q.put(_DONE)  # 通知同级其他线程
+                return
+            index, window, payload = item
+            if stop.is_set():
+                continue
+            try:
+                with span(name, row=window.row_off, col=window.col_off):
+                    result = func(window, payload)
+            except Exception as e:
+                fail(e, window)
+                continue
+            out_q.put((index, window, result))
+
+    def writer():
+        buffered, next_index = {}, 0
+        while True:
+            item = write_q.get()
+            if item is _DONE:
+                return
+            index, window, merged = item
+            if stop.is_set():
+                governor.release(window_cost)
+                continue
+            buffered[index] = (window, merged)
+            # 按提交顺序写出，后完成的窗口暂存（仍计入在途开销）
+            while next_index in buffered:
+                window, merged = buffered.pop(next_index)
+                try:
+                    with span("merge.write", row=window.row_off, col=window.col_off) as s:
+                        dst.write(merged, 1, window=window)
+                        s.set(bytes_written=merged.nbytes)
+                    if stats is not None:
+                        stats.update(merged)
+                except Exception as e:
+                    fail(e, window)
+                governor.release(window_cost)
+                next_index += 1
+                rss_mb = governor.peak_rss / 1024 ** 2
+                print(f"\r进度: {next_index / len(windows):.1%} | 峰值RSS: {rss_mb:.0f}MB | "
+                      f"在途窗口: {governor.count}", end='')
+
+    readers = [threading.Thread(target=stage, args=(read_q, compute_q, read_stack, "merge.read"), daemon=True)
+               for _ in range(read_workers)]
+    computers = [threading.Thread(target=stage, args=(compute_q, write_q, lambda w, stacked: modal_reduce(stacked),
+                                                      "merge.compute"), daemon=True)
+                 for _ in range(compute_workers)]
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    for t in readers + computers + [writer_thread]:
+        t.start()
+
+    try:
+        for index, window in enumerate(windows):
+            governor.acquire(window_cost, stop)  # 背压：在途窗口超出预算时等待写出线程释放
+            if stop.is_set():
+                break
+            read_q.put((index, window, None))
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        # 逐级关闭：上一级全部退出后再通知下一级
+        for q, threads in ((read_q, readers), (compute_q, computers), (write_q, [writer_thread])):
+            q.put(_DONE)
+            for t in threads:
+                t.join()
+        for src in handles:
+            src.close()
+
+    if errors:
+        raise errors[0]
+
+
+# --------------------------
+# 多进程合并：共享内存窗口槽 + 单一写出
+# --------------------------
+_merge_worker = {}
+
+
+def _init_merge_worker(tiff_files, slot_names, slot_shape, dtype, nodata):
+    """工作进程初始化：打开全部源文件并挂载共享内存窗口槽（每进程一次）"""
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    datasets = [rasterio.open(f) for f in tiff_files]
+    _merge_worker.update(slots=slots, datasets=datasets, slot_shape=slot_shape, dtype=np.dtype(dtype),
+                         nodata=nodata)
+
+
+def _slot_arrays(shm, slot_shape, dtype, n_files, height, width):
+    """共享内存槽视图：前半部分为 (n, h, w) 源数据堆叠，后半部分为 (h, w) uint8 结果"""
+    stack_bytes = n_files * slot_shape[0] * slot_shape[1] * dtype.itemsize
+    stack = np.ndarray((n_files, height, width), dtype=dtype, buffer=shm.buf)
+    merged = np.ndarray((height, width), dtype=np.uint8, buffer=shm.buf, offset=stack_bytes)
+    return stack, merged
+
+
+def _merge_window_task(index, window_bounds, slot):
+    """在工作进程内读取窗口到共享内存槽并求众数；只返回编号，不传递数组"""
+    w = _merge_worker
+    col, row, width, height = window_bounds
+    window = Window(col, row, width, height)
+    datasets = w["datasets"]
+    stack, merged = _slot_arrays(w["slots"][slot], w["slot_shape"], w["dtype"], len(datasets), height, width)
+
+    valid = []
+    for k, src in enumerate(datasets):
+        try:
+            src.read(1, window=window, out=stack[k])
+            if src.nodata is None and MaskFlags.all_valid not in src.mask_flag_enums[0]:
+                # 与带掩膜读取一致：掩膜像元填充为输出 NoData
+                stack[k][src.read_masks(1, window=window) == 0] = w["nodata"]
+            valid.append(k)
+        except Exception as e:
+            logger.error(f"文件 {os.path.basename(src.name)} 读取失败: {str(e)}")
+    if not valid:
+        raise ValueError("所有文件读取失败")
+    merged[:] = modal_reduce(stack if len(valid) == len(datasets) else stack[valid])
+    return index, slot
+
+
+def run_process_merge(tiff_files, windows, dst, nodata, governor, num_workers=None, stats=None):
+    """
+    多进程合并：每个窗口槽是一块共享内存（源数据堆叠 + 结果），工作进程直接读入槽内并写入众数结果，
+    主进程按窗口顺序写出；槽数量即在途窗口上限，总占用不超过 governor 的预算
+
+    :param governor: MemoryGovernor（已调用 plan_windows，max_windows 为槽数量）
+    :param num_workers: 工作进程数，默认 CPU 核数
+    """
+    with rasterio.open(tiff_files[0]) as src:
+        dtype = np.dtype(src.dtypes[0])
+    slot_shape = (max(int(w.height) for w in windows), max(int(w.width) for w in windows))
+    slot_bytes = slot_shape[0] * slot_shape[1] * (len(tiff_files) * dtype.itemsize + 1)
+    num_workers = num_workers or os.cpu_count() or 4
+    n_slots = max(1, min(governor.max_windows, len(windows)))
+    slots = [shared_memory.SharedMemory(create=True, size=slot_bytes) for _ in range(n_slots)]
+    logger.info(f"多进程合并 | 进程: {num_workers} | 窗口槽: {n_slots} × {slot_bytes / 1024 ** 2:.1f}MB")
+
+    try:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_merge_worker,
+                                 initargs=(tiff_files, [shm.name for shm in slots], slot_shape, dtype.name,
+                                           nodata)) as executor:
+            free_slots = list(range(n_slots))
+            pending, buffered = set(), {}
+            next_submit, next_write = 0, 0
+            while next_write < len(windows):
+                # 有空闲槽时继续提交，槽用尽即为背压
+                while free_slots and next_submit < len(windows):
+                    w = windows[next_submit]
+                    pending.add(executor.submit(_merge_window_task, next_submit,
+                                                (w.col_off, w.row_off, w.width, w.height), free_slots.pop()))
+                    next_submit += 1
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, slot = future.result()
+                    buffered[index] = slot
+                # 按窗口顺序写出并归还槽
+                while next_write in buffered:
+                    slot = buffered.pop(next_write)
+                    window = windows[next_write]
+                    _, merged = _slot_arrays(slots[slot], slot_shape, dtype, len(tiff_files),
+                                             int(window.height), int(window.width))
+                    with span("merge.write", row=window.row_off, col=window.col_off) as s:
+                        dst.write(merged, 1, window=window)
+                        s.set(bytes_written=merged.nbytes)
+                    if stats is not None:
+                        stats.update(merged)
+                    free_slots.append(slot)
+                    next_write += 1
+                    governor.rss_growth()
+                    print(f"\r进度: {next_write / len(windows):.1%} | 在途窗口: {len(pending)}", end='')
+    finally:
+        for shm in slots:
+            shm.close()
+            shm.unlink()
+
+
+@traced("merge.memory_safe")
+def memory_safe_merge(input_folder, output_path, boundary_shp=None, memory_budget_mb=None, max_workers=4,
+                      read_workers=2, parallel="threads"):
+    """
+    完整的内存安全合并流程
+
+    :param memory_budget_mb: 合并可额外使用的内存（MB），默认按启动时可用内存估算
+        （多进程模式默认取 calculate_optimal_chunk 的预估占用）
+    :param max_workers: 众数计算线程数（多进程模式为进程数）
+    :param read_workers: 读取线程数（预取后续窗口，仅线程模式）
+    :param parallel: "threads" 线程流水线；"processes" 多进程（众数计算不受GIL限制，适合多核）
+    """
     start_time = datetime.now()
     logger.info(f"开始处理: {input_folder}")
 
-    # 1. 收集文件
-    tiff_files = []
-    for root, _, files in os.walk(input_folder):
-        for f in files:
-            if f.endswith('.tif') and '_Map.tif' in f:
-                tiff_files.append(os.path.join(root, f))
+    # 1. 收集文件（含压缩包内的分幅，通过 /vsizip/ 直接读取）
+    tiff_files = find_rasters(input_folder, "_Map.tif")
 
     if not tiff_files:
         logger.error("未找到有效的分类图文件")
@@ -120,59 +503,41 @@ def memory_safe_merge(input_folder, output_path, boundary_shp=None):
         'driver': 'GTiff'
     })
 
-    # 4. 分块处理
-    chunk_size, _ = calculate_optimal_chunk(tiff_files)
-    MIN_CHUNK, MAX_CHUNK = 256, 4096
-    total_blocks = ((height // chunk_size) + 1) * ((width // chunk_size) + 1)
-    processed_blocks = 0
+    # 4. 分块处理：窗口形状启动时确定，运行中只通过在途窗口数量施加背压
+    if parallel == "processes":
+        # 每个进程一个窗口槽，另留两个槽用于等待写出，总占用不超过 calculate_optimal_chunk 的预算
+        if memory_budget_mb is None:
+            _, memory_budget_mb = calculate_optimal_chunk(tiff_files)
+        governor = MemoryGovernor(memory_budget_mb, max_inflight=max_workers + 2)
+    else:
+        # 在途窗口 = 正在读取 + 正在计算 + 预取/等待写出各一个
+        governor = MemoryGovernor(memory_budget_mb, max_inflight=read_workers + max_workers + 2)
+    with rasterio.open(tiff_files[0]) as src:
+        windows, window_cost, _ = governor.plan_windows(
+            src, len(tiff_files), (meta['blockysize'], meta['blockxsize']))
 
     try:
+        stats = StatsAccumulator(dtype, nodata)
         with rasterio.open(output_path, 'w', **meta) as dst:
-            i = 0
-            while i < height:
-                j = 0
-                while j < width:
-                    # 动态调整
-                    mem = psutil.virtual_memory()
-                    if mem.percent > 85:
-                        chunk_size = max(MIN_CHUNK, chunk_size // 2)
-                        logger.warning(f"内存紧张({mem.percent}%)，分块调整为 {chunk_size}")
-
-                    # 计算窗口
-                    win_h = min(chunk_size, height - i)
-                    win_w = min(chunk_size, width - j)
-                    window = Window(j, i, win_w, win_h)
-
-                    try:
-                        # 处理并写入
-                        merged_chunk = process_window(tiff_files, window, nodata)
-                        dst.write(merged_chunk, 1, window=window)
-
-                        # 进度显示
-                        processed_blocks += 1
-                        progress = processed_blocks / total_blocks
-                        print(f"\r进度: {progress:.1%} | 内存: {mem.percent}% | 当前分块: {chunk_size}", end='')
-
-                        # 动态调整分块
-                        if mem.percent < 60 and chunk_size < MAX_CHUNK:
-                            chunk_size = min(MAX_CHUNK, chunk_size * 2)
-
-                        j += win_w
-                    except Exception as e:
-                        logger.error(f"窗口({i},{j})失败: {str(e)}")
-                        chunk_size = max(MIN_CHUNK, chunk_size // 2)
-                        if chunk_size <= MIN_CHUNK:
-                            raise MemoryError("分块已降至最小值仍失败")
-
-                i += chunk_size
-
-        # 5. 验证输出
-        with rasterio.open(output_path) as src:
-            data = src.read(1)
-            unique_vals = np.unique(data)
-            logger.info(f"输出文件验证 - 唯一值: {unique_vals}")
-            if len(unique_vals) == 1 and unique_vals[0] == nodata:
-                logger.warning("输出文件可能全为NoData值!")
+            if parallel == "processes":
+                run_process_merge(tiff_files, windows, dst, nodata, governor, max_workers, stats=stats)
+            else:
+                run_merge_pipeline(tiff_files, windows, dst, nodata, governor, window_cost,
+                                   read_workers=read_workers, compute_workers=max_workers, stats=stats)
+            stats.write_tags(dst)
+        stats.write_sidecar(output_path)
+
+        logger.info(
+            f"合并完成 | 峰值RSS: {governor.peak_rss / 1024 ** 2:.1f}MB | "
+            f"背压等待: {governor.stalls} 次"
+        )
+
+        # 5. 验证输出（使用写出时累计的统计量，不再整图重读）
+        classes = list(stats.class_counts())
+        logger.info(f"输出文件验证 - 类别: {classes} | 有效像元: {stats.valid_count} | "
+                    f"NoData像元: {stats.nodata_count}")
+        if stats.valid_count == 0:
+            logger.warning("输出文件可能全为NoData值!")
 
         # 6. 可选裁剪
         if boundary_shp:
@@ -190,8 +555,12 @@ def memory_safe_merge(input_folder, output_path, boundary_shp=None):
                 })
 
                 clipped_path = output_path.replace('.tif', '_clipped.tif')
+                clip_stats = StatsAccumulator(dtype, nodata)
+                clip_stats.update(out_image)
                 with rasterio.open(clipped_path, 'w', **meta) as dst:
                     dst.write(out_image)
+                    clip_stats.write_tags(dst)
+                clip_stats.write_sidecar(clipped_path)
                 logger.info(f"裁剪结果保存至: {clipped_path}")
 
         logger.info(f"处理完成! 耗时: {datetime.now() - start_time}")
@@ -1,9 +1,14 @@
 import os
+import sys
 import glob
 import warnings
 from osgeo import gdal, ogr
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracing import traced
 
+
+@traced("clip.glc_fcs")
 def batch_clip_tif(input_dir, output_dir, shp_path, years=None):
     """
     批量裁剪TIFF文件
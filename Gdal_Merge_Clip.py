@@ -4,6 +4,10 @@ import time
 import logging
 from datetime import datetime
 
+from archive_vfs import find_rasters
+from raster_io import gdal_cli_args
+from tracing import traced
+
 
 def setup_logging(output_dir):
     """配置日志记录"""
@@ -19,6 +23,7 @@ def setup_logging(output_dir):
     return log_file
 
 
+@traced("merge.esa_worldcover")
 def merge_esa_worldcover(input_dir, output_path):
     """拼接ESA WorldCover数据中的Map.tif文件"""
     logging.info(f"开始拼接处理，输入目录: {input_dir}")
@@ -35,12 +40,8 @@ def merge_esa_worldcover(input_dir, output_path):
     os.makedirs(output_dir, exist_ok=True)
     logging.info(f"输出目录已准备: {output_dir}")
 
-    # 收集所有Map.tif文件
-    tif_files = []
-    for root, _, files in os.walk(input_dir):
-        for file in files:
-            if file.endswith("Map.tif"):
-                tif_files.append(os.path.join(root, file))
+    # 收集所有Map.tif文件（压缩包内的文件直接以 /vsizip/ 路径参与拼接）
+    tif_files = find_rasters(input_dir, "Map.tif")
 
     if not tif_files:
         logging.error("未找到任何Map.tif文件！")
@@ -57,10 +58,8 @@ def merge_esa_worldcover(input_dir, output_path):
                   "-o", output_path,
                   "-of", "GTiff",
                   "-n", "0",
-                  "-a_nodata", "255",
-                  "-co", "COMPRESS=LZW",
-                  "-co", "BIGTIFF=YES"
-              ] + tif_files
+                  "-a_nodata", "255"
+              ] + gdal_cli_args("class-uint8-fast") + tif_files
 
     logging.info("执行命令: " + " ".join(command))
 
@@ -81,6 +80,7 @@ def merge_esa_worldcover(input_dir, output_path):
         return False
 
 
+@traced("clip.vector")
 def clip_with_vector(input_tif, output_path, vector_file):
     """使用矢量文件裁剪TIFF"""
     logging.info(f"开始裁剪处理，输入文件: {input_tif}")
@@ -95,8 +95,7 @@ def clip_with_vector(input_tif, output_path, vector_file):
         "-cutline", vector_file,
         "-crop_to_cutline",
         "-dstnodata", "255",
-        "-co", "COMPRESS=LZW",
-        "-co", "BIGTIFF=YES",
+        *gdal_cli_args("class-uint8-fast"),
         "-multi",
         "-wo", "NUM_THREADS=ALL_CPUS",
         input_tif,
@@ -1,17 +1,27 @@
 import os
-from osgeo import gdal
+import sys
+import math
+import shutil
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from osgeo import gdal, osr
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from archive_vfs import find_rasters
+from raster_io import apply_gdal_config, gdal_creation_options
+from tracing import traced
 
-def find_tif_files(root_folder):
-    """递归查找所有TIF文件"""
-    tif_files = []
-    for root, dirs, files in os.walk(root_folder):
-        for file in files:
-            if file.lower().endswith('.tif'):
-                tif_files.append(os.path.join(root, file))
-    return tif_files
+# 默认目标坐标系：与 1961-2020/project.py 相同的中国 Albers 等积投影
+ALBERS_PROJ4 = "+proj=aea +lat_1=27 +lat_2=45 +lat_0=35 +lon_0=105 +x_0=0 +y_0=0 +datum=WGS84 +units=m +no_defs"
 
 
+def find_tif_files(root_folder, include_archives=True):
+    """递归查找所有TIF文件（含 zip/tar 压缩包内的文件，以 /vsizip/、/vsitar/ 路径返回，无需解压）"""
+    return find_rasters(root_folder, ".tif", include_archives=include_archives)
+
+
+@traced("merge.globeland30")
 def merge_tifs(tif_files, output_file):
     """合并多个TIF文件"""
     # 显式启用GDAL异常
@@ -36,6 +46,151 @@ def merge_tifs(tif_files, output_file):
     print(f"合并完成，结果保存在: {output_file}")
 
 
+# --------------------------
+# 按投影带分组并行拼接
+# --------------------------
+def _srs(definition):
+    srs = osr.SpatialReference()
+    srs.SetFromUserInput(definition)
+    srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    return srs
+
+
+def _crs_key(srs):
+    """坐标系分组键：优先使用 EPSG 代码（如 EPSG:32645），否则使用 WKT"""
+    if srs.AutoIdentifyEPSG() == 0 and srs.GetAuthorityCode(None):
+        return f"{srs.GetAuthorityName(None)}:{srs.GetAuthorityCode(None)}"
+    return srs.ExportToWkt()
+
+
+def group_tiles_by_crs(tif_files, dst_srs=ALBERS_PROJ4):
+    """
+    按源坐标系（UTM 带）分组，同时计算每块瓦片在目标坐标系下的范围（只读头信息）
+
+    :return: {坐标系键: {"files": [...], "bounds": (xmin, ymin, xmax, ymax)}}
+    """
+    gdal.UseExceptions()
+    dst = _srs(dst_srs)
+    groups = defaultdict(lambda: {"files": [], "bounds": None})
+    transforms = {}
+    for path in tif_files:
+        ds = gdal.Open(path)
+        src = _srs(ds.GetProjection())
+        key = _crs_key(src)
+        if key not in transforms:
+            transforms[key] = osr.CoordinateTransformation(src, dst)
+        gt = ds.GetGeoTransform()
+        xmin, ymax = gt[0], gt[3]
+        xmax, ymin = xmin + gt[1] * ds.RasterXSize, ymax + gt[5] * ds.RasterYSize
+        ds = None
+        # 边缘加密采样后取外包框，UTM→Albers 时边界为曲线
+        bounds = transforms[key].TransformBounds(xmin, ymin, xmax, ymax, 21)
+        group = groups[key]
+        group["files"].append(path)
+        old = group["bounds"]
+        group["bounds"] = bounds if old is None else (min(old[0], bounds[0]), min(old[1], bounds[1]),
+                                                      max(old[2], bounds[2]), max(old[3], bounds[3]))
+    return dict(groups)
+
+
+def _snap_bounds(bounds, x0, y0, res):
+    """将范围外扩对齐到目标网格（左上角原点 x0, y0，像元 res），保证各组像元严格对齐"""
+    xmin = x0 + math.floor((bounds[0] - x0) / res) * res
+    xmax = x0 + math.ceil((bounds[2] - x0) / res) * res
+    ymax = y0 - math.floor((y0 - bounds[3]) / res) * res
+    ymin = y0 - math.ceil((y0 - bounds[1]) / res) * res
+    return xmin, ymin, xmax, ymax
+
+
+def _warp_group(task):
+    """子进程：一个坐标系组直接重投影到目标网格的对应子范围（只重采样一次）"""
+    files, output, dst_srs, bounds, res, resampling, nodata = task
+    apply_gdal_config()
+    gdal.UseExceptions()
+    options = gdal.WarpOptions(
+        format="GTiff",
+        dstSRS=dst_srs,
+        outputBounds=bounds,
+        xRes=res,
+        yRes=res,
+        resampleAlg=resampling,
+        srcNodata=nodata,
+        dstNodata=nodata,
+        creationOptions=gdal_creation_options("class-uint8-fast") + ["BIGTIFF=IF_SAFER"],
+        warpMemoryLimit=512,
+    )
+    gdal.Warp(output, files, options=options)
+    return output
+
+
+@traced("merge.globeland30_by_crs")
+def merge_tifs_by_crs(tif_files, output_file, dst_srs=ALBERS_PROJ4, resolution=30, resampling="near",
+                      nodata=0, num_workers=None, work_dir=None, keep_intermediate=False):
+    """
+    按源坐标系分组并行拼接为 COG：
+    每个 UTM 带在独立进程中直接重投影到显式目标网格，各组像元严格对齐，
+    再通过 VRT 组合（不再重采样）并输出分块 COG
+
+    :param dst_srs: 目标坐标系（默认 Albers 等积投影，不再取第一块瓦片的坐标系）
+    :param resolution: 目标像元大小（目标坐标系单位）
+    :param resampling: "near" 或 "mode"（分类数据，不可用双线性等插值）
+    :param nodata: 源/目标 NoData（GlobeLand30 背景值为 0）
+    :param num_workers: 并行进程数，默认 CPU 核数与组数取小
+    :param work_dir: 中间文件目录，默认在输出目录下创建临时目录（完成后删除）
+    :param keep_intermediate: 保留临时目录中的分组结果与 VRT
+    """
+    gdal.UseExceptions()
+    if not tif_files:
+        raise ValueError("没有找到任何TIFF文件")
+    if resampling not in ("near", "mode"):
+        raise ValueError("分类数据只能使用 near 或 mode 重采样")
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    os.makedirs(output_dir, exist_ok=True)
+
+    groups = group_tiles_by_crs(tif_files, dst_srs)
+    print(f"找到 {len(tif_files)} 个TIFF文件，分属 {len(groups)} 个坐标系: {', '.join(k if len(k) < 32 else '自定义' for k in groups)}")
+
+    # 显式目标网格：以全部瓦片外包框的左上角为原点，各组范围都对齐到该网格
+    all_bounds = [g["bounds"] for g in groups.values()]
+    x0 = math.floor(min(b[0] for b in all_bounds) / resolution) * resolution
+    y0 = math.ceil(max(b[3] for b in all_bounds) / resolution) * resolution
+
+    # 只清理自己创建的临时目录
+    temporary = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="globeland30_", dir=output_dir)
+    os.makedirs(work_dir, exist_ok=True)
+    tasks = []
+    for k, group in enumerate(groups.values()):
+        output = os.path.join(work_dir, f"group_{k:02d}.tif")
+        tasks.append((group["files"], output, dst_srs, _snap_bounds(group["bounds"], x0, y0, resolution),
+                      resolution, resampling, nodata))
+
+    num_workers = num_workers or min(os.cpu_count() or 1, len(tasks))
+    try:
+        group_outputs = []
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            for k, output in enumerate(executor.map(_warp_group, tasks), 1):
+                group_outputs.append(output)
+                print(f"\r进度: {k}/{len(tasks)} 个坐标系组已重投影", end="")
+        print()
+
+        # 各组已在同一网格上，VRT 只做像元拷贝；NoData 透明，组间重叠处取有效值
+        vrt_path = os.path.join(work_dir, "mosaic.vrt")
+        gdal.BuildVRT(vrt_path, group_outputs, options=gdal.BuildVRTOptions(
+            srcNodata=nodata, VRTNodata=nodata, resolution="highest"))
+        gdal.Translate(output_file, vrt_path, options=gdal.TranslateOptions(
+            format="COG",
+            noData=nodata,
+            creationOptions=["COMPRESS=ZSTD", "BLOCKSIZE=512", "BIGTIFF=IF_SAFER", "NUM_THREADS=ALL_CPUS",
+                             "OVERVIEW_RESAMPLING=" + ("MODE" if resampling == "mode" else "NEAREST")],
+        ))
+    finally:
+        if temporary and not keep_intermediate:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"合并完成，结果保存在: {output_file}")
+    return output_file
+
+
 # 使用示例
 if __name__ == "__main__":
     # 设置包含多个子文件夹的根目录
@@ -45,5 +200,5 @@ if __name__ == "__main__":
     # 查找所有TIF文件
     tif_files = find_tif_files(root_folder)
 
-    # 合并文件
-    merge_tifs(tif_files, output_file)
+    # 按 UTM 带分组并行重投影后合并为 COG（单线程整体合并仍可用 merge_tifs）
+    merge_tifs_by_crs(tif_files, output_file)
@@ -0,0 +1,236 @@
+"""
+直接读取压缩包内的栅格（GDAL 虚拟文件系统 /vsizip/、/vsitar/），无需先解压：
+压缩包成员列表并行读取并按 (大小, 修改时间) 缓存，查找函数同时返回普通文件与压缩包内文件
+
+    python archive_vfs.py bench --tiles-dir D:\\bench\\tiles --work-dir D:\\bench\\archive
+"""
+import os
+import json
+import time
+import shutil
+import tarfile
+import zipfile
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import rasterio
+from rasterio.merge import merge
+
+from raster_catalog import scan_files
+from raster_io import with_gdal_env, write_profile
+
+# 压缩包后缀 → GDAL 虚拟文件系统前缀（.tar.gz 需顺序解压，随机读取明显慢于 .zip/.tar）
+ARCHIVE_PREFIXES = {
+    ".zip": "/vsizip/",
+    ".tar": "/vsitar/",
+    ".tar.gz": "/vsitar/",
+    ".tgz": "/vsitar/",
+}
+DEFAULT_CACHE = os.path.join(os.path.expanduser("~"), ".landuse_archive_index.json")
+
+
+def archive_prefix(path):
+    """压缩包对应的虚拟文件系统前缀，非压缩包返回 None"""
+    name = path.lower()
+    for ext, prefix in ARCHIVE_PREFIXES.items():
+        if name.endswith(ext):
+            return prefix
+    return None
+
+
+def vsi_path(archive_path, member):
+    """压缩包成员的 GDAL 虚拟路径，如 /vsizip/E:/data/tiles.zip/N30E090_Map.tif"""
+    archive = os.path.abspath(archive_path).replace("\\", "/")
+    return f"{archive_prefix(archive_path)}{archive}/{member}"
+
+
+def list_members(archive_path):
+    """读取压缩包成员列表（只读目录，不解压）：[(成员路径, 未压缩大小), ...]"""
+    if archive_path.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive_path) as zf:
+            return [(info.filename, info.file_size) for info in zf.infolist() if not info.is_dir()]
+    with tarfile.open(archive_path) as tf:
+        return [(m.name, m.size) for m in tf.getmembers() if m.isfile()]
+
+
+class ArchiveIndex:
+    """
+    压缩包成员列表缓存（JSON），压缩包 (大小, 修改时间) 未变时不重新读取目录
+
+    :param cache_path: 缓存文件路径，None 表示只在内存中缓存
+    """
+
+    def __init__(self, cache_path=DEFAULT_CACHE):
+        self.cache_path = cache_path
+        self.entries = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        self._lock = threading.Lock()
+
+    def _cached(self, path, st):
+        entry = self.entries.get(path)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["members"]
+        return None
+
+    def members(self, archive_path):
+        path = os.path.abspath(archive_path)
+        st = os.stat(path)
+        with self._lock:
+            cached = self._cached(path, st)
+        if cached is not None:
+            return cached
+        members = list_members(path)
+        with self._lock:
+            self.entries[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "members": members}
+        return members
+
+    def list_many(self, archive_paths, num_workers=8):
+        """并行读取多个压缩包的成员列表并保存缓存：{压缩包路径: 成员列表}"""
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            results = dict(zip(archive_paths, executor.map(self.members, archive_paths)))
+        self.save()
+        return results
+
+    def save(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp, self.cache_path)
+
+
+def find_rasters(root_folder, suffix=".tif", include_archives=True, index=None, num_workers=8):
+    """
+    递归查找栅格：普通文件返回本地路径，压缩包内文件返回 /vsizip/、/vsitar/ 虚拟路径
+
+    :param suffix: 文件名后缀（不区分大小写），如 ".tif"、"_Map.tif"
+    :param include_archives: 是否查找压缩包内的文件
+    :param index: ArchiveIndex，默认使用用户目录下的缓存
+    :return: 排序后的路径列表
+    """
+    suffix = suffix.lower()
+    extensions = (suffix,) + (tuple(ARCHIVE_PREFIXES) if include_archives else ())
+    found = scan_files([root_folder], extensions, num_workers)
+    files = sorted(p for p in found if p.lower().endswith(suffix))
+    archives = sorted(p for p in found if archive_prefix(p) and not p.lower().endswith(suffix))
+    if archives:
+        index = index or ArchiveIndex()
+        for archive, members in index.list_many(archives, num_workers).items():
+            files.extend(vsi_path(archive, name) for name, _ in members if name.lower().endswith(suffix))
+    return files
+
+
+# --------------------------
+# 基准测试：先解压再拼接 vs 直接读取压缩包
+# --------------------------
+def make_archives(tif_paths, output_dir, per_archive=4, compression=zipfile.ZIP_STORED):
+    """将栅格打包为若干 zip（模拟数据分发格式），返回压缩包路径列表"""
+    os.makedirs(output_dir, exist_ok=True)
+    archives = []
+    for k in range(0, len(tif_paths), per_archive):
+        archive = os.path.join(output_dir, f"tiles_{k // per_archive:03d}.zip")
+        with zipfile.ZipFile(archive, "w", compression=compression) as zf:
+            for path in tif_paths[k:k + per_archive]:
+                zf.write(path, os.path.join("MAP", os.path.basename(path)))
+        archives.append(archive)
+    return archives
+
+
+@with_gdal_env
+def _merge_to(paths, output_path):
+    datasets = [rasterio.open(p) for p in paths]
+    try:
+        mosaic, transform = merge(datasets, method="first")
+        meta = write_profile(datasets[0].meta, "class-uint8-fast", height=mosaic.shape[1],
+                             width=mosaic.shape[2], transform=transform)
+    finally:
+        for ds in datasets:
+            ds.close()
+    with rasterio.open(output_path, "w", **meta) as dst:
+        dst.write(mosaic)
+    return mosaic
+
+
+def benchmark_archive_reads(archive_dir, work_dir, suffix=".tif", num_workers=8):
+    """
+    对比两种方式：解压全部成员后拼接；通过虚拟文件系统直接从压缩包拼接
+
+    :return: 结果列表（耗时、额外占用磁盘、输出是否一致）
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    archives = sorted(p for p in scan_files([archive_dir], tuple(ARCHIVE_PREFIXES)) if archive_prefix(p))
+    results = []
+
+    # 1. 先解压再拼接
+    extract_dir = os.path.join(work_dir, "extracted")
+    shutil.rmtree(extract_dir, ignore_errors=True)
+    start = time.perf_counter()
+    for archive in archives:
+        if archive.lower().endswith(".zip"):
+            with zipfile.ZipFile(archive) as zf:
+                zf.extractall(extract_dir)
+        else:
+            with tarfile.open(archive) as tf:
+                tf.extractall(extract_dir)
+    t_extract = time.perf_counter() - start
+    extracted = find_rasters(extract_dir, suffix, include_archives=False, num_workers=num_workers)
+    extracted_mb = sum(os.path.getsize(p) for p in extracted) / 1024 ** 2
+    ref = _merge_to(extracted, os.path.join(work_dir, "merged_extracted.tif"))
+    results.append({"method": "extract+merge", "files": len(extracted), "list_s": round(t_extract, 3),
+                    "total_s": round(time.perf_counter() - start, 3), "extra_disk_mb": round(extracted_mb, 1)})
+
+    # 2. 直接读取压缩包（第一次读取成员列表，第二次命中缓存）
+    index = ArchiveIndex(os.path.join(work_dir, "archive_index.json"))
+    for label in ("vsi (cold index)", "vsi (cached index)"):
+        start = time.perf_counter()
+        members = find_rasters(archive_dir, suffix, index=index, num_workers=num_workers)
+        t_list = time.perf_counter() - start
+        mosaic = _merge_to(members, os.path.join(work_dir, "merged_vsi.tif"))
+        results.append({"method": label, "files": len(members), "list_s": round(t_list, 3),
+                        "total_s": round(time.perf_counter() - start, 3), "extra_disk_mb": 0.0,
+                        "identical": bool(np.array_equal(mosaic, ref))})
+    shutil.rmtree(extract_dir, ignore_errors=True)
+
+    for r in results:
+        print(f"{r['method']:<20} 文件 {r['files']:>4} | 列表/解压 {r['list_s']:>7.3f}s | "
+              f"总耗时 {r['total_s']:>7.3f}s | 额外磁盘 {r['extra_disk_mb']:>8.1f}MB"
+              + (f" | 结果一致: {r['identical']}" if "identical" in r else ""))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="压缩包内栅格直接读取")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_list = sub.add_parser("list", help="列出目录（含压缩包内）的栅格")
+    p_list.add_argument("root")
+    p_list.add_argument("--suffix", default=".tif")
+    p_bench = sub.add_parser("bench", help="对比先解压再拼接与直接读取压缩包")
+    p_bench.add_argument("--work-dir", required=True)
+    p_bench.add_argument("--archive-dir", help="已有压缩包目录")
+    p_bench.add_argument("--tiles-dir", help="没有压缩包时，将该目录下的 .tif 打包后测试")
+    p_bench.add_argument("--per-archive", type=int, default=4)
+    p_bench.add_argument("--deflate", action="store_true", help="压缩成员（默认仅存储，随机读取最快）")
+    p_bench.add_argument("--suffix", default=".tif")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for path in find_rasters(args.root, args.suffix):
+            print(path)
+        return
+    archive_dir = args.archive_dir
+    if not archive_dir:
+        archive_dir = os.path.join(args.work_dir, "archives")
+        tifs = sorted(p for p in scan_files([args.tiles_dir], (args.suffix,)))
+        make_archives(tifs, archive_dir, args.per_archive,
+                      zipfile.ZIP_DEFLATED if args.deflate else zipfile.ZIP_STORED)
+    benchmark_archive_reads(archive_dir, args.work_dir, args.suffix)
+
+
+if __name__ == "__main__":
+    main()
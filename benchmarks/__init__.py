@@ -0,0 +1,9 @@
+"""
+端到端处理流程基准测试：合成数据生成、分阶段计时（耗时、峰值内存、读写字节数），
+结果按提交号记录，可在不同提交之间对比
+
+    python -m benchmarks --work-dir D:\\bench --size 4096
+    python -m benchmarks --work-dir D:\\bench --compare <基准提交> <对比提交>
+"""
+from benchmarks.harness import StageRecorder, compare_commits, load_results
+from benchmarks.synthetic import make_class_raster, make_class_tiles, make_cutline, make_permafrost_stack
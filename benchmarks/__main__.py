@@ -0,0 +1,35 @@
+import os
+import argparse
+
+import pandas as pd
+
+from benchmarks.harness import compare_commits
+from benchmarks.pipeline import STAGES, run_pipeline_benchmark
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成数据端到端处理流程基准测试")
+    parser.add_argument("--work-dir", required=True, help="工作目录（合成数据、中间结果与结果文件）")
+    parser.add_argument("--size", type=int, default=2048, help="单个栅格边长（像元）")
+    parser.add_argument("--tiles", type=int, default=2, help="拼接阶段每行/列瓦片数")
+    parser.add_argument("--periods", type=int, default=12, help="冻土数据期数")
+    parser.add_argument("--crs", default="EPSG:4326", help="合成分类数据坐标系（冻土数据固定为 Albers 等积投影）")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES, help="需要运行的阶段")
+    parser.add_argument("--results", help="结果文件，默认 <work-dir>/benchmark_results.jsonl")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="对比两个提交的结果，不运行测试")
+    args = parser.parse_args()
+
+    results_path = args.results or os.path.join(args.work_dir, "benchmark_results.jsonl")
+    pd.set_option("display.width", 200)
+    if args.compare:
+        print(compare_commits(results_path, *args.compare).round(3).to_string())
+        return
+
+    recorder = run_pipeline_benchmark(args.work_dir, args.size, args.tiles, args.periods, args.crs,
+                                      args.stages, results_path)
+    print(recorder.to_frame()[["stage", "status", "wall_s", "peak_rss_mb", "read_mb", "written_mb"]]
+          .to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
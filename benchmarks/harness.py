@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import platform
+import threading
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import psutil
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_revision(repo_dir=REPO_DIR):
+    """当前提交号及工作区是否有未提交修改，非git目录时返回 (None, None)"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_dir, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repo_dir,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        return commit, bool(status)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def machine_info():
+    """机器信息，用于判断不同结果是否可比"""
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "memory_gb": round(psutil.virtual_memory().total / 1024 ** 3, 1),
+    }
+
+
+def _io_counters(process):
+    """进程读写字节数（read_chars/write_chars 包含页缓存命中，更接近程序实际读写量）"""
+    try:
+        io = process.io_counters()
+    except (AttributeError, psutil.Error):
+        return None
+    return (getattr(io, "read_chars", io.read_bytes), getattr(io, "write_chars", io.write_bytes))
+
+
+class _RssSampler(threading.Thread):
+    """后台线程定时采样本进程及子进程的常驻内存，记录峰值"""
+
+    def __init__(self, interval=0.02):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def sample(self):
+        rss = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak = max(self.peak, rss)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.sample()
+
+
+class StageRecorder:
+    """
+    记录各处理阶段的耗时、峰值内存与读写字节数，结果追加写入 JSON Lines 文件
+
+    每条记录带有提交号，不同提交的结果可用 compare_commits 对比
+    """
+
+    def __init__(self, results_path, run_params=None, sample_interval=0.02):
+        self.results_path = results_path
+        self.run_params = run_params or {}
+        self.sample_interval = sample_interval
+        self.commit, self.dirty = git_revision()
+        self.machine = machine_info()
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, **params):
+        """计时上下文：with recorder.stage("merge", tiles=4): ..."""
+        process = psutil.Process()
+        io_before = _io_counters(process)
+        sampler = _RssSampler(self.sample_interval)
+        sampler.start()
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except Exception:
+            status = "failed"
+            raise
+        finally:
+            wall = time.perf_counter() - start
+            sampler.stop()
+            io_after = _io_counters(process)
+            record = {
+                "run_id": self.run_id,
+                "commit": self.commit,
+                "dirty": self.dirty,
+                "stage": name,
+                "status": status,
+                "wall_s": round(wall, 4),
+                "peak_rss_mb": round(sampler.peak / 1024 ** 2, 1),
+                "read_mb": round((io_after[0] - io_before[0]) / 1024 ** 2, 2) if io_before and io_after else None,
+                "written_mb": round((io_after[1] - io_before[1]) / 1024 ** 2, 2) if io_before and io_after else None,
+                "params": dict(self.run_params, **params),
+                "machine": self.machine,
+            }
+            self.records.append(record)
+            self._append(record)
+            print(f"[{name}] {status} | {record['wall_s']:.2f} s | 峰值内存 {record['peak_rss_mb']:.0f} MB | "
+                  f"读 {record['read_mb']} MB | 写 {record['written_mb']} MB")
+
+    def skip(self, name, reason):
+        """记录跳过的阶段（如缺少可选依赖）"""
+        record = {"run_id": self.run_id, "commit": self.commit, "dirty": self.dirty, "stage": name,
+                  "status": "skipped", "reason": reason, "params": self.run_params, "machine": self.machine}
+        self.records.append(record)
+        self._append(record)
+        print(f"[{name}] 跳过: {reason}")
+
+    def _append(self, record):
+        os.makedirs(os.path.dirname(os.path.abspath(self.results_path)), exist_ok=True)
+        with open(self.results_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def to_frame(self):
+        return pd.DataFrame(self.records).drop(columns=["machine"], errors="ignore")
+
+
+def load_results(results_path):
+    """读取全部基准测试记录"""
+    with open(results_path, "r", encoding="utf-8") as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+
+def compare_commits(results_path, base_commit, head_commit, metrics=("wall_s", "peak_rss_mb", "read_mb", "written_mb")):
+    """
+    对比两个提交的各阶段指标（同一提交多次运行取中位数）
+
+    :param base_commit: 基准提交号（可为前缀）
+    :param head_commit: 对比提交号（可为前缀）
+    :return: DataFrame，索引为阶段，列为 指标_base、指标_head、指标_ratio（head/base）
+    """
+    df = load_results(results_path)
+    df = df[df["status"] == "ok"]
+
+    def summary(prefix):
+        sub = df[df["commit"].fillna("").str.startswith(prefix)]
+        if sub.empty:
+            raise ValueError(f"结果文件中没有提交 {prefix} 的记录")
+        return sub.groupby("stage")[list(metrics)].median()
+
+    base, head = summary(base_commit), summary(head_commit)
+    table = base.join(head, lsuffix="_base", rsuffix="_head", how="inner")
+    for metric in metrics:
+        table[f"{metric}_ratio"] = table[f"{metric}_head"] / table[f"{metric}_base"]
+    return table
@@ -0,0 +1,143 @@
+import os
+import glob
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.warp import calculate_default_transform, reproject
+
+from benchmarks.harness import StageRecorder
+from benchmarks.synthetic import make_class_raster, make_class_tiles, make_cutline, make_permafrost_stack
+from pipeline_runner import load_module
+from raster_io import with_gdal_env, write_profile
+from tracing import traced
+
+# 1961-2020/project.py 中使用的 Albers 等积投影
+ALBERS_PROJ4 = "+proj=aea +lat_1=27 +lat_2=45 +lat_0=35 +lon_0=105 +x_0=0 +y_0=0 +datum=WGS84 +units=m +no_defs"
+STAGES = ("merge", "clip", "reproject", "pyramids", "degradation", "degradation_engine", "area_statistics", "trends")
+
+
+@traced("reproject.rasterio")
+@with_gdal_env
+def reproject_rasters(raster_paths, output_dir, dst_crs=ALBERS_PROJ4):
+    """与 1961-2020/project.py 的 gdalwarp 重投影等价（最邻近重采样）"""
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = []
+    for path in raster_paths:
+        with rasterio.open(path) as src:
+            transform, width, height = calculate_default_transform(src.crs, dst_crs, src.width, src.height,
+                                                                   *src.bounds)
+            meta = write_profile(src.meta, "class-uint8-fast", crs=dst_crs, transform=transform,
+                                 width=width, height=height)
+            output_path = os.path.join(output_dir, os.path.basename(path))
+            with rasterio.open(output_path, "w", **meta) as dst:
+                reproject(rasterio.band(src, 1), rasterio.band(dst, 1), resampling=Resampling.nearest,
+                          src_nodata=src.nodata, dst_nodata=src.nodata)
+        outputs.append(output_path)
+    return outputs
+
+
+def build_pyramids(folder):
+    """建立金字塔：有 osgeo 时调用 build_pyramids.py，否则用 rasterio 按相同层级与重采样方法建立"""
+    try:
+        from build_pyramids import build_pyramids_for_clipped_data
+    except ImportError:
+        for path in glob.glob(os.path.join(folder, "*.tif")):
+            with rasterio.open(path, "r+") as ds:
+                ds.build_overviews([2, 4, 8, 16], Resampling.nearest)
+        return "rasterio"
+    build_pyramids_for_clipped_data(folder)
+    return "gdal"
+
+
+def run_pipeline_benchmark(work_dir, size=2048, tiles=2, periods=12, crs="EPSG:4326", stages=STAGES,
+                           results_path=None, seed=0):
+    """
+    生成合成数据并依次计时各处理阶段
+
+    :param work_dir: 工作目录（合成数据与中间结果）
+    :param size: 单个栅格边长（像元）
+    :param tiles: 拼接阶段瓦片数（tiles × tiles）
+    :param periods: 冻土数据期数
+    :param crs: 合成分类数据坐标系（冻土数据与 1961-2020/project.py 的输出一致，固定为 Albers 等积投影、1 km，
+                面积统计按米计算）
+    :param stages: 需要运行的阶段
+    :param results_path: 结果文件（JSON Lines），默认 work_dir/benchmark_results.jsonl
+    :return: StageRecorder（records 为本次全部记录）
+    """
+    results_path = results_path or os.path.join(work_dir, "benchmark_results.jsonl")
+    recorder = StageRecorder(results_path, {"size": size, "tiles": tiles, "periods": periods, "crs": crs})
+    data_dir = os.path.join(work_dir, "synthetic")
+    out_dir = os.path.join(work_dir, "outputs", recorder.run_id)
+
+    # 合成数据（同一参数只生成一次）
+    tile_dir = os.path.join(data_dir, f"tiles_{size}_{tiles}")
+    clip_dir = os.path.join(data_dir, f"years_{size}")
+    stack_dir = os.path.join(data_dir, f"permafrost_{size}_{periods}_albers")
+    cutline = os.path.join(data_dir, f"cutline_{size}.shp")
+    if not os.path.isdir(tile_dir):
+        make_class_tiles(tile_dir, tiles, tiles, size, crs=crs, seed=seed)
+    if not os.path.isdir(clip_dir):
+        for k, year in enumerate((2000, 2010, 2020)):
+            make_class_raster(os.path.join(clip_dir, str(year), f"CNLUCC_{year}.tif"), size, size,
+                              crs=crs, seed=seed + k)
+    if not os.path.isdir(stack_dir):
+        make_permafrost_stack(stack_dir, size, size, periods, crs=ALBERS_PROJ4, seed=seed)
+    if not os.path.exists(cutline):
+        with rasterio.open(glob.glob(os.path.join(clip_dir, "*", "*.tif"))[0]) as src:
+            make_cutline(cutline, src.bounds, src.crs, seed=seed)
+    stack_paths = sorted(glob.glob(os.path.join(stack_dir, "fused_*.tif")))
+
+    def run(name, func, **params):
+        if name not in stages:
+            return
+        try:
+            with recorder.stage(name, **params):
+                func()
+        except Exception as e:
+            print(f"[{name}] 失败: {e}")
+
+    def merge():
+        esa = load_module(os.path.join("ESA", "ESA_WorldCover.py"))
+        esa.memory_safe_merge(tile_dir, os.path.join(out_dir, "merge", "merged.tif"))
+
+    def clip():
+        load_module(os.path.join("CNLUCC", "CNLUCC_Clip.py")).batch_clip_raster(
+            clip_dir, os.path.join(out_dir, "clip"), cutline)
+
+    def reproject_stage():
+        clipped = sorted(glob.glob(os.path.join(out_dir, "clip", "*", "*.tif")))
+        reproject_rasters(clipped, os.path.join(out_dir, "reproject"))
+
+    def pyramids():
+        build_pyramids(os.path.join(out_dir, "reproject"))
+
+    def degradation():
+        load_module(os.path.join("1961-2020", "逐时段退化区.py")) \
+            .batch_process_degradation(stack_dir, os.path.join(out_dir, "degradation"))
+
+    def degradation_engine():
+        load_module(os.path.join("1961-2020", "degradation_engine.py")) \
+            .run_degradation_engine(stack_dir, os.path.join(out_dir, "degradation_engine"))
+
+    def area_statistics():
+        frozen_trend = load_module(os.path.join("1961-2020", "frozen_trend61-20.py"))
+        areas = [frozen_trend.calculate_frozen_area(p) for p in stack_paths]
+        print(f"冻土面积: {np.round(areas, 2)}")
+
+    def trends():
+        from trend_engine import pixel_trend_rasters
+        pixel_trend_rasters(stack_paths, os.path.join(out_dir, "trends"))
+
+    os.makedirs(os.path.join(out_dir, "merge"), exist_ok=True)
+    run("merge", merge, files=tiles * tiles)
+    run("clip", clip, files=3)
+    run("reproject", reproject_stage, dst_crs="albers")
+    run("pyramids", pyramids)
+    run("degradation", degradation, files=len(stack_paths))
+    run("degradation_engine", degradation_engine, files=len(stack_paths))
+    run("area_statistics", area_statistics, files=len(stack_paths))
+    run("trends", trends, files=len(stack_paths))
+
+    print(f"基准测试结果已追加至: {results_path}")
+    return recorder
@@ -0,0 +1,162 @@
+import os
+import math
+import numpy as np
+import rasterio
+import fiona
+from rasterio.transform import from_origin
+from rasterio.warp import transform as transform_coords
+from scipy import ndimage
+
+from raster_io import write_profile
+
+ESA_CLASSES = (10, 20, 30, 40, 50, 60, 70, 80, 90, 95, 100)
+CLASS_NODATA = 255
+
+
+def smooth_field(shape, scale=64, seed=0):
+    """生成空间连续的随机场（0~1），scale 为斑块特征尺度（像元）"""
+    rng = np.random.default_rng(seed)
+    coarse_shape = (max(2, math.ceil(shape[0] / scale) + 1), max(2, math.ceil(shape[1] / scale) + 1))
+    coarse = rng.random(coarse_shape)
+    field = ndimage.zoom(coarse, (shape[0] / coarse_shape[0], shape[1] / coarse_shape[1]), order=1)
+    field = field[:shape[0], :shape[1]]
+    if field.shape != tuple(shape):
+        field = np.pad(field, [(0, shape[0] - field.shape[0]), (0, shape[1] - field.shape[1])], mode="edge")
+    low, high = field.min(), field.max()
+    return (field - low) / (high - low) if high > low else np.zeros(shape)
+
+
+def class_array(shape, classes=ESA_CLASSES, patch_size=64, noise=0.02, seed=0):
+    """
+    合成分类数组：按随机场分位数划分斑块，并加入少量随机噪声像元
+
+    :param shape: (行, 列)
+    :param classes: 类别值列表
+    :param patch_size: 斑块特征尺度（像元）
+    :param noise: 随机改变类别的像元比例
+    """
+    rng = np.random.default_rng(seed)
+    field = smooth_field(shape, patch_size, seed)
+    edges = np.quantile(field, np.linspace(0, 1, len(classes) + 1)[1:-1])
+    data = np.asarray(classes, dtype=np.uint8)[np.searchsorted(edges, field)]
+    flip = rng.random(shape) < noise
+    data[flip] = rng.choice(np.asarray(classes, dtype=np.uint8), size=int(flip.sum()))
+    return data
+
+
+def make_class_raster(path, width=4096, height=4096, classes=ESA_CLASSES, crs="EPSG:4326",
+                      origin=(90.0, 36.0), res=None, nodata=CLASS_NODATA, patch_size=64,
+                      noise=0.02, profile="compat", seed=0):
+    """
+    生成合成分类栅格
+
+    :param path: 输出路径
+    :param crs: 坐标系（地理坐标系默认分辨率约10 m，投影坐标系默认10 m）
+    :param origin: 左上角坐标 (x, y)
+    :param res: 像元大小，默认按坐标系取约10 m
+    :param profile: 写出配置（见 raster_io.WRITE_PROFILES）
+    :return: 输出路径
+    """
+    crs = rasterio.crs.CRS.from_user_input(crs)
+    res = res or (1 / 11132.0 if crs.is_geographic else 10.0)
+    meta = write_profile({
+        "driver": "GTiff", "width": width, "height": height, "count": 1, "dtype": "uint8",
+        "crs": crs, "transform": from_origin(origin[0], origin[1], res, res), "nodata": nodata
+    }, profile)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with rasterio.open(path, "w", **meta) as dst:
+        dst.write(class_array((height, width), classes, patch_size, noise, seed), 1)
+    return path
+
+
+def make_class_tiles(output_dir, tiles_x=2, tiles_y=2, tile_size=2048, classes=ESA_CLASSES, crs="EPSG:4326",
+                     origin=(90.0, 36.0), res=None, name_pattern="ESA_WorldCover_10m_2020_v100_R{row}C{col}_Map.tif",
+                     profile="compat", seed=0):
+    """
+    生成相邻排列的合成分类瓦片（文件名默认模仿 ESA WorldCover 的 *_Map.tif）
+
+    :return: 瓦片路径列表
+    """
+    crs = rasterio.crs.CRS.from_user_input(crs)
+    res = res or (1 / 11132.0 if crs.is_geographic else 10.0)
+    paths = []
+    for row in range(tiles_y):
+        for col in range(tiles_x):
+            tile_origin = (origin[0] + col * tile_size * res, origin[1] - row * tile_size * res)
+            path = os.path.join(output_dir, name_pattern.format(row=row, col=col))
+            paths.append(make_class_raster(path, tile_size, tile_size, classes, crs, tile_origin, res,
+                                           profile=profile, seed=seed + row * tiles_x + col))
+    return paths
+
+
+def make_permafrost_stack(output_dir, width=2048, height=2048, n_periods=12, start_year=1961, step=5,
+                          initial_fraction=0.7, final_fraction=0.45, crs="EPSG:4326", origin=None,
+                          res=None, nodata=CLASS_NODATA, border=16, profile="compat", seed=0):
+    """
+    生成多期二值冻土数据（fused_{起始年}_{结束年}_TTOP.tif，1=冻土，0=非冻土）
+
+    冻土范围由随机场阈值决定，阈值逐期上移形成渐进退化，外加少量随机恢复像元；
+    四周 border 像元为nodata
+
+    :param crs: 坐标系（地理坐标系默认分辨率0.01°，投影坐标系默认1 km，与原始冻土数据一致）
+    :param origin: 左上角坐标 (x, y)，默认为经纬度 (90°E, 36°N) 在该坐标系下的位置
+    :return: 按时间排序的文件路径列表
+    """
+    crs = rasterio.crs.CRS.from_user_input(crs)
+    res = res or (0.01 if crs.is_geographic else 1000.0)
+    if origin is None:
+        xs, ys = transform_coords("EPSG:4326", crs, [90.0], [36.0])
+        origin = (xs[0], ys[0])
+    rng = np.random.default_rng(seed)
+    field = smooth_field((height, width), scale=128, seed=seed)
+    thresholds = np.quantile(field, 1 - np.linspace(initial_fraction, final_fraction, n_periods))
+    meta = write_profile({
+        "driver": "GTiff", "width": width, "height": height, "count": 1, "dtype": "uint8",
+        "crs": crs, "transform": from_origin(origin[0], origin[1], res, res), "nodata": nodata
+    }, profile)
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for k, threshold in enumerate(thresholds):
+        data = (field >= threshold).astype(np.uint8)
+        data[rng.random(data.shape) < 0.002] = 1  # 随机恢复
+        if border:
+            data[:border] = data[-border:] = nodata
+            data[:, :border] = data[:, -border:] = nodata
+        year = start_year + k * step
+        path = os.path.join(output_dir, f"fused_{year}_{year + step - 1}_TTOP.tif")
+        with rasterio.open(path, "w", **meta) as dst:
+            dst.write(data, 1)
+        paths.append(path)
+    return paths
+
+
+def make_cutline(path, bounds, crs="EPSG:4326", n_vertices=64, inset=0.1, roughness=0.25, seed=0):
+    """
+    在范围内生成不规则多边形裁剪边界（.shp / .gpkg / .geojson，按扩展名选择驱动）
+
+    :param bounds: (左, 下, 右, 上)
+    :param n_vertices: 顶点数
+    :param inset: 距离范围边缘的比例
+    :param roughness: 半径随机扰动幅度（0 为椭圆）
+    :return: 输出路径
+    """
+    rng = np.random.default_rng(seed)
+    left, bottom, right, top = bounds
+    cx, cy = (left + right) / 2, (bottom + top) / 2
+    rx, ry = (right - left) * (0.5 - inset), (top - bottom) * (0.5 - inset)
+
+    angles = np.linspace(0, 2 * np.pi, n_vertices, endpoint=False)
+    radius = 1 - roughness * rng.random(n_vertices)
+    ring = [(float(cx + rx * r * np.cos(a)), float(cy + ry * r * np.sin(a))) for a, r in zip(angles, radius)]
+    ring.append(ring[0])
+
+    drivers = {".shp": "ESRI Shapefile", ".gpkg": "GPKG", ".geojson": "GeoJSON", ".json": "GeoJSON"}
+    driver = drivers.get(os.path.splitext(path)[1].lower(), "ESRI Shapefile")
+    schema = {"geometry": "Polygon", "properties": {"id": "int"}}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with fiona.open(path, "w", driver=driver, crs=rasterio.crs.CRS.from_user_input(crs).to_wkt(),
+                    schema=schema) as dst:
+        dst.write({"geometry": {"type": "Polygon", "coordinates": [ring]}, "properties": {"id": 1}})
+    return path
@@ -0,0 +1,179 @@
+"""
+对齐栅格的通用逐块执行器：N 个网格一致的输入栅格 + 一个逐块函数 → 一个或多个输出栅格。
+网格只检查一次，按输出内部分块对齐的窗口遍历，窗口分发到进程池并行读取与计算，
+主进程按顺序写出（可同时累计类别统计），结束时报告吞吐量；全程只有在途窗口占用内存
+
+    from block_executor import map_blocks
+    map_blocks(fill_block, [frozen_path, base_path], output_path, masked=True)
+"""
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+from raster_io import gdal_env, with_gdal_env, write_profile
+from raster_stats import StatsAccumulator
+from tracing import span, traced
+
+SMALL_RASTER_PIXELS = 4096 * 4096
+
+
+def check_grid(input_paths):
+    """
+    检查输入栅格网格（坐标系、仿射变换、行列数）是否一致，只读取头信息
+
+    :return: 各输入的 meta 列表（dtype、nodata 等，逐块函数需要时据此确定参数）
+    """
+    metas = []
+    with rasterio.open(input_paths[0]) as ref:
+        metas.append(ref.meta)
+        for path in input_paths[1:]:
+            with rasterio.open(path) as src:
+                if src.shape != ref.shape or src.transform != ref.transform or src.crs != ref.crs:
+                    raise ValueError(f"{os.path.basename(path)} 与 {os.path.basename(input_paths[0])} 网格不一致")
+                metas.append(src.meta)
+    return metas
+
+
+def block_windows(height, width, block_size):
+    """覆盖全图的窗口，行优先（写出顺序与文件内部分块顺序一致）"""
+    return [
+        Window(col, row, min(block_size, width - col), min(block_size, height - row))
+        for row in range(0, height, block_size)
+        for col in range(0, width, block_size)
+    ]
+
+
+def _read_blocks(datasets, window, masked):
+    return [src.read(1, window=window, masked=masked) for src in datasets]
+
+
+def _as_outputs(result, n_outputs):
+    """逐块函数返回单个数组或数组元组，统一为列表并检查个数"""
+    outputs = list(result) if isinstance(result, (tuple, list)) else [result]
+    if len(outputs) != n_outputs:
+        raise ValueError(f"逐块函数返回 {len(outputs)} 个数组，但指定了 {n_outputs} 个输出")
+    return outputs
+
+
+# --------------------------
+# 工作进程：每个进程只打开一次全部输入
+# --------------------------
+_block_worker = {}
+
+
+def _init_block_worker(input_paths, func, params, masked, n_outputs):
+    # 进程常驻的 GDAL 环境；多进程并行时单进程内不再开多线程解压
+    env = gdal_env(GDAL_NUM_THREADS=1)
+    env.__enter__()
+    _block_worker.update(env=env, datasets=[rasterio.open(p) for p in input_paths], func=func, params=params,
+                         masked=masked, n_outputs=n_outputs)
+
+
+def _block_task(window_bounds):
+    w = _block_worker
+    window = Window(*window_bounds)
+    blocks = _read_blocks(w["datasets"], window, w["masked"])
+    return _as_outputs(w["func"](*blocks, **w["params"]), w["n_outputs"])
+
+
+@traced("block_executor.map_blocks")
+@with_gdal_env
+def map_blocks(func, input_paths, output_paths, output_meta=None, params=None, profile="class-uint8-fast",
+               block_size=None, num_workers=None, masked=False, stats=False):
+    """
+    对网格一致的输入栅格逐块执行 func 并写出结果
+
+    :param func: 逐块函数 func(*blocks, **params)，blocks 依次为各输入同一窗口的二维数组，
+                 返回单个数组（一个输出）或数组元组（多个输出）；多进程时需为模块级函数
+    :param input_paths: 输入栅格路径（单个路径或列表）
+    :param output_paths: 输出栅格路径（单个路径或列表）
+    :param output_meta: 输出元数据覆盖项（如 {"dtype": "int32", "nodata": -9999}），
+                        多个输出时可为列表；未覆盖的键取第一个输入
+    :param params: 传给 func 的关键字参数（如各输入的 nodata）
+    :param profile: 输出写出配置（见 raster_io.WRITE_PROFILES）
+    :param block_size: 窗口大小，默认输出分块的2倍（需为分块整数倍）
+    :param num_workers: 并行进程数，默认 CPU 核数（小栅格为1）；1 表示在当前进程内顺序执行
+    :param masked: 为 True 时按数据集掩膜读取为掩膜数组（与 read_masks 一致）
+    :param stats: 为 True 时写出类别统计标签与 .stats.json（见 raster_stats）
+    :return: {"blocks", "pixels", "seconds", "mpix_per_s", "outputs"}
+    """
+    input_paths = [input_paths] if isinstance(input_paths, str) else list(input_paths)
+    output_paths = [output_paths] if isinstance(output_paths, str) else list(output_paths)
+    output_meta = output_meta or {}
+    output_metas = output_meta if isinstance(output_meta, (list, tuple)) else [output_meta] * len(output_paths)
+    params = params or {}
+
+    ref_meta = check_grid(input_paths)[0]
+    metas = [write_profile(ref_meta, profile, count=1, **overrides) for overrides in output_metas]
+    tile = metas[0].get("blockxsize", 512)
+    block_size = block_size or tile * 2
+    windows = block_windows(ref_meta["height"], ref_meta["width"], block_size)
+    if num_workers is None:
+        # 小栅格（如 1km 冻土数据）进程池启动开销大于并行收益，直接顺序执行
+        num_workers = 1 if ref_meta["height"] * ref_meta["width"] < SMALL_RASTER_PIXELS else os.cpu_count() or 1
+    num_workers = min(num_workers, len(windows))
+
+    for path in output_paths:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    accumulators = [StatsAccumulator(m["dtype"], m.get("nodata")) for m in metas] if stats else []
+    dsts = [rasterio.open(path, "w", **meta) for path, meta in zip(output_paths, metas)]
+
+    def write(window, results):
+        with span("block_executor.write", row=window.row_off, col=window.col_off) as s:
+            for k, (dst, data) in enumerate(zip(dsts, results)):
+                data = np.asarray(data).astype(dst.dtypes[0], copy=False)
+                dst.write(data, 1, window=window)
+                if stats:
+                    accumulators[k].update(data)
+            s.set(bytes_written=sum(np.asarray(d).nbytes for d in results))
+
+    start = time.perf_counter()
+    try:
+        if num_workers <= 1:
+            datasets = [rasterio.open(p) for p in input_paths]
+            try:
+                for k, window in enumerate(windows, 1):
+                    blocks = _read_blocks(datasets, window, masked)
+                    write(window, _as_outputs(func(*blocks, **params), len(dsts)))
+                    print(f"\r进度: {k}/{len(windows)}", end="")
+            finally:
+                for src in datasets:
+                    src.close()
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_block_worker,
+                                     initargs=(input_paths, func, params, masked, len(dsts))) as executor:
+                # 在途窗口数有界，结果按提交顺序写出
+                pending = deque()
+                try:
+                    for k, window in enumerate(windows, 1):
+                        bounds = (window.col_off, window.row_off, window.width, window.height)
+                        pending.append((window, executor.submit(_block_task, bounds)))
+                        while len(pending) > num_workers * 2 or (k == len(windows) and pending):
+                            done_window, future = pending.popleft()
+                            write(done_window, future.result())
+                            print(f"\r进度: {k - len(pending)}/{len(windows)}", end="")
+                except BaseException:
+                    for _, future in pending:
+                        future.cancel()
+                    raise
+        print()
+        for dst, acc in zip(dsts, accumulators):
+            acc.write_tags(dst)
+    finally:
+        for dst in dsts:
+            dst.close()
+    for path, acc in zip(output_paths, accumulators):
+        acc.write_sidecar(path)
+
+    seconds = time.perf_counter() - start
+    pixels = ref_meta["height"] * ref_meta["width"]
+    report = {"blocks": len(windows), "pixels": pixels, "seconds": seconds,
+              "mpix_per_s": pixels / 1e6 / max(seconds, 1e-9), "outputs": output_paths}
+    print(f"{len(windows)} 个块，{num_workers} 个进程，耗时 {seconds:.2f}s，"
+          f"吞吐量 {report['mpix_per_s']:.1f} 百万像元/秒")
+    return report
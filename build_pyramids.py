@@ -2,7 +2,10 @@ import os
 import glob
 from osgeo import gdal
 
+from tracing import traced
 
+
+@traced("pyramids.build")
 def build_pyramids_for_clipped_data(clipped_dir):
     """
     为Clipped_Data目录中的所有TIFF文件建立金字塔
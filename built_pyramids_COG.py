@@ -2,7 +2,10 @@ import os
 import glob
 from osgeo import gdal
 
+from tracing import traced
 
+
+@traced("pyramids.build_cog")
 def build_pyramids_for_cog_data(clipped_dir):
     """
     专门处理COG格式的TIFF文件建立金字塔
@@ -0,0 +1,283 @@
+"""
+多期变化结果的稀疏存储：只保存首期稠密栅格（基准）和发生变化的像元事件
+(像元序号, 时段, 变化前值, 变化后值)，事件按 (像元, 时段) 排序，像元序号差分后按列压缩保存（.npz）。
+变化面积、逐时段计数与像元轨迹直接在事件上计算；任一期或任一对相邻时段的完整栅格按需重建
+
+    python change_events.py build E:\\GEOdata\\frozen_events.npz E:\\GEOdata\\pemefrost\\result1\\fused_*.tif
+    python change_events.py stats E:\\GEOdata\\frozen_events.npz
+"""
+import os
+import glob
+import json
+import argparse
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.crs import CRS
+from rasterio.transform import Affine, rowcol
+from rasterio.windows import Window, from_bounds
+
+from block_executor import check_grid
+from raster_io import with_gdal_env, write_profile
+from tracing import traced
+
+
+class ChangeEvents:
+    """
+    基准栅格 + 变化事件；时段 k（1..T-1）的事件表示第 k-1 期到第 k 期的像元值变化
+
+    :param baseline: 首期 (行, 列) 数组
+    :param pixel: 事件像元序号（行 * 列数 + 列），与 period 一起按升序排列
+    :param period: 事件时段
+    :param from_values: 变化前的值
+    :param to_values: 变化后的值
+    :param meta: transform、crs、nodata、labels（各期标签）
+    """
+
+    def __init__(self, baseline, pixel, period, from_values, to_values, meta):
+        self.baseline = baseline
+        self.pixel = pixel
+        self.period = period
+        self.from_values = from_values
+        self.to_values = to_values
+        self.labels = list(meta["labels"])
+        self.transform = Affine(*meta["transform"][:6])
+        self.crs = CRS.from_wkt(meta["crs"]) if meta.get("crs") else None
+        self.nodata = meta.get("nodata")
+        self._raster = lru_cache(maxsize=4)(self._build_raster)
+
+    @property
+    def shape(self):
+        return self.baseline.shape
+
+    @property
+    def n_periods(self):
+        return len(self.labels)
+
+    @property
+    def pixel_area_km2(self):
+        return abs(self.transform.a * self.transform.e) / 1e6
+
+    def __len__(self):
+        return self.pixel.size
+
+    # --------------------------
+    # 读写
+    # --------------------------
+    def save(self, path):
+        """保存为压缩 .npz：像元序号按差分存储（排序后差值很小，压缩率高）"""
+        deltas = np.diff(self.pixel, prepend=0)
+        deltas = deltas.astype(np.min_scalar_type(int(deltas.max())) if deltas.size else np.uint8)
+        meta = {"labels": self.labels, "transform": list(self.transform)[:6],
+                "crs": self.crs.to_wkt() if self.crs else None, "nodata": self.nodata}
+        np.savez_compressed(path, baseline=self.baseline, pixel_delta=deltas, period=self.period,
+                            from_values=self.from_values, to_values=self.to_values,
+                            meta=np.array(json.dumps(meta, ensure_ascii=False)))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            pixel = np.cumsum(z["pixel_delta"], dtype=np.int64)
+            return cls(z["baseline"], pixel, z["period"], z["from_values"], z["to_values"],
+                       json.loads(str(z["meta"])))
+
+    def meta(self, dtype=None, nodata=None):
+        """与 rasterio 数据集 meta 相同结构的元数据（用于写出重建栅格）"""
+        return {"driver": "GTiff", "dtype": dtype or self.baseline.dtype.name,
+                "nodata": self.nodata if nodata is None else nodata, "width": self.shape[1],
+                "height": self.shape[0], "count": 1, "crs": self.crs, "transform": self.transform}
+
+    # --------------------------
+    # 直接在事件上查询
+    # --------------------------
+    def _select(self, periods=None, from_value=None, to_value=None, window=None, bounds=None):
+        """符合条件的事件布尔索引；window/bounds 限定空间范围（按行二分查找，不扫描全部事件）"""
+        keep = np.ones(self.pixel.size, dtype=bool)
+        if bounds is not None:
+            window = from_bounds(*bounds, transform=self.transform).round_offsets().round_lengths()
+        if window is not None:
+            keep[:] = False
+            r0, c0 = max(int(window.row_off), 0), max(int(window.col_off), 0)
+            r1 = min(int(window.row_off + window.height), self.shape[0])
+            c1 = min(int(window.col_off + window.width), self.shape[1])
+            width = self.shape[1]
+            rows = np.arange(r0, r1)
+            starts = np.searchsorted(self.pixel, rows * width + c0)
+            ends = np.searchsorted(self.pixel, rows * width + c1)
+            for s, e in zip(starts, ends):
+                keep[s:e] = True
+        if periods is not None:
+            keep &= np.isin(self.period, np.atleast_1d(periods))
+        if from_value is not None:
+            keep &= self.from_values == from_value
+        if to_value is not None:
+            keep &= self.to_values == to_value
+        return keep
+
+    def change_area(self, periods=None, from_value=None, to_value=None, window=None, bounds=None):
+        """
+        变化像元数与面积（km²），如 from_value=1, to_value=0 为冻土退化
+
+        :param periods: 时段（单个或列表），默认全部
+        :param window: 行列窗口；bounds: (xmin, ymin, xmax, ymax) 存储坐标系范围
+        :return: (变化事件数, 面积km², 涉及的不重复像元数)
+        """
+        keep = self._select(periods, from_value, to_value, window, bounds)
+        n_events = int(keep.sum())
+        n_pixels = int(np.unique(self.pixel[keep]).size)
+        return n_events, n_events * self.pixel_area_km2, n_pixels
+
+    def period_counts(self, from_value=None, to_value=None):
+        """逐时段变化像元数与面积"""
+        keep = self._select(None, from_value, to_value)
+        counts = np.bincount(self.period[keep], minlength=self.n_periods)[1:]
+        return pd.DataFrame({
+            "period": np.arange(1, self.n_periods),
+            "from_label": self.labels[:-1],
+            "to_label": self.labels[1:],
+            "pixels": counts,
+            "area_km2": counts * self.pixel_area_km2,
+        })
+
+    def transition_table(self, periods=None):
+        """各时段的 (变化前, 变化后) 转移像元数"""
+        keep = self._select(periods)
+        df = pd.DataFrame({"period": self.period[keep], "from": self.from_values[keep], "to": self.to_values[keep]})
+        table = df.groupby(["period", "from", "to"]).size().rename("pixels").reset_index()
+        table["area_km2"] = table["pixels"] * self.pixel_area_km2
+        return table
+
+    def trajectory(self, row, col):
+        """单个像元各期的值（基准值 + 按时段依次应用变化）"""
+        return self.trajectories([row], [col])[:, 0]
+
+    def trajectory_at(self, x, y):
+        row, col = rowcol(self.transform, x, y)
+        return self.trajectory(row, col)
+
+    def trajectories(self, rows, cols):
+        """多个像元的轨迹 (期数, 像元数)，每个像元二分查找其事件"""
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        out = np.repeat(self.baseline[rows, cols][None, :], self.n_periods, axis=0)
+        index = rows.astype(np.int64) * self.shape[1] + cols
+        starts = np.searchsorted(self.pixel, index, side="left")
+        ends = np.searchsorted(self.pixel, index, side="right")
+        for j, (s, e) in enumerate(zip(starts, ends)):
+            for k in range(s, e):
+                out[self.period[k]:, j] = self.to_values[k]
+        return out
+
+    # --------------------------
+    # 按需重建稠密栅格
+    # --------------------------
+    def _build_raster(self, k):
+        data = self.baseline.copy()
+        if k > 0:
+            keep = self.period <= k
+            pixel, values = self.pixel[keep], self.to_values[keep]
+            # 同一像元的事件按时段升序，取每个像元的最后一个事件
+            last = np.ones(pixel.size, dtype=bool)
+            last[:-1] = pixel[1:] != pixel[:-1]
+            data.reshape(-1)[pixel[last]] = values[last]
+        return data
+
+    def raster(self, k):
+        """第 k 期（0 为基准）的完整栅格（只读，最近使用的几期会缓存）"""
+        if not 0 <= k < self.n_periods:
+            raise IndexError(f"时段序号超出范围: {k}")
+        data = self._raster(k)
+        data.flags.writeable = False
+        return data
+
+    def pair_raster(self, k, func, **params):
+        """第 k 时段（第 k-1 期 → 第 k 期）的完整变化栅格：func(前期, 后期, **params)"""
+        return func(self.raster(k - 1), self.raster(k), **params)
+
+    def write_raster(self, k, output_path, profile="class-uint8-fast"):
+        """将第 k 期重建栅格写出为 GeoTIFF"""
+        meta = write_profile(self.meta(), profile)
+        with rasterio.open(output_path, "w", **meta) as dst:
+            dst.write(self.raster(k), 1)
+        return output_path
+
+
+@traced("change_events.build")
+@with_gdal_env
+def build_change_events(raster_paths, labels=None, block_rows=512):
+    """
+    由多期网格一致的栅格构建稀疏变化事件（按行条带读取，内存只占一个条带的全部期数）
+
+    :param raster_paths: 按时间排序的栅格路径
+    :param labels: 各期标签，默认使用文件名
+    :param block_rows: 每次读取的行数
+    :return: ChangeEvents
+    """
+    if len(raster_paths) < 2:
+        raise ValueError("至少需要两期栅格数据")
+    ref_meta = check_grid(raster_paths)[0]
+    height, width = ref_meta["height"], ref_meta["width"]
+    labels = labels or [os.path.splitext(os.path.basename(p))[0] for p in raster_paths]
+
+    baseline = np.empty((height, width), dtype=ref_meta["dtype"])
+    parts = []
+    sources = [rasterio.open(p) for p in raster_paths]
+    try:
+        for row in range(0, height, block_rows):
+            window = Window(0, row, width, min(block_rows, height - row))
+            stack = np.stack([src.read(1, window=window) for src in sources])
+            baseline[row:row + stack.shape[1]] = stack[0]
+
+            # 变化掩膜转为 (行, 列, 时段) 后取非零位置，事件即按 (像元, 时段) 排序
+            changed = np.moveaxis(stack[1:] != stack[:-1], 0, -1)
+            r, c, t = np.nonzero(changed)
+            parts.append((
+                (r + row).astype(np.int64) * width + c,
+                (t + 1).astype(np.uint16),
+                stack[t, r, c],
+                stack[t + 1, r, c],
+            ))
+            print(f"\r进度: {min(row + block_rows, height) / height:.1%}", end="")
+        print()
+    finally:
+        for src in sources:
+            src.close()
+
+    pixel, period, from_values, to_values = (np.concatenate(cols) for cols in zip(*parts))
+    if len(raster_paths) < 256:
+        period = period.astype(np.uint8)
+    meta = {"labels": labels, "transform": list(ref_meta["transform"])[:6],
+            "crs": ref_meta["crs"].to_wkt() if ref_meta.get("crs") else None, "nodata": ref_meta.get("nodata")}
+    events = ChangeEvents(baseline, pixel, period, from_values, to_values, meta)
+    print(f"{len(raster_paths)} 期 {height}×{width}，变化事件 {len(events)} 个"
+          f"（占像元·时段的 {len(events) / (height * width * (len(raster_paths) - 1)):.2%}）")
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多期变化结果的稀疏事件存储")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="由多期栅格构建事件存储")
+    p_build.add_argument("store", help="输出 .npz")
+    p_build.add_argument("inputs", nargs="+", help="栅格路径或通配符（按文件名排序）")
+    p_stats = sub.add_parser("stats", help="逐时段变化统计")
+    p_stats.add_argument("store")
+    p_stats.add_argument("--from-value", type=int)
+    p_stats.add_argument("--to-value", type=int)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        paths = sorted(p for pattern in args.inputs for p in glob.glob(pattern))
+        events = build_change_events(paths)
+        events.save(args.store)
+        dense_mb = sum(os.path.getsize(p) for p in paths) / 1024 ** 2
+        print(f"事件存储 {os.path.getsize(args.store) / 1024 ** 2:.1f}MB（原始栅格 {dense_mb:.1f}MB）")
+    else:
+        events = ChangeEvents.load(args.store)
+        print(events.period_counts(args.from_value, args.to_value).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.windows import Window
+from scipy import stats
+
+from raster_io import with_gdal_env, write_profile
+from tracing import traced
+from trend_engine import _read_stack, parse_period_year
+
+CHANGEPOINT_NODATA = -9999.0
+
+
+# --------------------------
+# 1. 分段线性拟合（动态规划 / PELT）
+# --------------------------
+class _SegmentCost:
+    """基于累积和的分段线性回归残差平方和，任意区间 O(1) 计算"""
+
+    def __init__(self, x, y):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        zero = np.zeros(1)
+        self.n = x.size
+        self.sx = np.concatenate([zero, np.cumsum(x)])
+        self.sy = np.concatenate([zero, np.cumsum(y)])
+        self.sxx = np.concatenate([zero, np.cumsum(x * x)])
+        self.sxy = np.concatenate([zero, np.cumsum(x * y)])
+        self.syy = np.concatenate([zero, np.cumsum(y * y)])
+
+    def fit(self, start, end):
+        """区间 [start, end) 的线性拟合，返回 (斜率, 截距, 残差平方和)"""
+        m = end - start
+        sx = self.sx[end] - self.sx[start]
+        sy = self.sy[end] - self.sy[start]
+        cxx = self.sxx[end] - self.sxx[start] - sx * sx / m
+        cxy = self.sxy[end] - self.sxy[start] - sx * sy / m
+        cyy = self.syy[end] - self.syy[start] - sy * sy / m
+        slope = cxy / cxx if cxx > 0 else 0.0
+        intercept = (sy - slope * sx) / m
+        sse = max(cyy - slope * cxy, 0.0)
+        return slope, intercept, sse
+
+    def cost(self, start, end):
+        return self.fit(start, end)[2]
+
+
+def optimal_partition(x, y, n_segments, min_size=3):
+    """
+    动态规划求给定段数的最优分段线性拟合（全局最优）
+
+    :param x: 时间
+    :param y: 观测值
+    :param n_segments: 段数
+    :param min_size: 每段最少点数
+    :return: 各段起点索引列表（不含0）
+    """
+    cost = _SegmentCost(x, y)
+    n = cost.n
+    if n_segments * min_size > n:
+        raise ValueError(f"{n}个点无法分为{n_segments}段（每段至少{min_size}个点）")
+
+    # best[k][j]：前j个点分为k段的最小残差；prev 记录回溯位置
+    best = np.full((n_segments + 1, n + 1), np.inf)
+    prev = np.zeros((n_segments + 1, n + 1), dtype=np.int64)
+    best[0, 0] = 0.0
+    for k in range(1, n_segments + 1):
+        for j in range(k * min_size, n + 1):
+            for i in range((k - 1) * min_size, j - min_size + 1):
+                if np.isinf(best[k - 1, i]):
+                    continue
+                value = best[k - 1, i] + cost.cost(i, j)
+                if value < best[k, j]:
+                    best[k, j] = value
+                    prev[k, j] = i
+
+    breaks = []
+    j = n
+    for k in range(n_segments, 0, -1):
+        j = prev[k, j]
+        if j > 0:
+            breaks.append(int(j))
+    return sorted(breaks)
+
+
+def default_penalty(y, n_params=3):
+    """
+    BIC型惩罚：噪声方差用二阶差分的MAD稳健估计。
+    一阶差分会把趋势斜率的变化计入噪声，惩罚偏大、漏检突变点；
+    二阶差分消去分段内的线性趋势，只在突变点附近受影响（MAD对此稳健），白噪声下方差为 6σ²。
+    噪声不再被高估，突变明显的长序列上更容易多检出突变点
+    """
+    y = np.asarray(y, dtype=np.float64)
+    diff2 = np.diff(y, 2)
+    sigma = 1.4826 * np.median(np.abs(diff2 - np.median(diff2))) / np.sqrt(6) if diff2.size else 0.0
+    if sigma <= 0:
+        sigma = np.std(diff2) / np.sqrt(6) if diff2.size else 1.0
+    return n_params * np.log(y.size) * max(sigma, 1e-12) ** 2
+
+
+def pelt(x, y, penalty=None, min_size=3):
+    """
+    PELT算法（带剪枝的最优分割），段数由惩罚项自动确定
+
+    :param x: 时间
+    :param y: 观测值
+    :param penalty: 每增加一段的惩罚，默认 default_penalty(y)
+    :param min_size: 每段最少点数
+    :return: 各段起点索引列表（不含0）
+    """
+    cost = _SegmentCost(x, y)
+    n = cost.n
+    penalty = default_penalty(y) if penalty is None else penalty
+
+    f = np.full(n + 1, np.inf)
+    f[0] = -penalty
+    last = np.zeros(n + 1, dtype=np.int64)
+    candidates = [0]
+    for t in range(min_size, n + 1):
+        admissible = [s for s in candidates if t - s >= min_size]
+        if not admissible:
+            continue
+        values = [f[s] + cost.cost(s, t) + penalty for s in admissible]
+        best = int(np.argmin(values))
+        f[t] = values[best]
+        last[t] = admissible[best]
+
+        # 剪枝：不可能成为最优的候选点不再考虑
+        candidates = [s for s, v in zip(admissible, values) if v - penalty <= f[t]] + \
+                     [s for s in candidates if t - s < min_size]
+        candidates.append(t)
+
+    breaks = []
+    t = n
+    while t > 0:
+        t = int(last[t])
+        if t > 0:
+            breaks.append(t)
+    return sorted(breaks)
+
+
+# --------------------------
+# 2. Pettitt突变检验
+# --------------------------
+def pettitt_test(y):
+    """
+    Pettitt非参数突变检验
+
+    :param y: 序列
+    :return: (突变位置索引k：前k+1个点为第一段, 统计量K, 近似P值)
+    """
+    index, k_stat, p_value = pettitt_stack(np.asarray(y, dtype=np.float64)[:, None])
+    return int(index[0]), float(k_stat[0]), float(p_value[0])
+
+
+def pettitt_stack(stack):
+    """
+    沿时间轴向量化的Pettitt检验
+
+    U_t = 2 * Σ_{i≤t} r_i - t(n+1)，r 为秩（结值取平均秩）
+
+    :param stack: (T, N) 数组
+    :return: index, K, p_value，均为长度N的数组
+    """
+    n = stack.shape[0]
+    ranks = stats.rankdata(stack, axis=0)
+    t = np.arange(1, n)[:, None]
+    u = 2 * np.cumsum(ranks, axis=0)[:-1] - t * (n + 1)
+    abs_u = np.abs(u)
+    index = np.argmax(abs_u, axis=0)
+    k_stat = abs_u[index, np.arange(stack.shape[1])]
+    p_value = np.minimum(1.0, 2 * np.exp(-6 * k_stat ** 2 / (n ** 3 + n ** 2)))
+    return index, k_stat, p_value
+
+
+# --------------------------
+# 3. 面积序列突变/加速点分析
+# --------------------------
+def segment_table(x, y, breaks):
+    """根据分段起点计算每段的年均变化速率"""
+    cost = _SegmentCost(x, y)
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    bounds = [0] + list(breaks) + [len(x)]
+
+    rows = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        slope, intercept, sse = cost.fit(start, end)
+        rows.append({
+            'start_year': x[start],
+            'end_year': x[end - 1],
+            'n_points': end - start,
+            'rate_km2_per_year': slope,
+            'intercept': intercept,
+            'mean_area_km2': y[start:end].mean(),
+            'sse': sse
+        })
+
+    segments = pd.DataFrame(rows)
+    # 加速：与上一段相比速率绝对值增大
+    segments['accelerated'] = segments['rate_km2_per_year'].abs().diff() > 0
+    return segments
+
+
+def detect_breakpoints(df, x_col='end_year', y_col='frozen_area_km2', method='pelt',
+                       n_breaks=None, penalty=None, min_size=3):
+    """
+    对 analyze_frozen_trend 输出的面积表进行突变点（加速点）检测
+
+    :param df: 面积DataFrame（含 x_col、y_col 列）
+    :param method: 'pelt'（自动确定段数）或 'dp'（指定 n_breaks 的动态规划最优分段）
+    :param n_breaks: method='dp' 时的突变点个数
+    :param penalty: PELT惩罚项
+    :param min_size: 每段最少点数
+    :return: dict，包含 breakpoints（各新段起始年份）、segments（分段速率表）、pettitt（突变检验）
+    """
+    data = df[[x_col, y_col]].dropna().sort_values(x_col)
+    x = data[x_col].to_numpy(dtype=np.float64)
+    y = data[y_col].to_numpy(dtype=np.float64)
+
+    if method == 'dp':
+        if n_breaks is None:
+            raise ValueError("method='dp' 需要指定 n_breaks")
+        breaks = optimal_partition(x, y, n_breaks + 1, min_size=min_size)
+    elif method == 'pelt':
+        breaks = pelt(x, y, penalty=penalty, min_size=min_size)
+    else:
+        raise ValueError(f"不支持的方法: {method}")
+
+    index, k_stat, p_value = pettitt_test(y)
+    return {
+        'breakpoints': [int(x[b]) for b in breaks],
+        'segments': segment_table(data[x_col].to_numpy(), y, breaks),
+        'pettitt': {
+            'change_year': int(x[index]),
+            'K': k_stat,
+            'p_value': p_value,
+            'significant': p_value < 0.05
+        }
+    }
+
+
+def load_frozen_area(csv_path):
+    """读取 frozen_trend61-20.analyze_frozen_trend 保存的面积统计表"""
+    df = pd.read_csv(csv_path, encoding='utf-8-sig')
+    return df.sort_values('end_year').reset_index(drop=True)
+
+
+# --------------------------
+# 4. 逐像元突变检测
+# --------------------------
+def _changepoint_block(stack, times, valid):
+    n_time, rows, cols = stack.shape
+    flat = stack.reshape(n_time, -1).astype(np.float64)
+    valid_flat = valid.reshape(-1)
+
+    change_year = np.full(flat.shape[1], CHANGEPOINT_NODATA, dtype=np.float32)
+    p_out = np.full(flat.shape[1], CHANGEPOINT_NODATA, dtype=np.float32)
+    shift = np.full(flat.shape[1], CHANGEPOINT_NODATA, dtype=np.float32)
+
+    if valid_flat.any():
+        series = flat[:, valid_flat]
+        index, _, p_value = pettitt_stack(series)
+
+        # 突变前后均值差（后 - 前）
+        cumsum = np.cumsum(series, axis=0)
+        cols_idx = np.arange(series.shape[1])
+        before = cumsum[index, cols_idx] / (index + 1)
+        after = (cumsum[-1] - cumsum[index, cols_idx]) / (n_time - index - 1)
+
+        # 序列无变化的像元不存在突变
+        constant = np.all(series == series[0], axis=0)
+        change_year[valid_flat] = np.where(constant, 0, times[index])
+        p_out[valid_flat] = np.where(constant, 1.0, p_value)
+        shift[valid_flat] = np.where(constant, 0, after - before)
+
+    return {
+        'change_year': change_year.reshape(rows, cols),
+        'pettitt_p': p_out.reshape(rows, cols),
+        'mean_shift': shift.reshape(rows, cols)
+    }
+
+
+@traced("statistics.pixel_changepoint")
+@with_gdal_env
+def pixel_changepoint_rasters(raster_paths, output_dir, times=None, prefix="changepoint",
+                              block_size=512, num_workers=4, profile="float-fast"):
+    """
+    逐像元Pettitt突变检测，输出突变年份（突变前最后一期，0表示无变化）、P值和突变前后均值差栅格
+
+    :param raster_paths: 按时间排序的栅格路径
+    :param output_dir: 输出文件夹
+    :param times: 各期时间，默认从文件名解析
+    :param prefix: 输出文件名前缀
+    :param block_size: 分块大小
+    :param num_workers: 计算线程数
+    :param profile: 输出写出配置（见 raster_io.WRITE_PROFILES）
+    :return: {指标名: 输出路径}
+    """
+    if len(raster_paths) < 3:
+        raise ValueError("突变检测至少需要3期数据")
+    if times is None:
+        times = [parse_period_year(os.path.basename(p)) for p in raster_paths]
+    times = np.asarray(times, dtype=np.float64)
+    os.makedirs(output_dir, exist_ok=True)
+
+    sources = [rasterio.open(p) for p in raster_paths]
+    try:
+        ref = sources[0]
+        for src, path in zip(sources[1:], raster_paths[1:]):
+            if src.shape != ref.shape or src.transform != ref.transform or src.crs != ref.crs:
+                raise ValueError(f"{os.path.basename(path)} 与第一期数据网格不一致")
+
+        meta = write_profile(ref.meta, profile, count=1, dtype="float32", nodata=CHANGEPOINT_NODATA)
+        names = ['change_year', 'pettitt_p', 'mean_shift']
+        output_paths = {name: os.path.join(output_dir, f"{prefix}_{name}.tif") for name in names}
+        dsts = {name: rasterio.open(path, "w", **meta) for name, path in output_paths.items()}
+
+        windows = [
+            Window(col, row, min(block_size, ref.width - col), min(block_size, ref.height - row))
+            for row in range(0, ref.height, block_size)
+            for col in range(0, ref.width, block_size)
+        ]
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+                pending = deque()
+                for k, window in enumerate(windows, 1):
+                    stack, valid = _read_stack(sources, window)
+                    pending.append((window, executor.submit(_changepoint_block, stack, times, valid)))
+                    while len(pending) > max(1, num_workers) * 2 or (k == len(windows) and pending):
+                        done_window, future = pending.popleft()
+                        for name, value in future.result().items():
+                            dsts[name].write(value, 1, window=done_window)
+                    print(f"\r突变检测进度: {k / len(windows):.1%}", end="")
+        finally:
+            for dst in dsts.values():
+                dst.close()
+        print()
+    finally:
+        for src in sources:
+            src.close()
+
+    return output_paths
+
+
+if __name__ == "__main__":
+    analysis_dir = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\analysis"
+    area_df = load_frozen_area(os.path.join(analysis_dir, "冻土面积统计.csv"))
+
+    result = detect_breakpoints(area_df, method='pelt')
+    print(f"突变点（加速点）年份: {result['breakpoints']}")
+    print(result['segments'].to_string(index=False))
+    pettitt = result['pettitt']
+    print(f"Pettitt检验: 突变年份={pettitt['change_year']}, K={pettitt['K']:.0f}, P={pettitt['p_value']:.4f}")
+
+    result['segments'].to_csv(os.path.join(analysis_dir, "冻土面积分段速率.csv"), index=False, encoding='utf-8-sig')
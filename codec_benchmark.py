@@ -0,0 +1,162 @@
+import os
+import json
+import shutil
+import tempfile
+import itertools
+import numpy as np
+import pandas as pd
+import rasterio
+from datetime import datetime
+
+from raster_io import gdal_env, load_sample, measure_layout, random_windows
+
+# 各压缩方法及其压缩级别参数（None 表示无级别参数）
+CODEC_LEVELS = {
+    "none": (None, [None]),
+    "packbits": (None, [None]),
+    "lzw": (None, [None]),
+    "deflate": ("zlevel", [1, 6, 9]),
+    "zstd": ("zstd_level", [1, 9, 19]),
+    "lerc": ("max_z_error", [0]),  # max_z_error=0 为无损
+    "lerc_zstd": ("max_z_error", [0]),
+}
+# 不支持预测器的压缩方法
+NO_PREDICTOR = ("none", "packbits", "lerc", "lerc_zstd")
+
+
+def codec_grid(codecs=None, predictors=(1, 2), block_sizes=(256, 512, 1024)):
+    """
+    生成待测组合列表：压缩方法 × 级别 × 预测器 × 分块大小
+
+    :param codecs: 压缩方法列表，默认 CODEC_LEVELS 全部
+    :param predictors: 预测器（1 无，2 水平差分，3 浮点）
+    :param block_sizes: 分块边长；0 表示条带存储（不分块）
+    :return: [{codec, level, predictor, block}, ...]
+    """
+    grid = []
+    for codec in codecs or list(CODEC_LEVELS):
+        if codec not in CODEC_LEVELS:
+            raise ValueError(f"未知的压缩方法: {codec}")
+        _, levels = CODEC_LEVELS[codec]
+        codec_predictors = (1,) if codec in NO_PREDICTOR else predictors
+        for level, predictor, block in itertools.product(levels, codec_predictors, block_sizes):
+            grid.append({"codec": codec, "level": level, "predictor": predictor, "block": block})
+    return grid
+
+
+def creation_options(meta, codec, level=None, predictor=1, block=512):
+    """单个组合对应的写出参数"""
+    out = {k: v for k, v in meta.items()
+           if k not in ("compress", "tiled", "blockxsize", "blockysize", "predictor", "interleave")}
+    out.update({"driver": "GTiff", "count": 1, "bigtiff": "IF_SAFER"})
+    if codec != "none":
+        out["compress"] = codec
+    level_key, _ = CODEC_LEVELS[codec]
+    if level_key and level is not None:
+        out[level_key] = level
+    if predictor and predictor > 1:
+        out["predictor"] = predictor
+    if block:
+        out.update({"tiled": True, "blockxsize": block, "blockysize": block})
+    else:
+        out.update({"tiled": False, "blockysize": max(1, min(meta["height"], 8192 // max(1, meta["width"]) or 1))})
+    return out
+
+
+def run_codec_benchmark(sample, output_dir=None, codecs=None, predictors=(1, 2), block_sizes=(256, 512, 1024),
+                        max_size=4096, repeats=3, n_windows=100, window_size=256, seed=0):
+    """
+    分类栅格压缩方法基准测试：压缩后大小、写出时间、整幅读取时间、随机窗口读取延迟
+
+    :param sample: 样本栅格路径或二维数组（取左上角最多 max_size×max_size）
+    :param output_dir: 结果输出目录（codec_benchmark.csv / .json），为空则不保存
+    :param codecs: 压缩方法列表
+    :param predictors: 预测器列表
+    :param block_sizes: 分块大小列表（0 表示条带）
+    :param max_size: 样本最大边长
+    :param repeats: 每个组合重复次数（取最快一次）
+    :param n_windows: 随机窗口读取次数
+    :param window_size: 随机窗口边长
+    :return: DataFrame（按文件大小升序）
+    """
+    data, meta = load_sample(sample, max_size)
+    windows = random_windows(data.shape, window_size, n_windows, seed)
+    grid = codec_grid(codecs, predictors, block_sizes)
+
+    rows = []
+    skipped = []
+    tmp_dir = tempfile.mkdtemp(prefix="codec_bench_")
+    try:
+        # 缓存设小，避免整幅读取直接命中写出时的块缓存
+        with gdal_env(GDAL_CACHEMAX=32):
+            for k, combo in enumerate(grid, 1):
+                path = os.path.join(tmp_dir, "sample.tif")
+                try:
+                    result = measure_layout(data, creation_options(meta, **combo), path, windows, repeats)
+                except rasterio.errors.RasterioError as e:
+                    # 当前GDAL未编译该压缩方法或参数不适用于此数据类型
+                    skipped.append({**combo, "error": str(e)})
+                    continue
+                rows.append({**combo, **result})
+                print(f"\r压缩方法测试进度: {k}/{len(grid)}", end="")
+        print()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    results = pd.DataFrame(rows)
+    if results.empty:
+        raise RuntimeError("所有压缩组合均不可用")
+    results["level"] = results["level"].map(lambda v: "-" if pd.isna(v) else int(v))
+    results["block"] = results["block"].map(lambda b: b if b else "strip")
+    results = results.sort_values(["size_mb", "read_s"]).reset_index(drop=True)
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        results.to_csv(os.path.join(output_dir, "codec_benchmark.csv"), index=False)
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "gdal_version": rasterio.__gdal_version__,
+            "sample": sample if isinstance(sample, str) else "array",
+            "shape": list(data.shape),
+            "dtype": data.dtype.name,
+            "raw_mb": data.nbytes / 1024 ** 2,
+            "repeats": repeats,
+            "window_size": window_size,
+            "n_windows": len(windows),
+            "recommended": recommend(results),
+            "results": json.loads(results.to_json(orient="records")),
+            "skipped": skipped,
+        }
+        with open(os.path.join(output_dir, "codec_benchmark.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"压缩方法测试结果已保存至: {output_dir}")
+
+    return results
+
+
+def recommend(results):
+    """从测试结果中给出各目标下的推荐组合"""
+    columns = ["codec", "level", "predictor", "block"]
+
+    def pick(row):
+        return {c: (row[c].item() if hasattr(row[c], "item") else row[c]) for c in columns}
+
+    balanced = np.sqrt(results["write_mb_s"] * results["read_mb_s"]) * results["ratio"]
+    return {
+        "smallest": pick(results.loc[results["size_mb"].idxmin()]),
+        "fastest_write": pick(results.loc[results["write_mb_s"].idxmax()]),
+        "fastest_read": pick(results.loc[results["read_mb_s"].idxmax()]),
+        "lowest_window_latency": pick(results.loc[results["window_ms"].idxmin()]),
+        "balanced": pick(results.loc[balanced.idxmax()]),
+    }
+
+
+if __name__ == "__main__":
+    # 以ESA WorldCover拼接结果为样本
+    sample_path = r"E:\GEOdata\LUCC\ESA_WorldCover\merged_worldcover.tif"
+    output_folder = r"E:\GEOdata\LUCC\ESA_WorldCover\codec_benchmark"
+
+    table = run_codec_benchmark(sample_path, output_folder)
+    pd.set_option("display.width", 200)
+    print(table.to_string(index=False))
+    print(json.dumps(recommend(table), ensure_ascii=False, indent=2))
@@ -1,8 +1,13 @@
 import os
+import sys
 import glob
 from osgeo import gdal
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracing import traced
 
+
+@traced("pyramids.build")
 def build_pyramids_for_clipped_data(clipped_dir):
     """
     为Clipped_Data目录中的所有TIFF文件建立金字塔
@@ -1,7 +1,12 @@
 import os
+import sys
 from osgeo import gdal, osr
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracing import traced
 
+
+@traced("reproject.file", resources=False)
 def reproject_raster(input_path, output_path):
     """
     将栅格数据从WGS84投影到Albers等积圆锥投影（使用最邻近法）
@@ -48,6 +53,7 @@ def reproject_raster(input_path, output_path):
     output_ds = None
 
 
+@traced("reproject.batch")
 def batch_reproject(input_dir, output_dir):
     """
     批量处理1992-2015年的土地利用分类数据
@@ -0,0 +1,111 @@
+import os
+import time
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+# 无界面后端：批量出图时不弹窗、不阻塞
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.colors import BoundaryNorm, ListedColormap
+
+CHINESE_FONTS = ("SimHei", "Microsoft YaHei", "Heiti TC")
+PREFERRED_STYLES = (
+    'seaborn-v0_8',  # 最接近原始seaborn样式
+    'seaborn-v0_8-darkgrid',  # 带灰色网格
+    'ggplot',  # R语言ggplot2风格
+    'fivethirtyeight',  # 538网站风格
+    'bmh',  # Bayesian Methods for Hackers风格
+    'default'  # 最后回退到默认
+)
+
+
+# 出图进程的字体设置（init_worker 写入，每个任务进入样式上下文后重新应用）
+_font_rc = {}
+
+
+def font_rc(font_family=CHINESE_FONTS, font_size=10):
+    """中文字体相关的 rcParams"""
+    return {
+        "font.family": list(font_family),
+        "axes.unicode_minus": False,  # 正确显示负号
+        "font.size": font_size,
+    }
+
+
+def configure_fonts(font_family=CHINESE_FONTS, font_size=10):
+    """
+    设置中文字体。不缓存：seaborn 等样式会把 font.family 重置为 sans-serif，
+    进入样式上下文后需要重新设置
+    """
+    plt.rcParams.update(font_rc(font_family, font_size))
+    return True
+
+
+@lru_cache(maxsize=None)
+def get_style(preferred_order=PREFERRED_STYLES):
+    """从可用样式中选择第一个可用的绘图样式（结果缓存）"""
+    return next((style for style in preferred_order if style in plt.style.available), 'default')
+
+
+@lru_cache(maxsize=None)
+def get_listed_cmap(colors):
+    """缓存的离散颜色映射，colors 为颜色元组"""
+    return ListedColormap(list(colors))
+
+
+@lru_cache(maxsize=None)
+def get_boundary_norm(bounds, ncolors):
+    """缓存的分段归一化对象，bounds 为边界元组"""
+    return BoundaryNorm(list(bounds), ncolors)
+
+
+def init_worker(font_family=CHINESE_FONTS, font_size=10):
+    """出图进程初始化：加载字体设置并预热样式缓存"""
+    _font_rc.clear()
+    _font_rc.update(font_rc(font_family, font_size))
+    configure_fonts(font_family, font_size)
+    get_style()
+
+
+def _run_job(job):
+    """执行单个出图任务，返回 (输出路径, 耗时秒)"""
+    func, args, kwargs = job
+    start = time.perf_counter()
+    try:
+        # 样式在前、字体在后：样式中的 font.family 不覆盖中文字体
+        with plt.style.context(kwargs.pop("style", get_style())), plt.rc_context(_font_rc):
+            output_path = func(*args, **kwargs)
+    finally:
+        plt.close("all")
+    return output_path, time.perf_counter() - start
+
+
+def render_figures(jobs, num_workers=None, font_family=CHINESE_FONTS, font_size=10):
+    """
+    在无界面（Agg）进程池中并行生成一批图表
+
+    :param jobs: 任务列表，元素为 (绘图函数, 位置参数元组, 关键字参数字典)；
+                 绘图函数需定义在模块顶层，负责保存图片并返回输出路径
+    :param num_workers: 进程数，默认 CPU 核数
+    :param font_family: 字体列表
+    :param font_size: 默认字号
+    :return: 各任务的输出路径列表（与 jobs 顺序一致）
+    """
+    jobs = [(func, tuple(args), dict(kwargs or {})) for func, args, kwargs in jobs]
+    if not jobs:
+        return []
+
+    start = time.perf_counter()
+    num_workers = min(num_workers or os.cpu_count() or 1, len(jobs))
+    if num_workers <= 1:
+        init_worker(font_family, font_size)
+        results = [_run_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker,
+                                 initargs=(tuple(font_family), font_size)) as executor:
+            results = list(executor.map(_run_job, jobs))
+
+    print(f"共生成 {len(results)} 张图表，耗时 {time.perf_counter() - start:.2f} 秒")
+    return [path for path, _ in results]
@@ -0,0 +1,246 @@
+"""
+分块流式连通斑块标记与景观格局指数：按行条带用 scipy.ndimage.label 标记，
+条带边界两侧相连的斑块用并查集合并，内存只占一个条带；一次遍历得到每个类别的
+斑块数（NP）、面积、占比（PLAND）、平均斑块面积、边缘密度（ED）和最大斑块指数（LPI），
+多期栅格在进程池中并行计算
+
+    python landscape_metrics.py E:\\GEOdata\\grass_fragmentation.csv E:\\GEOdata\\CNLUCC_clipped\\*\\*.tif --classes 31 32 33
+"""
+import os
+import glob
+import argparse
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.windows import Window
+from scipy import ndimage
+
+from raster_io import with_gdal_env
+from tracing import traced
+
+# 8 邻域（FRAGSTATS 默认规则）与 4 邻域结构元素
+STRUCTURES = {8: np.ones((3, 3), dtype=bool), 4: ndimage.generate_binary_structure(2, 1)}
+
+
+class UnionFind:
+    """斑块编号并查集（编号从1开始，容量随新斑块增长）"""
+
+    def __init__(self, capacity=1024):
+        self.parent = np.arange(capacity, dtype=np.int64)
+        self.size = 1  # 编号0保留为背景
+
+    def add(self, n):
+        """追加 n 个新编号，返回第一个编号（容量按倍数扩展）"""
+        start = self.size
+        self.size += n
+        if self.size > self.parent.size:
+            capacity = max(self.size, self.parent.size * 2)
+            self.parent = np.concatenate([self.parent, np.arange(self.parent.size, capacity, dtype=np.int64)])
+        return start
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]  # 路径减半
+            x = parent[x]
+        return x
+
+    def union_pairs(self, a, b):
+        for x, y in zip(a.tolist(), b.tolist()):
+            rx, ry = self.find(x), self.find(y)
+            if rx != ry:
+                # 小编号作为根，结果与合并顺序无关
+                self.parent[max(rx, ry)] = min(rx, ry)
+
+    def roots(self):
+        """全部编号的根（指针跳跃，向量化）"""
+        parent = self.parent[:self.size].copy()
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                return parent
+            parent = grand
+
+
+def _border_pairs(top, bottom, connectivity):
+    """上一条带最后一行与本条带第一行之间相连的 (上编号, 下编号) 对（已去重）"""
+    pairs = [(top, bottom)]
+    if connectivity == 8:
+        pairs += [(top[1:], bottom[:-1]), (top[:-1], bottom[1:])]
+    a = np.concatenate([p[0] for p in pairs])
+    b = np.concatenate([p[1] for p in pairs])
+    keep = (a > 0) & (b > 0)
+    if not keep.any():
+        return a[:0], b[:0]
+    unique = np.unique(np.stack([a[keep], b[keep]]), axis=1)
+    return unique[0], unique[1]
+
+
+def _edge_count(mask, valid, prev_mask=None, prev_valid=None):
+    """类别与其他有效像元之间的边数（水平边, 垂直边）；与 NoData 相邻的边和图幅边界不计"""
+    horizontal = np.count_nonzero((mask[:, :-1] != mask[:, 1:]) & valid[:, :-1] & valid[:, 1:])
+    vertical = np.count_nonzero((mask[:-1] != mask[1:]) & valid[:-1] & valid[1:])
+    if prev_mask is not None:
+        vertical += np.count_nonzero((prev_mask != mask[0]) & prev_valid & valid[0])
+    return horizontal, vertical
+
+
+@with_gdal_env
+def label_patches(raster_path, class_groups=None, connectivity=8, block_rows=512):
+    """
+    分块流式标记各类别的连通斑块
+
+    :param raster_path: 分类栅格
+    :param class_groups: {类别名: 像元值列表}，类别之间可以重叠（如高/中/低覆盖度草地与草地合计）；
+                         默认每个有效像元值为一类
+    :param connectivity: 8 或 4 邻域
+    :param block_rows: 每个条带的行数
+    :return: (斑块表 DataFrame[class, patch_pixels], 各类别边数 {类别名: (水平边, 垂直边)}, 有效像元数, 像元大小(x, y))
+    """
+    structure = STRUCTURES[connectivity]
+    with rasterio.open(raster_path) as src:
+        nodata = src.nodata
+        res = (abs(src.transform.a), abs(src.transform.e))
+        height, width = src.height, src.width
+        if class_groups is None:
+            values = set()
+            for row in range(0, height, block_rows):
+                data = src.read(1, window=Window(0, row, width, min(block_rows, height - row)))
+                values.update(np.unique(data).tolist())
+            values.discard(nodata)
+            class_groups = {v: [v] for v in sorted(values)}
+
+        uf = UnionFind()
+        areas, patch_class = [np.zeros(1, dtype=np.int64)], [np.full(1, -1, dtype=np.int64)]
+        edges = {name: [0, 0] for name in class_groups}
+        prev = {}  # 类别名 → (上一条带最后一行的全局编号, 掩膜)
+        prev_valid = None
+        n_valid = 0
+
+        for row in range(0, height, block_rows):
+            data = src.read(1, window=Window(0, row, width, min(block_rows, height - row)))
+            valid = data != nodata if nodata is not None else np.ones(data.shape, dtype=bool)
+            n_valid += int(np.count_nonzero(valid))
+
+            for k, (name, class_values) in enumerate(class_groups.items()):
+                mask = np.isin(data, class_values) & valid
+                local, n = ndimage.label(mask, structure=structure)
+                offset = uf.add(n)
+                areas.append(np.bincount(local.ravel(), minlength=n + 1)[1:].astype(np.int64))
+                patch_class.append(np.full(n, k, dtype=np.int64))
+                labels_first = np.where(local[0] > 0, local[0] + offset - 1, 0)
+                labels_last = np.where(local[-1] > 0, local[-1] + offset - 1, 0)
+
+                prev_labels, prev_mask = prev.get(name, (None, None))
+                if prev_labels is not None:
+                    uf.union_pairs(*_border_pairs(prev_labels, labels_first, connectivity))
+                h, v = _edge_count(mask, valid, prev_mask, prev_valid)
+                edges[name][0] += h
+                edges[name][1] += v
+                prev[name] = (labels_last, mask[-1])
+            prev_valid = valid[-1]
+
+    # 合并跨条带斑块：按根编号汇总面积
+    roots = uf.roots()
+    areas = np.concatenate(areas)
+    patch_class = np.concatenate(patch_class)
+    is_root = (roots == np.arange(roots.size)) & (patch_class >= 0)
+    patch_pixels = np.bincount(roots, weights=areas, minlength=roots.size).astype(np.int64)
+    names = list(class_groups)
+    patches = pd.DataFrame({
+        "class": [names[k] for k in patch_class[is_root]],
+        "patch_pixels": patch_pixels[is_root],
+    })
+    return patches, {name: tuple(v) for name, v in edges.items()}, n_valid, res
+
+
+def class_metrics(patches, edges, n_valid, res, class_names):
+    """
+    由斑块表计算类别水平的景观指数
+
+    - NP：斑块数；area_km2、PLAND：类别面积及占有效区域的百分比
+    - mean_patch_km2：平均斑块面积；largest_patch_km2、LPI：最大斑块面积及占有效区域的百分比
+    - ED：边缘密度（m/ha），边长 = 水平相邻边数 × 像元高 + 垂直相邻边数 × 像元宽
+    """
+    pixel_km2 = res[0] * res[1] / 1e6
+    landscape_km2 = n_valid * pixel_km2
+    landscape_ha = landscape_km2 * 100
+    rows = []
+    for name in class_names:
+        sizes = patches.loc[patches["class"] == name, "patch_pixels"].to_numpy()
+        np_count = sizes.size
+        area = sizes.sum() * pixel_km2
+        largest = sizes.max() * pixel_km2 if np_count else 0.0
+        h, v = edges[name]
+        edge_m = h * res[1] + v * res[0]
+        rows.append({
+            "class": name,
+            "NP": np_count,
+            "area_km2": area,
+            "PLAND": area / landscape_km2 * 100 if landscape_km2 else np.nan,
+            "mean_patch_km2": area / np_count if np_count else 0.0,
+            "largest_patch_km2": largest,
+            "LPI": largest / landscape_km2 * 100 if landscape_km2 else np.nan,
+            "ED": edge_m / landscape_ha if landscape_ha else np.nan,
+        })
+    return pd.DataFrame(rows)
+
+
+def _metrics_task(args):
+    path, label, class_groups, connectivity, block_rows = args
+    patches, edges, n_valid, res = label_patches(path, class_groups, connectivity, block_rows)
+    table = class_metrics(patches, edges, n_valid, res, list(edges))
+    table.insert(0, "label", label)
+    print(f"已计算: {os.path.basename(path)}")
+    return table
+
+
+@traced("statistics.landscape_metrics")
+def landscape_metrics(raster_paths, labels=None, class_groups=None, connectivity=8, block_rows=512,
+                      num_workers=4):
+    """
+    多期栅格的类别景观指数（每期一个进程，单期内分块流式标记）
+
+    :param raster_paths: 分类栅格路径列表
+    :param labels: 每期标签（如年份），默认使用文件名
+    :param class_groups: {类别名: 像元值列表}，默认每个像元值为一类
+    :param connectivity: 8 或 4 邻域
+    :param block_rows: 每个条带的行数（内存约为 行数 × 列数 × 类别数 × 4 字节）
+    :param num_workers: 并行进程数
+    :return: DataFrame，列为 label, class, NP, area_km2, PLAND, mean_patch_km2, largest_patch_km2, LPI, ED
+    """
+    if not raster_paths:
+        raise ValueError("没有需要计算的栅格文件")
+    labels = labels or [os.path.splitext(os.path.basename(p))[0] for p in raster_paths]
+    task_args = [(path, label, class_groups, connectivity, block_rows) for path, label in zip(raster_paths, labels)]
+
+    if num_workers > 1 and len(task_args) > 1:
+        with Pool(processes=min(num_workers, len(task_args))) as pool:
+            tables = pool.map(_metrics_task, task_args)
+    else:
+        tables = [_metrics_task(args) for args in task_args]
+    return pd.concat(tables, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分块流式斑块标记与景观格局指数")
+    parser.add_argument("output_csv")
+    parser.add_argument("inputs", nargs="+", help="栅格路径或通配符（按路径排序）")
+    parser.add_argument("--classes", nargs="+", type=int, help="只计算这些像元值（每个值为一类）")
+    parser.add_argument("--connectivity", type=int, choices=(4, 8), default=8)
+    parser.add_argument("--block-rows", type=int, default=512)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    paths = sorted(p for pattern in args.inputs for p in glob.glob(pattern))
+    class_groups = {v: [v] for v in args.classes} if args.classes else None
+    table = landscape_metrics(paths, class_groups=class_groups, connectivity=args.connectivity,
+                              block_rows=args.block_rows, num_workers=args.workers)
+    table.to_csv(args.output_csv, index=False, encoding="utf-8-sig")
+    print(table.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+"""
+声明式处理流程：每个阶段声明输入、输出与参数，按内容键判断是否需要重新运行（类似 make），
+互不依赖的分支（不同年份、不同产品）在全局并发上限内同时运行
+
+    python pipeline_runner.py pipeline_example.json
+    python pipeline_runner.py pipeline_example.json --targets pyramids_2020 --workers 2
+    python pipeline_runner.py pipeline_example.json --dry-run
+"""
+import os
+import sys
+import json
+import glob
+import time
+import string
+import inspect
+import hashlib
+import argparse
+import itertools
+import threading
+import importlib
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from tracing import span
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = ".pipeline_state.json"
+
+
+# --------------------------
+# 按路径加载仓库脚本
+# --------------------------
+def load_module(relative_path):
+    """
+    按文件路径加载仓库脚本（目录名以数字开头或含连字符时无法直接 import）。
+    所在目录加入 sys.path 后按文件名导入，spawn 启动的子进程（Windows 默认）可按同名重新导入，
+    进程池中的模块级函数才能在子进程中还原
+    """
+    path = os.path.abspath(os.path.join(REPO_DIR, relative_path))
+    name = os.path.splitext(os.path.basename(path))[0]
+    folder = os.path.dirname(path)
+    if folder not in sys.path:
+        sys.path.append(folder)
+    module = importlib.import_module(name)
+    if os.path.abspath(getattr(module, "__file__", None) or "") != path:
+        raise ImportError(f"模块名 {name} 已对应 {getattr(module, '__file__', None)}，无法按文件名加载 {relative_path}")
+    return module
+
+
+def resolve_callable(func):
+    """
+    解析阶段函数：可调用对象直接返回；"CLCD/CLCD_Clipped.py:batch_clip" 按文件路径加载；
+    "zonal_stats:zonal_area_table" 按模块名导入
+    """
+    if callable(func):
+        return func
+    target, _, attr = func.partition(":")
+    if not attr:
+        raise ValueError(f"阶段函数应写成 '模块:函数' 或 '脚本.py:函数'：{func}")
+    module = load_module(target) if target.endswith(".py") else importlib.import_module(target)
+    return getattr(module, attr)
+
+
+# --------------------------
+# 内容键：文件按内容哈希，(大小, 修改时间) 未变时复用缓存
+# --------------------------
+def _expand(path):
+    """含通配符的路径展开为排序后的文件列表"""
+    return sorted(glob.glob(path)) if glob.has_magic(path) else [path]
+
+
+class ArtifactHasher:
+    """计算输入/输出的内容键；哈希结果按 (大小, 修改时间) 缓存，只在文件变化时重新读取"""
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else {}
+        self._lock = threading.Lock()
+
+    def file_key(self, path):
+        st = os.stat(path)
+        path = os.path.abspath(path)
+        with self._lock:
+            cached = self.cache.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self._lock:
+            self.cache[path] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def snapshot(self):
+        """缓存的副本（其他线程可能同时写入，序列化前先复制）"""
+        with self._lock:
+            return dict(self.cache)
+
+    def path_key(self, path):
+        """文件、目录（递归）或通配符的内容键；不存在时返回 None"""
+        files = []
+        for p in _expand(path):
+            if os.path.isdir(p):
+                for root, _, names in os.walk(p):
+                    files.extend(os.path.join(root, n) for n in names)
+            elif os.path.isfile(p):
+                files.append(p)
+        if not files:
+            return None
+        if len(files) == 1 and files[0] == path:
+            return self.file_key(path)
+        h = hashlib.blake2b(digest_size=16)
+        base = path if os.path.isdir(path) else os.path.dirname(path)
+        for f in sorted(files):
+            h.update(os.path.relpath(f, base).encode("utf-8"))
+            h.update(self.file_key(f).encode("ascii"))
+        return h.hexdigest()
+
+
+# --------------------------
+# 阶段与流程
+# --------------------------
+class Stage:
+    """
+    处理阶段
+
+    :param name: 阶段名称（唯一）
+    :param func: 可调用对象或 "脚本.py:函数" / "模块:函数"，以 params 作为关键字参数调用；
+                 返回 False 视为失败（沿用 process_worldcover 等函数的约定）
+    :param inputs: 输入路径（文件、目录或通配符），位于其他阶段输出内的输入自动成为依赖
+    :param outputs: 输出路径（文件或目录）
+    :param params: 函数参数
+    :param after: 额外的显式依赖阶段名
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), params=None, after=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = dict(params or {})
+        self.after = list(after)
+
+    @property
+    def func_id(self):
+        if isinstance(self.func, str):
+            return self.func
+        return f"{self.func.__module__}.{self.func.__qualname__}"
+
+    def code_key(self, hasher):
+        """函数代码的内容键：所在源文件的哈希（同文件中的辅助函数修改也会使结果失效），
+        无法定位源文件时使用函数源码的哈希"""
+        func = inspect.unwrap(resolve_callable(self.func))  # 跳过 @traced 等装饰器
+        try:
+            path = inspect.getsourcefile(func)
+        except TypeError:
+            path = None
+        if path and os.path.isfile(path):
+            return hasher.file_key(path)
+        try:
+            return hashlib.blake2b(inspect.getsource(func).encode("utf-8"), digest_size=16).hexdigest()
+        except (OSError, TypeError):
+            return None
+
+    def key(self, input_keys, code_key=None):
+        """阶段内容键：函数（名称与代码）、参数与全部输入内容键的哈希"""
+        payload = json.dumps({"func": self.func_id, "code": code_key, "params": self.params, "inputs": input_keys},
+                             sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _contains(parent, child):
+    parent, child = os.path.abspath(parent), os.path.abspath(child)
+    return child == parent or child.startswith(parent.rstrip(os.sep) + os.sep)
+
+
+class Pipeline:
+    """
+    处理流程：阶段依赖由输入/输出路径推断，状态文件记录每个阶段上次成功运行时的内容键
+
+    :param state_path: 状态文件路径，默认当前目录下 .pipeline_state.json
+    :param max_workers: 同时运行的阶段数上限
+    """
+
+    def __init__(self, state_path=None, max_workers=4):
+        self.state_path = state_path or STATE_FILE
+        self.max_workers = max_workers
+        self.stages = {}
+        self.state = {"stages": {}, "files": {}}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as f:
+                self.state = json.load(f)
+        self.hasher = ArtifactHasher(self.state.setdefault("files", {}))
+        self._lock = threading.Lock()
+
+    def add(self, name, func, inputs=(), outputs=(), params=None, after=()):
+        if name in self.stages:
+            raise ValueError(f"阶段名称重复: {name}")
+        stage = Stage(name, func, inputs, outputs, params, after)
+        self.stages[name] = stage
+        return stage
+
+    def dependencies(self):
+        """{阶段名: 依赖的阶段名集合}"""
+        deps = {name: set(stage.after) for name, stage in self.stages.items()}
+        for name, stage in self.stages.items():
+            for other in self.stages.values():
+                if other is stage:
+                    continue
+                for inp in stage.inputs:
+                    base = os.path.dirname(inp) if glob.has_magic(inp) else inp
+                    if any(_contains(out, base) or _contains(base, out) for out in other.outputs):
+                        deps[name].add(other.name)
+                        break
+        for name, names in deps.items():
+            unknown = names - set(self.stages)
+            if unknown:
+                raise ValueError(f"阶段 {name} 依赖不存在的阶段: {sorted(unknown)}")
+        return deps
+
+    def _select(self, targets, deps):
+        """目标阶段及其全部上游阶段"""
+        if not targets:
+            return set(self.stages)
+        selected, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise KeyError(f"未知阶段: {name}")
+            if name not in selected:
+                selected.add(name)
+                stack.extend(deps[name])
+        return selected
+
+    def _records(self):
+        """各阶段运行记录的副本（运行中的阶段线程可能同时写入）"""
+        with self._lock:
+            return dict(self.state["stages"])
+
+    @staticmethod
+    def _updated_in_place(records, path, recorded_key, current_key):
+        """
+        path 从 recorded_key 变为 current_key 是否完全由原地更新的阶段造成：
+        沿 "输入键 → 输出键" 链查找（如 重投影结果 → 建立金字塔后的结果）
+        """
+        steps = {}
+        for record in records.values():
+            inp, out = record.get("inputs", {}).get(path), record["outputs"].get(path)
+            if inp is not None and out is not None and inp != out:
+                steps[inp] = out
+        key, seen = recorded_key, set()
+        while key in steps and key not in seen:
+            seen.add(key)
+            key = steps[key]
+            if key == current_key:
+                return True
+        return False
+
+    def check(self, stage):
+        """
+        判断阶段是否需要运行。原地更新的阶段（输入同时也是输出，如建立金字塔）
+        只有该路径仍是本阶段上次写出的内容时，才按运行前的内容键计算；上游重新运行后内容变化，本阶段随之重新运行。
+        其他阶段原地更新了本阶段的输出时，只要内容由本阶段的输出经原地更新链得到，仍视为最新
+
+        :return: (是否最新, 阶段内容键, 原因, 各输入内容键)
+        """
+        records = self._records()
+        record = records.get(stage.name)
+        input_keys = {}
+        for inp in stage.inputs:
+            key = self.hasher.path_key(inp)
+            if key is None:
+                return False, None, f"输入不存在: {inp}", None
+            if record and key == record["outputs"].get(inp) and inp in record.get("inputs", {}):
+                key = record["inputs"][inp]
+            input_keys[inp] = key
+        try:
+            code_key = stage.code_key(self.hasher)
+        except Exception as e:
+            return False, None, f"无法加载阶段函数: {type(e).__name__}: {e}", None
+        key = stage.key(input_keys, code_key)
+        if record is None:
+            return False, key, "从未运行", input_keys
+        if record["key"] != key:
+            return False, key, "输入、参数或代码已变化", input_keys
+        for out, out_key in record["outputs"].items():
+            current = self.hasher.path_key(out)
+            if current != out_key and not (current and self._updated_in_place(records, out, out_key, current)):
+                return False, key, f"输出缺失或被修改: {out}", input_keys
+        return True, key, "最新", input_keys
+
+    def _save_state(self):
+        """调用方持有 self._lock；文件哈希缓存可能被其他线程同时写入，复制后再序列化"""
+        state = dict(self.state, files=self.hasher.snapshot())
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.state_path)
+
+    def _run_stage(self, stage, key, input_keys):
+        start = time.perf_counter()
+        with span("pipeline.stage", resources=True, stage=stage.name):
+            for out in stage.outputs:
+                parent = out if not os.path.splitext(out)[1] else os.path.dirname(out)
+                if parent:
+                    os.makedirs(parent, exist_ok=True)
+            result = resolve_callable(stage.func)(**stage.params)
+        if result is False:
+            raise RuntimeError("阶段函数返回 False")
+        outputs = {}
+        for out in stage.outputs:
+            out_key = self.hasher.path_key(out)
+            if out_key is None:
+                raise FileNotFoundError(f"阶段完成但输出不存在: {out}")
+            outputs[out] = out_key
+        with self._lock:
+            self.state["stages"][stage.name] = {
+                "key": key,
+                "inputs": input_keys,
+                "outputs": outputs,
+                "func": stage.func_id,
+                "finished": datetime.now().isoformat(timespec="seconds"),
+                "duration_s": round(time.perf_counter() - start, 3),
+            }
+            # 不改写其他阶段的记录：原地更新由 inputs/outputs 中同一路径的键链体现（见 check）
+            self._save_state()
+
+    def run(self, targets=None, force=False, dry_run=False):
+        """
+        运行流程：依赖完成后检查内容键，最新的阶段跳过，其余在并发上限内运行；
+        失败阶段的下游标记为 blocked，其他分支继续
+
+        :param targets: 只运行这些阶段及其上游，默认全部
+        :param force: 忽略状态文件，全部重新运行
+        :param dry_run: 只报告各阶段是否需要运行
+        :return: {阶段名: "up-to-date" | "ran" | "would-run" | "failed" | "blocked"}
+        """
+        deps = self.dependencies()
+        selected = self._select(targets, deps)
+        waiting = {name: deps[name] & selected for name in selected}
+        status = {}
+        running = {}
+
+        def print_status(name, state, note=""):
+            print(f"[{state:>10}] {name}" + (f" | {note}" if note else ""))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while waiting or running:
+                # 依赖已结束的阶段：上游失败则阻塞，否则检查是否需要运行
+                for name in sorted(waiting):
+                    if not all(d in status for d in waiting[name]):
+                        continue
+                    if len(running) >= self.max_workers:
+                        break
+                    del waiting[name]
+                    if any(status[d] in ("failed", "blocked") for d in deps[name] & selected):
+                        status[name] = "blocked"
+                        print_status(name, "blocked")
+                        continue
+                    stage = self.stages[name]
+                    if dry_run and any(status[d] == "would-run" for d in deps[name] & selected):
+                        status[name] = "would-run"
+                        print_status(name, "would-run", "上游需要运行")
+                        continue
+                    up_to_date, key, reason, input_keys = self.check(stage)
+                    if up_to_date and not force:
+                        status[name] = "up-to-date"
+                        print_status(name, "up-to-date")
+                    elif dry_run:
+                        status[name] = "would-run"
+                        print_status(name, "would-run", reason)
+                    elif key is None:
+                        status[name] = "failed"
+                        print_status(name, "failed", reason)
+                    else:
+                        print_status(name, "running", reason)
+                        running[executor.submit(self._run_stage, stage, key, input_keys)] = name
+                if not running:
+                    if waiting and not any(all(d in status for d in ds) for ds in waiting.values()):
+                        raise RuntimeError(f"阶段存在循环依赖: {sorted(waiting)}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                        status[name] = "ran"
+                        print_status(name, "done")
+                    except Exception as e:
+                        status[name] = "failed"
+                        print_status(name, "failed", f"{type(e).__name__}: {e}")
+        return status
+
+    # --------------------------
+    # 配置文件
+    # --------------------------
+    @classmethod
+    def from_config(cls, config_path, max_workers=None, state_path=None):
+        """
+        从 JSON 配置创建流程。字符串中的 ${变量} 取自 "vars" 与阶段的 "foreach"；
+        foreach 中的每种取值组合展开为一个独立阶段，互不依赖时并发运行
+
+            {"vars": {"root": "E:/GEOdata/LUCC"},
+             "workers": 4,
+             "stages": [{"name": "merge_${year}", "func": "Gdal_Merge_Clip.py:process_worldcover",
+                         "foreach": {"year": [2020, 2021]},
+                         "inputs": ["${root}/ESA/${year}/MAP"],
+                         "outputs": ["${root}/ESA/${year}/merged/merged_worldcover.tif"],
+                         "params": {"input_dir": "${root}/ESA/${year}/MAP",
+                                    "output_dir": "${root}/ESA/${year}/merged"}}]}
+        """
+        with open(config_path, encoding="utf-8") as f:
+            config = json.load(f)
+        variables = {k: str(v) for k, v in config.get("vars", {}).items()}
+        state_path = state_path or config.get("state") or os.path.join(
+            os.path.dirname(os.path.abspath(config_path)), STATE_FILE)
+        pipeline = cls(_substitute(state_path, variables), max_workers or config.get("workers", 4))
+
+        for spec in config["stages"]:
+            foreach = spec.get("foreach", {})
+            keys = list(foreach)
+            for combo in itertools.product(*(foreach[k] for k in keys)):
+                env = dict(variables, **{k: str(v) for k, v in zip(keys, combo)})
+                pipeline.add(_substitute(spec["name"], env), spec["func"],
+                             inputs=_substitute(spec.get("inputs", []), env),
+                             outputs=_substitute(spec.get("outputs", []), env),
+                             params=_substitute(spec.get("params", {}), env),
+                             after=_substitute(spec.get("after", []), env))
+        return pipeline
+
+
+def _substitute(value, env):
+    """递归替换字符串中的 ${变量}"""
+    if isinstance(value, str):
+        return string.Template(value).substitute(env)
+    if isinstance(value, list):
+        return [_substitute(v, env) for v in value]
+    if isinstance(value, dict):
+        return {k: _substitute(v, env) for k, v in value.items()}
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="声明式处理流程（按内容键跳过已是最新的阶段）")
+    parser.add_argument("config", help="流程配置文件（JSON）")
+    parser.add_argument("--targets", nargs="+", help="只运行这些阶段及其上游")
+    parser.add_argument("--workers", type=int, help="同时运行的阶段数上限（覆盖配置文件）")
+    parser.add_argument("--state", help="状态文件路径（覆盖配置文件）")
+    parser.add_argument("--force", action="store_true", help="忽略状态文件，全部重新运行")
+    parser.add_argument("--dry-run", action="store_true", help="只报告各阶段是否需要运行")
+    args = parser.parse_args()
+
+    pipeline = Pipeline.from_config(args.config, args.workers, args.state)
+    status = pipeline.run(args.targets, force=args.force, dry_run=args.dry_run)
+    counts = {}
+    for s in status.values():
+        counts[s] = counts.get(s, 0) + 1
+    print("汇总: " + ", ".join(f"{k} {v}" for k, v in sorted(counts.items())))
+    sys.exit(1 if counts.get("failed") else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+
+
+def panel_pixel_shape(figsize, dpi, nrows=1, ncols=1):
+    """
+    计算子图在输出图片中的像素大小（行, 列），即预览读取的目标尺寸上限
+
+    :param figsize: 图幅尺寸（英寸），如 (16, 12)
+    :param dpi: 输出分辨率
+    :param nrows: 子图行数
+    :param ncols: 子图列数
+    """
+    width_px = figsize[0] * dpi / ncols
+    height_px = figsize[1] * dpi / nrows
+    return max(1, int(height_px)), max(1, int(width_px))
+
+
+def read_preview(path, max_shape, resampling=Resampling.mode, band=1):
+    """
+    按目标像素尺寸读取栅格预览（自动使用金字塔，否则抽样读取），保持宽高比
+
+    :param path: 栅格路径
+    :param max_shape: 目标尺寸上限 (行, 列)
+    :param resampling: 重采样方法，分类数据默认众数（mode），连续数据可用 average/bilinear
+    :param band: 波段号
+    :return: 掩膜数组（nodata 已掩膜）
+    """
+    with rasterio.open(path) as src:
+        scale = max(src.height / max_shape[0], src.width / max_shape[1], 1.0)
+        out_shape = (max(1, math.ceil(src.height / scale)), max(1, math.ceil(src.width / scale)))
+        return src.read(band, out_shape=out_shape, resampling=resampling, masked=True)
+
+
+def read_previews(paths, max_shape, resampling=Resampling.mode, num_workers=4):
+    """并行读取多个栅格的预览（每个线程独立打开数据集）"""
+    with ThreadPoolExecutor(max_workers=max(1, min(num_workers, len(paths)))) as executor:
+        return list(executor.map(lambda p: read_preview(p, max_shape, resampling), paths))
+
+
+def _colorize(data, cmap, norm):
+    """将（掩膜）数组按颜色映射转换为RGBA图像，掩膜像元透明"""
+    rgba = cmap(norm(data), bytes=True)
+    rgba[np.ma.getmaskarray(data), 3] = 0
+    return rgba
+
+
+def render_panel_grid(arrays, titles, output_path, nrows, ncols, figsize, dpi=300,
+                      cmap=None, norm=None, vmin=None, vmax=None, title_fontsize=8,
+                      colorbar=None, suptitle=None, num_workers=4, show=False):
+    """
+    并行着色各子图后合成为多子图图片
+
+    :param arrays: 预览数组列表（read_preview 的结果）
+    :param titles: 子图标题列表
+    :param output_path: 图片输出路径，为空则不保存
+    :param nrows: 子图行数
+    :param ncols: 子图列数
+    :param figsize: 图幅尺寸（英寸）
+    :param dpi: 输出分辨率
+    :param cmap: 颜色映射
+    :param norm: 颜色归一化（如 BoundaryNorm），为空时按 vmin/vmax 线性归一化
+    :param colorbar: 可选 dict，键 ticks、ticklabels、label，添加统一颜色条
+    :param suptitle: 总标题
+    :param num_workers: 着色线程数
+    :param show: 是否弹出窗口显示
+    :return: (fig, axes)
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib import colormaps
+    from matplotlib.cm import ScalarMappable
+    from matplotlib.colors import Normalize
+
+    if cmap is None or isinstance(cmap, str):
+        cmap = colormaps[cmap or "viridis"]
+    norm = norm or Normalize(vmin=vmin, vmax=vmax)
+
+    # 各子图着色相互独立，并行完成后再合成
+    with ThreadPoolExecutor(max_workers=max(1, min(num_workers, len(arrays)))) as executor:
+        images = list(executor.map(lambda a: _colorize(a, cmap, norm), arrays))
+
+    fig, axes = plt.subplots(nrows, ncols, figsize=figsize)
+    axes = np.atleast_1d(axes).flatten()
+    for ax, image, title in zip(axes, images, titles):
+        ax.imshow(image, interpolation="nearest")
+        ax.set_title(title, fontsize=title_fontsize)
+        ax.axis("off")
+    for ax in axes[len(images):]:
+        ax.axis("off")
+
+    if suptitle:
+        fig.suptitle(suptitle, fontsize=14)
+    plt.tight_layout(rect=[0, 0, 0.9, 1] if colorbar else None)
+
+    if colorbar:
+        cbar_ax = fig.add_axes([0.92, 0.15, 0.02, 0.7])  # 颜色条位置 [左, 下, 宽, 高]
+        cbar = fig.colorbar(ScalarMappable(norm=norm, cmap=cmap), cax=cbar_ax, ticks=colorbar.get("ticks"))
+        if colorbar.get("ticklabels"):
+            cbar.ax.set_yticklabels(colorbar["ticklabels"], fontsize=10)
+        if colorbar.get("label"):
+            cbar.set_label(colorbar["label"], fontsize=12)
+
+    if output_path:
+        fig.savefig(output_path, dpi=dpi, bbox_inches="tight")
+        print(f"图片已保存至: {output_path}")
+    if show:
+        plt.show()
+    return fig, axes
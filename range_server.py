@@ -0,0 +1,265 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+import numpy as np
+import pandas as pd
+import rasterio
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from functools import partial
+from rasterio.windows import Window
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """支持 HTTP Range（单区间）的静态文件处理器，每个请求记录一条JSON日志"""
+
+    def log_message(self, format, *args):
+        # 访问日志由 _record 统一输出
+        pass
+
+    def _record(self, status, start=None, end=None, sent=0, started=None):
+        entry = {
+            "time": time.time(),
+            "method": self.command,
+            "path": self.path,
+            "status": int(status),
+            "range_start": start,
+            "range_end": end,
+            "bytes": sent,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3) if started else None,
+        }
+        self.server.record(entry)
+
+    def send_head(self):
+        started = time.perf_counter()
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or not os.path.isfile(path):
+            self._record(HTTPStatus.NOT_FOUND, started=started)
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        size = os.path.getsize(path)
+        header = self.headers.get("Range")
+        start, end = 0, size - 1
+        status = HTTPStatus.OK
+        if header:
+            match = RANGE_PATTERN.match(header.strip())
+            if not match or (not match.group(1) and not match.group(2)):
+                # 多区间等不支持的请求按完整文件返回
+                header = None
+            elif not match.group(1):
+                start = max(0, size - int(match.group(2)))  # bytes=-N 表示最后N字节
+            else:
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if header:
+                if start >= size or start > end:
+                    self._record(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, start, end, started=started)
+                    self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.end_headers()
+                    return None
+                status = HTTPStatus.PARTIAL_CONTENT
+
+        self.send_response(status)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Last-Modified", self.date_time_string(int(os.path.getmtime(path))))
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        self._range = (path, start, end, status, started)
+        return True
+
+    def do_HEAD(self):
+        self._range = None
+        if self.send_head() and self._range:
+            path, start, end, status, started = self._range
+            partial_content = status == HTTPStatus.PARTIAL_CONTENT
+            self._record(status, start if partial_content else None, end if partial_content else None, 0, started)
+
+    def do_GET(self):
+        self._range = None
+        if not self.send_head() or not self._range:
+            return
+        path, start, end, status, started = self._range
+        sent = 0
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                try:
+                    self.wfile.write(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    break
+                sent += len(chunk)
+                remaining -= len(chunk)
+        self._record(status, start if status == HTTPStatus.PARTIAL_CONTENT else None,
+                     end if status == HTTPStatus.PARTIAL_CONTENT else None, sent, started)
+
+
+class RangeServer(ThreadingHTTPServer):
+    """本地对象存储替身：多线程HTTP服务，记录全部请求（内存 + 可选JSON Lines文件）"""
+    daemon_threads = True
+
+    def __init__(self, directory, host="127.0.0.1", port=0, log_path=None):
+        super().__init__((host, port), partial(RangeRequestHandler, directory=directory))
+        self.directory = os.path.abspath(directory)
+        self.log_path = log_path
+        self.requests = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, entry):
+        with self._lock:
+            self.requests.append(entry)
+            if self.log_path:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def mark(self):
+        """返回当前请求计数，配合 since() 统计一段操作产生的请求"""
+        with self._lock:
+            return len(self.requests)
+
+    def since(self, mark):
+        with self._lock:
+            return list(self.requests[mark:])
+
+    def start(self):
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"本地范围读取服务已启动: {self.base_url} → {self.directory}")
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def serve_directory(directory, host="127.0.0.1", port=8000, log_path=None):
+    """前台运行服务（Ctrl+C 停止）"""
+    server = RangeServer(directory, host, port, log_path)
+    print(f"本地范围读取服务: {server.base_url} → {server.directory}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# --------------------------
+# /vsicurl/ 窗口读取基准测试
+# --------------------------
+VSICURL_OPTIONS = {
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",  # 不列目录、不探测 .aux.xml/.ovr 等旁车文件
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif,.tiff",
+    "GDAL_HTTP_MULTIRANGE": "NO",
+    "VSI_CACHE": "FALSE",
+}
+
+
+def _summarize(entries):
+    gets = [e for e in entries if e["method"] == "GET"]
+    return len(entries), sum(e["bytes"] for e in gets)
+
+
+def benchmark_windowed_reads(server, file_names, window_size=512, n_windows=20, decimations=(1, 4, 16), seed=0):
+    """
+    通过 /vsicurl/ 打开服务中的栅格，统计打开及每次窗口读取产生的请求数与字节数
+
+    每次读取都重新打开数据集并禁用 /vsicurl/ 缓存，模拟冷读取。抽稀倍数>1时按
+    缩小后的尺寸读取，可检验金字塔（概览）的布局与顺序是否有效
+
+    :param server: 已启动的 RangeServer
+    :param file_names: 服务目录下的相对路径列表
+    :param window_size: 窗口边长（源数据像元）
+    :param n_windows: 每个文件随机窗口数
+    :param decimations: 抽稀倍数列表（1 为全分辨率）
+    :return: DataFrame，每个 文件×抽稀倍数 一行
+    """
+    rng = random.Random(seed)
+    rows = []
+    options = dict(VSICURL_OPTIONS, CPL_VSIL_CURL_NON_CACHED=f"/vsicurl/{server.base_url}/")
+
+    with rasterio.Env(**options):
+        for name in file_names:
+            url = f"/vsicurl/{server.base_url}/{name.replace(os.sep, '/')}"
+            mark = server.mark()
+            with rasterio.open(url) as src:
+                width, height = src.width, src.height
+                overviews = src.overviews(1)
+                block = src.block_shapes[0]
+                itemsize = np.dtype(src.dtypes[0]).itemsize
+            open_requests, open_bytes = _summarize(server.since(mark))
+
+            size = min(window_size, width, height)
+            for factor in decimations:
+                win = min(size * factor, width, height)
+                requests, nbytes, seconds = [], [], []
+                for _ in range(n_windows):
+                    window = Window(rng.randrange(0, width - win + 1), rng.randrange(0, height - win + 1), win, win)
+                    with rasterio.open(url) as src:
+                        mark = server.mark()
+                        start = time.perf_counter()
+                        src.read(1, window=window, out_shape=(max(1, win // factor), max(1, win // factor)))
+                        seconds.append(time.perf_counter() - start)
+                    n, b = _summarize(server.since(mark))
+                    requests.append(n)
+                    nbytes.append(b)
+
+                rows.append({
+                    "file": name,
+                    "block": f"{block[1]}x{block[0]}",
+                    "overviews": ",".join(map(str, overviews)) or "-",
+                    "open_requests": open_requests,
+                    "open_kb": open_bytes / 1024,
+                    "decimation": factor,
+                    "window": win,
+                    "requests_per_read": float(np.mean(requests)),
+                    "kb_per_read": float(np.mean(nbytes)) / 1024,
+                    # 读取字节与输出像元原始字节之比，越接近1越好
+                    "read_amplification": float(np.mean(nbytes)) / max(1, (win // factor) ** 2 * itemsize),
+                    "ms_per_read": float(np.mean(seconds)) * 1000,
+                })
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    # 将输出目录作为本地“对象存储”，对其中的COG做窗口读取基准测试
+    output_dir = r"E:\GEOdata\LUCC\ESRI10\data\2017"
+    log_file = os.path.join(output_dir, "range_requests.jsonl")
+
+    tif_names = sorted(f for f in os.listdir(output_dir) if f.lower().endswith(".tif"))
+    with RangeServer(output_dir, log_path=log_file) as server:
+        report = benchmark_windowed_reads(server, tif_names)
+
+    pd.set_option("display.width", 200)
+    print(report.to_string(index=False))
+    report.to_csv(os.path.join(output_dir, "range_read_benchmark.csv"), index=False)
@@ -0,0 +1,329 @@
+"""
+本地栅格目录：在 SQLite 中缓存路径、大小、修改时间、坐标系、仿射变换、行列数、数据类型、NoData、
+范围（经纬度范围建 R-tree 索引）、从文件名解析的年份/时段与网格签名，
+按修改时间增量刷新（并行 scandir），规划处理任务时无需逐个打开文件
+
+    python raster_catalog.py E:\\GEOdata\\catalog.sqlite refresh E:\\GEOdata\\LUCC E:\\GEOdata\\pemefrost
+    python raster_catalog.py E:\\GEOdata\\catalog.sqlite query --years 2000 2020 --pattern "*_Map.tif"
+"""
+import os
+import re
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+import rasterio
+from rasterio.warp import transform_bounds
+
+from zonal_stats import grid_signature
+
+RASTER_EXTENSIONS = (".tif", ".tiff", ".img", ".vrt")
+# 文件名中独立出现的年份（前后不接数字），如 fused_1961_1965_TTOP.tif、CNLUCC_2000.tif
+_YEAR = re.compile(r"(?<!\d)(19\d{2}|20\d{2})(?!\d)")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rasters (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    driver TEXT,
+    crs TEXT,
+    epsg INTEGER,
+    transform TEXT,
+    width INTEGER,
+    height INTEGER,
+    count INTEGER,
+    dtype TEXT,
+    nodata REAL,
+    res_x REAL,
+    res_y REAL,
+    minx REAL, miny REAL, maxx REAL, maxy REAL,
+    lon_min REAL, lat_min REAL, lon_max REAL, lat_max REAL,
+    year_start INTEGER,
+    year_end INTEGER,
+    grid_signature TEXT,
+    scanned_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_rasters_grid ON rasters (grid_signature);
+CREATE INDEX IF NOT EXISTS idx_rasters_year ON rasters (year_start, year_end);
+"""
+
+
+def parse_period(path):
+    """
+    从文件名（其次是上两级目录名）解析年份或时段
+
+    :return: (起始年, 结束年)；单个年份时两者相同，无法解析时为 (None, None)
+    """
+    parts = [os.path.basename(path)] + [os.path.basename(p) for p in
+                                        (os.path.dirname(path), os.path.dirname(os.path.dirname(path)))]
+    for part in parts:
+        years = [int(y) for y in _YEAR.findall(part)]
+        if years:
+            return min(years), max(years)
+    return None, None
+
+
+# --------------------------
+# 并行目录扫描
+# --------------------------
+def _scan_dir(path, extensions):
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+                elif entry.name.lower().endswith(extensions):
+                    st = entry.stat()
+                    files.append((os.path.abspath(entry.path), st.st_size, st.st_mtime_ns))
+    except OSError as e:
+        print(f"无法扫描目录 {path}: {e}")
+    return files, dirs
+
+
+def scan_files(roots, extensions=RASTER_EXTENSIONS, num_workers=8):
+    """
+    并行递归扫描目录（每个目录一个 scandir 任务，网络盘上明显快于 os.walk）
+
+    :return: {绝对路径: (大小, 修改时间ns)}
+    """
+    found = {}
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        pending = {executor.submit(_scan_dir, root, extensions) for root in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, dirs = future.result()
+                found.update((path, (size, mtime)) for path, size, mtime in files)
+                pending.update(executor.submit(_scan_dir, d, extensions) for d in dirs)
+    return found
+
+
+def read_metadata(path):
+    """打开栅格读取元数据（只读头信息，不读像元）"""
+    with rasterio.open(path) as src:
+        record = {
+            "driver": src.driver,
+            "crs": src.crs.to_wkt() if src.crs else None,
+            "epsg": src.crs.to_epsg() if src.crs else None,
+            "transform": json.dumps(list(src.transform)[:6]),
+            "width": src.width,
+            "height": src.height,
+            "count": src.count,
+            "dtype": src.dtypes[0],
+            "nodata": src.nodata,
+            "res_x": src.res[0],
+            "res_y": src.res[1],
+            "grid_signature": grid_signature(src),
+        }
+        record.update(zip(("minx", "miny", "maxx", "maxy"), src.bounds))
+        lonlat = (None,) * 4
+        if src.crs:
+            try:
+                lonlat = transform_bounds(src.crs, "EPSG:4326", *src.bounds, densify_pts=21)
+            except Exception:
+                pass
+        record.update(zip(("lon_min", "lat_min", "lon_max", "lat_max"), lonlat))
+    record["year_start"], record["year_end"] = parse_period(path)
+    return record
+
+
+class RasterCatalog:
+    """
+    SQLite 栅格目录
+
+    :param db_path: 数据库文件路径
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+        try:
+            self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS footprints "
+                              "USING rtree(id, lon_min, lon_max, lat_min, lat_max)")
+            self.has_rtree = True
+        except sqlite3.OperationalError:  # SQLite 未编译 R-tree 模块时退化为普通范围比较
+            self.has_rtree = False
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # --------------------------
+    # 增量刷新
+    # --------------------------
+    def refresh(self, roots, extensions=RASTER_EXTENSIONS, num_workers=8):
+        """
+        扫描目录并增量更新：新增或 (大小, 修改时间) 变化的文件重新读取元数据，已删除的文件移出目录
+
+        :param roots: 根目录（单个或列表）
+        :return: {"added", "updated", "removed", "unchanged", "failed"} 计数
+        """
+        roots = [os.path.abspath(r) for r in ([roots] if isinstance(roots, str) else roots)]
+        found = scan_files(roots, extensions, num_workers)
+
+        known = {}
+        for root in roots:
+            prefix = root.rstrip(os.sep) + os.sep
+            for row in self.conn.execute("SELECT id, path, size, mtime_ns FROM rasters "
+                                         "WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)):
+                known[row["path"]] = (row["id"], row["size"], row["mtime_ns"])
+
+        changed = [p for p, stat in found.items() if p not in known or known[p][1:] != stat]
+        removed = [known[p][0] for p in known if p not in found]
+        counts = {"added": 0, "updated": 0, "removed": len(removed), "unchanged": len(found) - len(changed),
+                  "failed": 0}
+
+        def read(path):
+            try:
+                return path, read_metadata(path), None
+            except Exception as e:
+                return path, None, e
+
+        scanned_at = datetime.now().isoformat(timespec="seconds")
+        with self.conn, ThreadPoolExecutor(max_workers=num_workers) as executor:
+            if removed:
+                self._delete(removed)
+            for path, record, error in executor.map(read, changed):
+                if error is not None:
+                    print(f"读取元数据失败 {path}: {error}")
+                    counts["failed"] += 1
+                    continue
+                size, mtime = found[path]
+                record.update(path=path, name=os.path.basename(path), size=size, mtime_ns=mtime,
+                              scanned_at=scanned_at)
+                counts["updated" if path in known else "added"] += 1
+                if path in known:
+                    self._delete([known[path][0]])
+                self._insert(record)
+        return counts
+
+    def _delete(self, ids):
+        marks = ",".join("?" * len(ids))
+        self.conn.execute(f"DELETE FROM rasters WHERE id IN ({marks})", ids)
+        if self.has_rtree:
+            self.conn.execute(f"DELETE FROM footprints WHERE id IN ({marks})", ids)
+
+    def _insert(self, record):
+        columns = list(record)
+        cur = self.conn.execute(
+            f"INSERT INTO rasters ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [record[c] for c in columns])
+        if self.has_rtree and record["lon_min"] is not None:
+            self.conn.execute("INSERT INTO footprints VALUES (?, ?, ?, ?, ?)",
+                              (cur.lastrowid, record["lon_min"], record["lon_max"],
+                               record["lat_min"], record["lat_max"]))
+
+    # --------------------------
+    # 查询
+    # --------------------------
+    def query(self, bbox=None, bbox_crs="EPSG:4326", years=None, grid=None, pattern=None, root=None):
+        """
+        按空间范围、年份、网格签名、文件名与目录筛选
+
+        :param bbox: (minx, miny, maxx, maxy)，与栅格经纬度范围相交即命中
+        :param bbox_crs: bbox 的坐标系
+        :param years: 单个年份或 (起始年, 结束年)，与栅格时段有交集即命中
+        :param grid: 网格签名（zonal_stats.grid_signature）
+        :param pattern: 文件名通配符，如 "fused_*.tif"
+        :param root: 只返回该目录下的文件
+        :return: DataFrame（按路径排序）
+        """
+        sql, args = ["SELECT r.* FROM rasters r"], []
+        where = []
+        if bbox is not None:
+            if str(bbox_crs).upper() != "EPSG:4326":
+                bbox = transform_bounds(bbox_crs, "EPSG:4326", *bbox, densify_pts=21)
+            if self.has_rtree:
+                sql.append("JOIN footprints f ON f.id = r.id")
+                where.append("f.lon_max >= ? AND f.lon_min <= ? AND f.lat_max >= ? AND f.lat_min <= ?")
+            else:
+                where.append("r.lon_max >= ? AND r.lon_min <= ? AND r.lat_max >= ? AND r.lat_min <= ?")
+            args += [bbox[0], bbox[2], bbox[1], bbox[3]]
+        if years is not None:
+            start, end = (years, years) if isinstance(years, int) else years
+            where.append("r.year_end >= ? AND r.year_start <= ?")
+            args += [start, end]
+        if grid is not None:
+            where.append("r.grid_signature = ?")
+            args.append(grid)
+        if pattern is not None:
+            where.append("r.name GLOB ?")
+            args.append(pattern)
+        if root is not None:
+            prefix = os.path.abspath(root).rstrip(os.sep) + os.sep
+            where.append("substr(r.path, 1, ?) = ?")
+            args += [len(prefix), prefix]
+        if where:
+            sql.append("WHERE " + " AND ".join(where))
+        sql.append("ORDER BY r.path")
+        return pd.read_sql_query(" ".join(sql), self.conn, params=args)
+
+    def paths(self, **filters):
+        """符合条件的文件路径列表（参数同 query）"""
+        return self.query(**filters)["path"].tolist()
+
+    def grid_groups(self, **filters):
+        """按网格签名分组：{签名: [路径, ...]}，用于判断一批文件能否逐像元对齐计算"""
+        df = self.query(**filters)
+        return {sig: group["path"].tolist() for sig, group in df.groupby("grid_signature")}
+
+    def grid_signatures(self, paths):
+        """{路径: 网格签名}，不在目录中或已过期（大小/修改时间变化）的文件为 None"""
+        result = {}
+        for path in paths:
+            path = os.path.abspath(path)
+            row = self.conn.execute("SELECT size, mtime_ns, grid_signature FROM rasters WHERE path = ?",
+                                    (path,)).fetchone()
+            st = os.stat(path) if os.path.exists(path) else None
+            fresh = row is not None and st is not None and (row["size"], row["mtime_ns"]) == (st.st_size,
+                                                                                                st.st_mtime_ns)
+            result[path] = row["grid_signature"] if fresh else None
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地栅格目录（SQLite）")
+    parser.add_argument("db", help="数据库文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_refresh = sub.add_parser("refresh", help="扫描目录并增量更新")
+    p_refresh.add_argument("roots", nargs="+")
+    p_refresh.add_argument("--workers", type=int, default=8)
+    p_query = sub.add_parser("query", help="查询")
+    p_query.add_argument("--bbox", nargs=4, type=float, metavar=("MINX", "MINY", "MAXX", "MAXY"))
+    p_query.add_argument("--bbox-crs", default="EPSG:4326")
+    p_query.add_argument("--years", nargs="+", type=int, help="单个年份或起止年份")
+    p_query.add_argument("--grid", help="网格签名")
+    p_query.add_argument("--pattern", help="文件名通配符")
+    p_query.add_argument("--root", help="只查询该目录下的文件")
+    args = parser.parse_args()
+
+    with RasterCatalog(args.db) as catalog:
+        if args.command == "refresh":
+            print(catalog.refresh(args.roots, num_workers=args.workers))
+        else:
+            years = None if not args.years else (args.years[0] if len(args.years) == 1 else tuple(args.years[:2]))
+            df = catalog.query(args.bbox, args.bbox_crs, years, args.grid, args.pattern, args.root)
+            pd.set_option("display.width", 200)
+            print(df[["path", "year_start", "year_end", "epsg", "width", "height", "dtype", "grid_signature"]]
+                  .to_string(index=False))
+            print(f"共 {len(df)} 个文件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import os
+import functools
+import time
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.windows import Window
+
+# --------------------------
+# GDAL 全局配置（缓存、线程），所有脚本统一从这里取值
+# --------------------------
+GDAL_CONFIG = {
+    "GDAL_CACHEMAX": 1024,  # 块缓存大小（MB）
+    "GDAL_NUM_THREADS": "ALL_CPUS",  # 多线程解压/压缩
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",  # 打开文件时不扫描目录
+    "GDAL_TIFF_OVR_BLOCKSIZE": 512,  # 金字塔分块与主数据一致
+}
+
+# --------------------------
+# 命名写出配置；predictor 为 "auto" 时按数据类型选择（浮点3，整数2）
+# --------------------------
+WRITE_PROFILES = {
+    # 分类数据默认：快速压缩、稀疏写出（全nodata块不落盘）
+    "class-uint8-fast": {
+        "driver": "GTiff",
+        "tiled": True,
+        "blockxsize": 512,
+        "blockysize": 512,
+        "compress": "zstd",
+        "zstd_level": 1,
+        "predictor": "auto",
+        "sparse_ok": True,
+        "bigtiff": "IF_SAFER",
+        "num_threads": "ALL_CPUS",
+    },
+    # 连续数据（趋势、P值等float32结果）：浮点预测器（按字节重排后差分），只能用于浮点数据
+    "float-fast": {
+        "driver": "GTiff",
+        "tiled": True,
+        "blockxsize": 512,
+        "blockysize": 512,
+        "compress": "zstd",
+        "zstd_level": 1,
+        "predictor": 3,
+        "sparse_ok": True,
+        "bigtiff": "IF_SAFER",
+        "num_threads": "ALL_CPUS",
+    },
+    # 兼容旧版GIS软件（不支持ZSTD时使用）
+    "compat": {
+        "driver": "GTiff",
+        "tiled": True,
+        "blockxsize": 256,
+        "blockysize": 256,
+        "compress": "lzw",
+        "predictor": "auto",
+        "bigtiff": "IF_SAFER",
+        "num_threads": "ALL_CPUS",
+    },
+    # 归档：高压缩比，写出慢
+    "archive": {
+        "driver": "GTiff",
+        "tiled": True,
+        "blockxsize": 512,
+        "blockysize": 512,
+        "compress": "deflate",
+        "zlevel": 9,
+        "predictor": "auto",
+        "sparse_ok": True,
+        "bigtiff": "IF_SAFER",
+        "num_threads": "ALL_CPUS",
+    },
+}
+
+# 配置适用的数据类型（numpy dtype.kind），未列出的配置适用于所有类型
+PROFILE_DTYPE_KINDS = {
+    "class-uint8-fast": "biu",
+    "float-fast": "f",
+}
+
+# 从源数据元数据复制时需要清除的存储布局键
+_LAYOUT_KEYS = ("compress", "tiled", "blockxsize", "blockysize", "predictor", "interleave",
+                "zlevel", "zstd_level", "jpeg_quality", "photometric", "sparse_ok", "bigtiff", "num_threads")
+
+
+def gdal_env(**overrides):
+    """
+    返回应用了统一GDAL配置的 rasterio.Env
+
+    用法：with gdal_env(): ...
+    """
+    config = dict(GDAL_CONFIG, **overrides)
+    # rasterio 将整数 GDAL_CACHEMAX 按字节传给 GDALSetCacheMax64，这里统一按MB换算
+    cachemax = config.get("GDAL_CACHEMAX")
+    if isinstance(cachemax, int) and cachemax < 100000:
+        config["GDAL_CACHEMAX"] = cachemax * 1024 ** 2
+    return rasterio.Env(**config)
+
+
+def with_gdal_env(func):
+    """装饰器：函数在统一GDAL配置下运行"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with gdal_env():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def apply_gdal_config(**overrides):
+    """将统一配置写入当前进程（osgeo.gdal 与子进程命令行工具均生效）"""
+    config = dict(GDAL_CONFIG, **overrides)
+    for key, value in config.items():
+        os.environ[key] = str(value)
+    try:
+        from osgeo import gdal
+    except ImportError:
+        return config
+    for key, value in config.items():
+        gdal.SetConfigOption(key, str(value))
+    return config
+
+
+def profiles_for_dtype(dtype):
+    """适用于该数据类型的写出配置名列表"""
+    kind = np.dtype(dtype).kind
+    return [name for name in WRITE_PROFILES if kind in PROFILE_DTYPE_KINDS.get(name, kind)]
+
+
+def _resolve(profile, dtype):
+    if profile not in WRITE_PROFILES:
+        raise ValueError(f"未知的写出配置: {profile}，可选: {', '.join(WRITE_PROFILES)}")
+    if dtype is not None and profile not in profiles_for_dtype(dtype):
+        raise ValueError(f"写出配置 {profile} 不适用于 {np.dtype(dtype).name} 数据，可选: "
+                         f"{', '.join(profiles_for_dtype(dtype))}")
+    options = dict(WRITE_PROFILES[profile])
+    if options.get("predictor") == "auto":
+        options["predictor"] = 3 if dtype is not None and np.issubdtype(np.dtype(dtype), np.floating) else 2
+    return options
+
+
+def write_profile(meta, profile="class-uint8-fast", **overrides):
+    """
+    在源数据元数据基础上套用命名写出配置
+
+    :param meta: 源数据 meta/profile（dtype、nodata、transform、crs 等）
+    :param profile: WRITE_PROFILES 中的配置名
+    :param overrides: 额外覆盖的键（如 dtype、nodata、count）
+    :return: 可直接用于 rasterio.open(path, "w", **meta) 的字典
+    """
+    out = {k: v for k, v in dict(meta).items() if k.lower() not in _LAYOUT_KEYS}
+    out.update(overrides)
+    out.update(_resolve(profile, out.get("dtype")))
+    out.update({k: v for k, v in overrides.items() if k.lower() in _LAYOUT_KEYS})
+    return out
+
+
+def gdal_creation_options(profile="class-uint8-fast", dtype="uint8"):
+    """命名配置转换为GDAL创建选项列表，如 ['COMPRESS=ZSTD', 'TILED=YES', ...]（用于 gdal.Warp/Translate）"""
+    options = []
+    for key, value in _resolve(profile, dtype).items():
+        if key == "driver":
+            continue
+        if isinstance(value, bool):
+            value = "YES" if value else "NO"
+        options.append(f"{key.upper()}={str(value).upper()}")
+    return options
+
+
+def gdal_cli_args(profile="class-uint8-fast", dtype="uint8"):
+    """命令行工具参数：-co 创建选项 + --config 全局配置"""
+    args = []
+    for option in gdal_creation_options(profile, dtype):
+        args += ["-co", option]
+    for key, value in GDAL_CONFIG.items():
+        args += ["--config", key, str(value)]
+    return args
+
+
+# --------------------------
+# 写出配置基准测试
+# --------------------------
+def load_sample(sample, max_size=4096):
+    """读取样本数据（栅格左上角最多 max_size×max_size），返回 (数组, meta)"""
+    if isinstance(sample, np.ndarray):
+        meta = {"driver": "GTiff", "count": 1, "dtype": sample.dtype.name,
+                "height": sample.shape[0], "width": sample.shape[1], "nodata": None}
+        return sample, meta
+    with rasterio.open(sample) as src:
+        window = Window(0, 0, min(src.width, max_size), min(src.height, max_size))
+        data = src.read(1, window=window)
+        meta = src.meta.copy()
+        meta.update(count=1, width=data.shape[1], height=data.shape[0],
+                    transform=src.window_transform(window))
+    return data, meta
+
+
+def random_windows(shape, window_size=256, n_windows=50, seed=0):
+    """生成固定随机种子的窗口列表，保证各配置读取相同位置"""
+    rng = np.random.default_rng(seed)
+    size = min(window_size, shape[0], shape[1])
+    return [Window(int(rng.integers(0, shape[1] - size + 1)), int(rng.integers(0, shape[0] - size + 1)), size, size)
+            for _ in range(n_windows)]
+
+
+def measure_layout(data, meta, path, windows, repeats=3):
+    """
+    按给定写出参数实测一次存储布局：写出、整幅读取、随机窗口读取（各取最快一次）
+
+    :param data: 二维数组
+    :param meta: 完整写出参数（rasterio.open 的关键字参数）
+    :param path: 临时文件路径
+    :param windows: 随机读取窗口列表
+    :param repeats: 重复次数
+    :return: dict（文件大小、压缩比、写出/读取吞吐量、窗口读取延迟）
+    """
+    raw_mb = data.nbytes / 1024 ** 2
+    write_times, read_times, window_times = [], [], []
+    for _ in range(repeats):
+        if os.path.exists(path):
+            os.remove(path)
+        start = time.perf_counter()
+        with rasterio.open(path, "w", **meta) as dst:
+            dst.write(data, 1)
+        write_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with rasterio.open(path) as src:
+            src.read(1)
+        read_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with rasterio.open(path) as src:
+            for window in windows:
+                src.read(1, window=window)
+        window_times.append((time.perf_counter() - start) / max(1, len(windows)))
+
+    file_mb = os.path.getsize(path) / 1024 ** 2
+    return {
+        "size_mb": file_mb,
+        "ratio": raw_mb / file_mb if file_mb else np.nan,
+        "write_s": min(write_times),
+        "read_s": min(read_times),
+        "write_mb_s": raw_mb / min(write_times),
+        "read_mb_s": raw_mb / min(read_times),
+        "window_ms": min(window_times) * 1000,
+    }
+
+
+def benchmark_profiles(sample, profiles=None, max_size=4096, repeats=3, n_windows=50, window_size=256, seed=0):
+    """
+    对各写出配置实测写出、整幅读取与随机窗口读取吞吐量
+
+    :param sample: 样本栅格路径或二维数组
+    :param profiles: 待测配置名列表，默认适用于样本数据类型的全部配置
+    :param max_size: 样本最大边长（像元）
+    :param repeats: 重复次数（取最快一次）
+    :param n_windows: 随机窗口读取次数
+    :param window_size: 随机窗口边长
+    :return: DataFrame（按综合得分降序）
+    """
+    data, meta = load_sample(sample, max_size)
+    windows = random_windows(data.shape, window_size, n_windows, seed)
+
+    rows = []
+    tmp_dir = tempfile.mkdtemp(prefix="raster_io_bench_")
+    try:
+        with gdal_env(GDAL_CACHEMAX=64):
+            for name in profiles or profiles_for_dtype(data.dtype):
+                path = os.path.join(tmp_dir, f"{name}.tif")
+                result = measure_layout(data, write_profile(meta, name), path, windows, repeats)
+                rows.append(dict(profile=name, **result))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    results = pd.DataFrame(rows).drop(columns=["write_s", "read_s"])
+    # 综合得分：读写吞吐量的几何平均
+    results["score"] = np.sqrt(results["write_mb_s"] * results["read_mb_s"])
+    return results.sort_values("score", ascending=False).reset_index(drop=True)
+
+
+def best_profile(results, read_weight=0.5, max_size_mb=None):
+    """
+    按实测结果选择最佳配置：读写吞吐量加权几何平均最高者
+
+    :param results: benchmark_profiles 的结果
+    :param read_weight: 读取吞吐量权重（0~1），数据写一次读多次时应调高
+    :param max_size_mb: 可选，文件大小上限，超过的配置不参与选择
+    """
+    candidates = results if max_size_mb is None else results[results["size_mb"] <= max_size_mb]
+    if candidates.empty:
+        candidates = results
+    score = candidates["read_mb_s"] ** read_weight * candidates["write_mb_s"] ** (1 - read_weight)
+    return candidates.loc[score.idxmax(), "profile"]
+
+
+if __name__ == "__main__":
+    # 以一期冻土数据为样本测试各写出配置
+    sample_path = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\result1\fused_1961_1965_TTOP.tif"
+
+    report = benchmark_profiles(sample_path)
+    pd.set_option("display.width", 200)
+    print(report.to_string(index=False))
+    print(f"推荐配置: {best_profile(report, read_weight=0.7)}")
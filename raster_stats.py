@@ -0,0 +1,171 @@
+import os
+import json
+from collections import Counter
+
+import numpy as np
+import rasterio
+
+# 旁挂统计文件后缀：<栅格路径>.stats.json
+SIDECAR_SUFFIX = ".stats.json"
+# 类别直方图保存在波段元数据中的键名（其余键沿用 GDAL 的 STATISTICS_* 约定）
+HISTOGRAM_TAG = "CLASS_HISTOGRAM"
+
+
+class StatsAccumulator:
+    """
+    写出时逐块累计统计量（类别直方图、最小/最大值、均值、有效与NoData像元数），不产生额外读取
+
+        stats = StatsAccumulator(meta["dtype"], meta.get("nodata"))
+        with rasterio.open(path, "w", **meta) as dst:
+            for window, block in ...:
+                dst.write(block, 1, window=window)
+                stats.update(block)
+            stats.write_tags(dst)
+        stats.write_sidecar(path)
+
+    :param dtype: 栅格数据类型
+    :param nodata: NoData 值（None 表示全部像元有效）
+    :param histogram: 是否统计类别直方图，默认整型数据统计、浮点数据不统计
+    """
+
+    def __init__(self, dtype, nodata=None, histogram=None):
+        self.dtype = np.dtype(dtype)
+        self.nodata = nodata
+        is_int = np.issubdtype(self.dtype, np.integer)
+        self.histogram = is_int if histogram is None else histogram
+        # uint8 直接用 bincount 计数，其他整型按唯一值累计
+        self._bins = np.zeros(256, dtype=np.int64) if self.dtype == np.uint8 else None
+        self._counter = Counter()
+        self.count = 0
+        self.valid_count = 0
+        self.min = None
+        self.max = None
+        self._sum = 0.0
+
+    def update(self, block):
+        """累计一个数据块（ndarray 或掩膜数组，掩膜像元按 NoData 计）"""
+        block = np.asanyarray(block)
+        self.count += block.size
+        if np.ma.isMaskedArray(block):
+            values = block.compressed()
+        else:
+            values = block.ravel()
+        if self.nodata is not None:
+            if np.isnan(self.nodata):
+                values = values[~np.isnan(values)]
+            else:
+                values = values[values != self.nodata]
+        elif np.issubdtype(values.dtype, np.floating):
+            values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+
+        self.valid_count += values.size
+        lo, hi = values.min().item(), values.max().item()
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+        self._sum += float(values.sum(dtype=np.float64))
+        if self.histogram:
+            if self._bins is not None:
+                self._bins += np.bincount(values, minlength=256)
+            else:
+                uniques, counts = np.unique(values, return_counts=True)
+                self._counter.update(dict(zip(uniques.tolist(), counts.tolist())))
+
+    def merge(self, other):
+        """合并另一个累计器（并行写出时各线程/进程分别累计）"""
+        self.count += other.count
+        self.valid_count += other.valid_count
+        self._sum += other._sum
+        for attr, pick in (("min", min), ("max", max)):
+            values = [v for v in (getattr(self, attr), getattr(other, attr)) if v is not None]
+            setattr(self, attr, pick(values) if values else None)
+        if self._bins is not None and other._bins is not None:
+            self._bins += other._bins
+        self._counter.update(other._counter)
+        return self
+
+    @property
+    def nodata_count(self):
+        return self.count - self.valid_count
+
+    def class_counts(self):
+        """{类别值: 像元数}（只含出现过的类别）"""
+        counts = Counter(self._counter)
+        if self._bins is not None:
+            counts.update({int(v): int(self._bins[v]) for v in np.flatnonzero(self._bins)})
+        return dict(sorted(counts.items()))
+
+    def to_dict(self):
+        return {
+            "dtype": self.dtype.name,
+            "nodata": self.nodata,
+            "count": self.count,
+            "valid_count": self.valid_count,
+            "nodata_count": self.nodata_count,
+            "min": self.min,
+            "max": self.max,
+            "mean": self._sum / self.valid_count if self.valid_count else None,
+            "histogram": {str(k): v for k, v in self.class_counts().items()} if self.histogram else None,
+        }
+
+    def write_tags(self, dst, band=1):
+        """写入波段元数据（GDAL STATISTICS_* 约定，GIS 软件打开时无需重新统计）"""
+        stats = self.to_dict()
+        tags = {
+            "STATISTICS_VALID_COUNT": stats["valid_count"],
+            "STATISTICS_NODATA_COUNT": stats["nodata_count"],
+            "STATISTICS_VALID_PERCENT": round(100 * stats["valid_count"] / stats["count"], 3) if stats["count"] else 0,
+        }
+        if stats["valid_count"]:
+            tags.update(STATISTICS_MINIMUM=stats["min"], STATISTICS_MAXIMUM=stats["max"],
+                        STATISTICS_MEAN=stats["mean"])
+        if stats["histogram"] is not None:
+            tags[HISTOGRAM_TAG] = json.dumps(stats["histogram"])
+        dst.update_tags(band, **tags)
+
+    def write_sidecar(self, raster_path):
+        """写出旁挂 JSON（需在栅格关闭后调用，以修改时间判断是否过期）"""
+        sidecar = raster_path + SIDECAR_SUFFIX
+        with open(sidecar, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return sidecar
+
+
+def load_stats(raster_path, band=1):
+    """
+    读取写出时保存的统计量：优先使用未过期的旁挂 JSON，其次读取波段元数据
+
+    :return: 与 StatsAccumulator.to_dict() 相同结构的字典；没有保存统计量时返回 None
+    """
+    sidecar = raster_path + SIDECAR_SUFFIX
+    if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(raster_path):
+        with open(sidecar, encoding="utf-8") as f:
+            return json.load(f)
+
+    with rasterio.open(raster_path) as src:
+        tags = src.tags(band)
+        if "STATISTICS_VALID_COUNT" not in tags:
+            return None
+        histogram = json.loads(tags[HISTOGRAM_TAG]) if HISTOGRAM_TAG in tags else None
+        valid = int(tags["STATISTICS_VALID_COUNT"])
+        cast = float if np.issubdtype(np.dtype(src.dtypes[band - 1]), np.floating) else int
+        return {
+            "dtype": src.dtypes[band - 1],
+            "nodata": src.nodata,
+            "count": src.width * src.height,
+            "valid_count": valid,
+            "nodata_count": int(tags["STATISTICS_NODATA_COUNT"]),
+            "min": cast(float(tags["STATISTICS_MINIMUM"])) if valid else None,
+            "max": cast(float(tags["STATISTICS_MAXIMUM"])) if valid else None,
+            "mean": float(tags["STATISTICS_MEAN"]) if valid else None,
+            "histogram": histogram,
+        }
+
+
+def class_counts(raster_path, band=1):
+    """写出时保存的类别像元数 {类别值: 像元数}；没有保存直方图时返回 None（调用方回退到全图扫描）"""
+    stats = load_stats(raster_path, band)
+    if not stats or stats.get("histogram") is None:
+        return None
+    return {int(k): v for k, v in stats["histogram"].items()}
@@ -0,0 +1,315 @@
+"""
+逐年 GeoTIFF 重分块为时间序列优化的 zarr 存储：数组形状 (时间, 行, 列)，分块 (全部时间, 256, 256)，
+读取单个像元或一个分块的完整时间序列只需解压一个分块，不必逐个打开每期栅格。
+转换按行带并行写出，在途数据量受内存预算约束；每个分块只由一个线程写入，无需加锁
+
+    python rechunk.py convert E:\\GEOdata\\frozen_series.zarr E:\\GEOdata\\pemefrost\\result1\\fused_*.tif
+    python rechunk.py bench E:\\GEOdata\\frozen_series.zarr E:\\GEOdata\\pemefrost\\result1\\fused_*.tif
+"""
+import os
+import glob
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import rasterio
+import zarr
+from rasterio.crs import CRS
+from rasterio.transform import Affine, rowcol
+from rasterio.windows import Window
+from zarr.codecs import BloscCodec
+
+from raster_catalog import parse_period
+from raster_io import with_gdal_env
+from tracing import span, traced
+
+try:
+    import psutil
+except ImportError:  # 没有 psutil 时使用固定的默认内存预算
+    psutil = None
+
+DEFAULT_BUDGET_MB = 1024
+
+
+def _default_budget_mb(safety_factor=0.5):
+    if psutil is None:
+        return DEFAULT_BUDGET_MB
+    return psutil.virtual_memory().available / 1024 ** 2 * safety_factor
+
+
+def plan_strips(shape, n_times, itemsize, chunk_size=256, memory_budget_mb=None, num_workers=4):
+    """
+    规划写出单元：高度为一个分块、宽度为分块整数倍的行带，保证每个 zarr 分块只属于一个单元
+
+    每个单元在内存中保留读取缓冲与压缩副本（约2倍），在途单元数为 num_workers
+    :return: (单元窗口列表, 实际并行数)
+    """
+    height, width = shape
+    budget = (memory_budget_mb or _default_budget_mb()) * 1024 ** 2
+    chunk_cost = 2 * n_times * chunk_size * chunk_size * itemsize
+    # 预算不足以让每个线程持有一个分块时减少并行数
+    num_workers = max(1, min(num_workers, int(budget // chunk_cost)))
+    n_chunks = max(1, int(budget // (num_workers * chunk_cost)))
+    strip_width = min(width, n_chunks * chunk_size)
+    windows = [
+        Window(col, row, min(strip_width, width - col), min(chunk_size, height - row))
+        for row in range(0, height, chunk_size)
+        for col in range(0, width, strip_width)
+    ]
+    return windows, num_workers
+
+
+@traced("rechunk.convert")
+@with_gdal_env
+def rechunk_to_zarr(raster_paths, store_path, times=None, chunk_size=256, memory_budget_mb=None,
+                    num_workers=4, clevel=3):
+    """
+    将网格一致的多期栅格转换为 (时间, 行, 列) zarr 存储
+
+    :param raster_paths: 按时间排序的栅格路径
+    :param store_path: 输出 .zarr 目录（已存在时覆盖）
+    :param times: 各期时间，默认从文件名解析（时段取末年，与趋势分析一致）
+    :param chunk_size: 空间分块大小，时间维不分块
+    :param memory_budget_mb: 在途数据内存预算，默认可用内存的一半
+    :param num_workers: 并行读写线程数（GDAL 读取与 Blosc 压缩均释放 GIL）
+    :param clevel: zstd 压缩级别
+    :return: store_path
+    """
+    if not raster_paths:
+        raise ValueError("没有输入栅格")
+    if times is None:
+        times = [parse_period(p)[1] for p in raster_paths]
+        if None in times:
+            raise ValueError("无法从文件名解析全部时间，请通过 times 指定")
+
+    with rasterio.open(raster_paths[0]) as ref:
+        profile = ref.profile
+        for path in raster_paths[1:]:
+            with rasterio.open(path) as src:
+                if src.shape != ref.shape or src.transform != ref.transform or src.crs != ref.crs:
+                    raise ValueError(f"{os.path.basename(path)} 与第一期数据网格不一致")
+                if src.dtypes[0] != ref.dtypes[0]:
+                    raise ValueError(f"{os.path.basename(path)} 数据类型与第一期不一致")
+
+    n_times = len(raster_paths)
+    height, width = profile["height"], profile["width"]
+    dtype = np.dtype(profile["dtype"])
+    nodata = profile.get("nodata")
+
+    root = zarr.open_group(store_path, mode="w")
+    data = root.create_array(
+        "data", shape=(n_times, height, width), chunks=(n_times, chunk_size, chunk_size), dtype=dtype,
+        fill_value=nodata if nodata is not None else 0,
+        compressors=BloscCodec(cname="zstd", clevel=clevel, shuffle="bitshuffle"),
+        dimension_names=("time", "y", "x"),
+    )
+    root.create_array("time", shape=(n_times,), chunks=(n_times,), dtype="int32")[:] = np.asarray(times)
+    root.attrs.update({
+        "crs": profile["crs"].to_wkt() if profile.get("crs") else None,
+        "transform": list(profile["transform"])[:6],
+        "nodata": nodata,
+        "sources": [os.path.abspath(p) for p in raster_paths],
+    })
+
+    windows, num_workers = plan_strips((height, width), n_times, dtype.itemsize, chunk_size,
+                                       memory_budget_mb, num_workers)
+    print(f"{n_times} 期 {height}×{width}，{len(windows)} 个写出单元，{num_workers} 个线程")
+
+    # 每个线程持有自己的数据集句柄（rasterio 数据集不能跨线程共用）
+    local = threading.local()
+    opened = []
+    lock = threading.Lock()
+    done = [0]
+
+    def sources():
+        if not hasattr(local, "sources"):
+            local.sources = [rasterio.open(p) for p in raster_paths]
+            with lock:
+                opened.extend(local.sources)
+        return local.sources
+
+    def convert(window):
+        r0, c0 = int(window.row_off), int(window.col_off)
+        h, w = int(window.height), int(window.width)
+        buffer = np.empty((n_times, h, w), dtype=dtype)
+        with span("rechunk.read", row=r0, col=c0) as s:
+            for t, src in enumerate(sources()):
+                src.read(1, window=window, out=buffer[t])
+            s.set(bytes_read=buffer.nbytes)
+        with span("rechunk.write", row=r0, col=c0):
+            data[:, r0:r0 + h, c0:c0 + w] = buffer
+        with lock:
+            done[0] += 1
+            print(f"\r进度: {done[0]}/{len(windows)}", end="")
+
+    try:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            # 按顺序消费结果，任一单元出错时立即抛出
+            for _ in executor.map(convert, windows):
+                pass
+        print()
+    finally:
+        for src in opened:
+            src.close()
+    return store_path
+
+
+# --------------------------
+# 读取时间序列
+# --------------------------
+class SeriesStore:
+    """
+    rechunk_to_zarr 输出的只读访问
+
+    :param store_path: .zarr 目录
+    """
+
+    def __init__(self, store_path):
+        self.store_path = store_path
+        root = zarr.open_group(store_path, mode="r")
+        self.data = root["data"]
+        self.times = root["time"][:]
+        self.transform = Affine(*root.attrs["transform"])
+        self.crs = CRS.from_wkt(root.attrs["crs"]) if root.attrs.get("crs") else None
+        self.nodata = root.attrs.get("nodata")
+        self.sources = root.attrs.get("sources", [])
+
+    @property
+    def shape(self):
+        """空间形状 (行, 列)"""
+        return self.data.shape[1:]
+
+    @property
+    def meta(self):
+        """与 rasterio 数据集 meta 相同结构的单期元数据（用于写出结果栅格）"""
+        return {"driver": "GTiff", "dtype": self.data.dtype.name, "nodata": self.nodata, "width": self.shape[1],
+                "height": self.shape[0], "count": 1, "crs": self.crs, "transform": self.transform}
+
+    @property
+    def chunk_size(self):
+        return self.data.chunks[1]
+
+    def pixel(self, row, col):
+        """单个像元的完整时间序列"""
+        return self.data[:, row, col]
+
+    def pixel_at(self, x, y):
+        """坐标 (x, y)（存储坐标系）处像元的时间序列"""
+        row, col = rowcol(self.transform, x, y)
+        return self.pixel(row, col)
+
+    def read_stack(self, window):
+        """读取窗口的 (时间, 行, 列) 数据块与有效像元掩膜（与 trend_engine._read_stack 一致）"""
+        r0, c0 = int(window.row_off), int(window.col_off)
+        stack = self.data[:, r0:r0 + int(window.height), c0:c0 + int(window.width)]
+        valid = np.ones(stack.shape[1:], dtype=bool)
+        if self.nodata is not None:
+            valid &= np.all(stack != self.nodata, axis=0)
+        if np.issubdtype(stack.dtype, np.floating):
+            valid &= np.all(np.isfinite(stack), axis=0)
+        return stack, valid
+
+    def read_pixels(self, rows, cols):
+        """
+        多个像元的时间序列 (时间, 像元数)：按所在分块分组，每个分块只读取解压一次
+
+        :param rows: 行号序列
+        :param cols: 列号序列
+        """
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        cs = self.chunk_size
+        out = np.empty((self.data.shape[0], rows.size), dtype=self.data.dtype)
+        chunk_ids = (rows // cs) * (self.shape[1] // cs + 1) + cols // cs
+        for chunk_id in np.unique(chunk_ids):
+            idx = np.nonzero(chunk_ids == chunk_id)[0]
+            r0, c0 = rows[idx[0]] // cs * cs, cols[idx[0]] // cs * cs
+            block = self.data[:, r0:r0 + cs, c0:c0 + cs]
+            out[:, idx] = block[:, rows[idx] - r0, cols[idx] - c0]
+        return out
+
+    def windows(self, block_size=None):
+        """按分块（或其整数倍）对齐的窗口，时间序列内核逐块读取时每块只解压对应分块"""
+        block_size = block_size or self.chunk_size
+        height, width = self.shape
+        return [
+            Window(col, row, min(block_size, width - col), min(block_size, height - row))
+            for row in range(0, height, block_size)
+            for col in range(0, width, block_size)
+        ]
+
+
+# --------------------------
+# 基准测试：逐像元与逐块时间序列读取
+# --------------------------
+@with_gdal_env
+def benchmark_series_reads(raster_paths, store_path, n_pixels=1000, seed=0):
+    """
+    对比从逐年 GeoTIFF 与 zarr 存储读取时间序列的耗时，并核对结果一致：
+    随机像元的完整时间序列；按分块遍历全区（时间序列内核的读取方式）
+    """
+    from trend_engine import _read_stack
+
+    series = SeriesStore(store_path)
+    rng = np.random.default_rng(seed)
+    height, width = series.shape
+    rows, cols = rng.integers(0, height, n_pixels), rng.integers(0, width, n_pixels)
+    results = []
+
+    # 1. 随机像元：GeoTIFF 每个像元都要访问每期文件
+    sources = [rasterio.open(p) for p in raster_paths]
+    try:
+        start = time.perf_counter()
+        from_tiff = np.array([[src.read(1, window=Window(int(c), int(r), 1, 1))[0, 0] for src in sources]
+                              for r, c in zip(rows, cols)]).T
+        t_tiff = time.perf_counter() - start
+        start = time.perf_counter()
+        from_zarr = series.read_pixels(rows, cols)
+        t_zarr = time.perf_counter() - start
+        results.append(("随机像元", t_tiff, t_zarr, np.array_equal(from_tiff, from_zarr)))
+
+        # 2. 逐块遍历：GeoTIFF 每块读取 T 个文件，zarr 每块解压一个分块
+        windows = series.windows()
+        start = time.perf_counter()
+        tiff_sum = sum(int(_read_stack(sources, w)[1].sum()) for w in windows)
+        t_tiff = time.perf_counter() - start
+    finally:
+        for src in sources:
+            src.close()
+    start = time.perf_counter()
+    zarr_sum = sum(int(series.read_stack(w)[1].sum()) for w in windows)
+    t_zarr = time.perf_counter() - start
+    results.append(("逐块遍历", t_tiff, t_zarr, tiff_sum == zarr_sum))
+
+    for label, t_tiff, t_zarr, identical in results:
+        print(f"{label}: GeoTIFF {t_tiff:.3f}s | zarr {t_zarr:.3f}s | 加速 {t_tiff / max(t_zarr, 1e-9):.1f}× | "
+              f"结果一致: {identical}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逐年栅格重分块为时间序列 zarr 存储")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("convert", "转换"), ("bench", "对比时间序列读取耗时")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("store", help=".zarr 目录")
+        p.add_argument("inputs", nargs="+", help="栅格路径或通配符（按文件名排序）")
+        if name == "convert":
+            p.add_argument("--chunk-size", type=int, default=256)
+            p.add_argument("--memory-mb", type=float, help="内存预算（MB）")
+            p.add_argument("--workers", type=int, default=4)
+        else:
+            p.add_argument("--pixels", type=int, default=1000)
+    args = parser.parse_args()
+
+    paths = sorted(p for pattern in args.inputs for p in glob.glob(pattern))
+    if args.command == "convert":
+        rechunk_to_zarr(paths, args.store, chunk_size=args.chunk_size, memory_budget_mb=args.memory_mb,
+                        num_workers=args.workers)
+    else:
+        benchmark_series_reads(paths, args.store, args.pixels)
+
+
+if __name__ == "__main__":
+    main()
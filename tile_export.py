@@ -0,0 +1,380 @@
+import os
+import json
+import math
+import hashlib
+import numpy as np
+import rasterio
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import calculate_default_transform, transform_bounds
+from rasterio.windows import Window, bounds as window_bounds
+
+from zonal_stats import grid_signature
+
+TILE_SIZE = 256
+WEB_MERCATOR = "EPSG:3857"
+ORIGIN_SHIFT = 20037508.342789244  # Web墨卡托半周长（米）
+MANIFEST_NAME = "tiles_manifest.json"
+
+# 常用分类调色板：{类别值: 颜色}
+DEGRADATION_PALETTE = {
+    0: "#1f77b4",  # 非冻土
+    1: "#ffffff",  # 冻土
+    2: "#ff7f0e",  # 相对基准期退化
+    3: "#ff0000",  # 退化区
+}
+ESA_WORLDCOVER_PALETTE = {
+    10: "#006400", 20: "#ffbb22", 30: "#ffff4c", 40: "#f096ff", 50: "#fa0000", 60: "#b4b4b4",
+    70: "#f0f0f0", 80: "#0064c8", 90: "#0096a0", 95: "#00cf75", 100: "#fae6a0",
+}
+
+
+# --------------------------
+# 瓦片坐标计算（XYZ，y轴自上而下）
+# --------------------------
+def zoom_resolution(zoom):
+    """指定级别的地面分辨率（米/像素）"""
+    return 2 * ORIGIN_SHIFT / (TILE_SIZE * 2 ** zoom)
+
+
+def tile_bounds(x, y, zoom):
+    """瓦片的Web墨卡托范围 (左, 下, 右, 上)"""
+    size = 2 * ORIGIN_SHIFT / 2 ** zoom
+    left = -ORIGIN_SHIFT + x * size
+    top = ORIGIN_SHIFT - y * size
+    return left, top - size, left + size, top
+
+
+def tile_range(bounds, zoom):
+    """覆盖Web墨卡托范围的瓦片行列号区间 (xmin, ymin, xmax, ymax)，闭区间"""
+    n = 2 ** zoom
+    left, bottom, right, top = (min(max(v, -ORIGIN_SHIFT), ORIGIN_SHIFT) for v in bounds)
+    to_index = lambda v: min(max(int(math.floor(v / (2 * ORIGIN_SHIFT) * n)), 0), n - 1)
+    return (to_index(left + ORIGIN_SHIFT), to_index(ORIGIN_SHIFT - top),
+            to_index(right + ORIGIN_SHIFT - 1e-6), to_index(ORIGIN_SHIFT - bottom - 1e-6))
+
+
+def native_max_zoom(src):
+    """与源数据分辨率最接近（不低于源分辨率）的瓦片级别"""
+    transform, _, _ = calculate_default_transform(src.crs, WEB_MERCATOR, src.width, src.height, *src.bounds)
+    res = abs(transform.a)
+    return int(min(max(math.ceil(math.log2(2 * ORIGIN_SHIFT / (TILE_SIZE * res))), 0), 22))
+
+
+# --------------------------
+# 调色板：类别值 → 调色板索引（0 保留为透明/无数据）
+# --------------------------
+def _parse_color(color):
+    """颜色转 (r, g, b, a)，支持 '#RRGGBB'、'#RRGGBBAA' 和元组"""
+    if isinstance(color, str):
+        color = color.lstrip("#")
+        rgba = tuple(int(color[i:i + 2], 16) for i in range(0, len(color), 2))
+    else:
+        rgba = tuple(int(v) for v in color)
+    return rgba if len(rgba) == 4 else rgba + (255,)
+
+
+def build_palette(palette):
+    """
+    由 {类别值: 颜色} 构建查找表
+
+    :return: (类别值列表, RGBA调色板 (N+1, 4) uint8，第0项透明)
+    """
+    classes = sorted(int(v) for v in palette)
+    if not classes or classes[0] < 0 or len(classes) > 255:
+        raise ValueError("调色板类别值必须为非负整数，且不超过255类")
+    colors = np.zeros((len(classes) + 1, 4), dtype=np.uint8)
+    for i, value in enumerate(classes, 1):
+        colors[i] = _parse_color(palette[value])
+    # 瓦片颜色需可逆（WebP由颜色还原类别），颜色不能重复
+    if len({tuple(c) for c in colors[1:]}) != len(classes):
+        raise ValueError("调色板中存在重复颜色")
+    return classes, colors
+
+
+def palette_hash(palette):
+    """调色板签名，调色板变化时需全部重新生成"""
+    key = json.dumps({str(int(k)): list(_parse_color(v)) for k, v in sorted(palette.items())})
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def classify(data, classes, nodata=None):
+    """将类别值数组转换为调色板索引（uint8），不在调色板中的值及nodata为0"""
+    lut = np.zeros(classes[-1] + 1, dtype=np.uint8)
+    lut[classes] = np.arange(1, len(classes) + 1, dtype=np.uint8)
+
+    valid = (data >= 0) & (data <= classes[-1])
+    if np.issubdtype(data.dtype, np.floating):
+        valid &= np.isfinite(data)
+    if nodata is not None:
+        valid &= data != nodata
+    index = np.zeros(data.shape, dtype=np.uint8)
+    index[valid] = lut[data[valid].astype(np.int64)]
+    return index
+
+
+def mode_2x2(index):
+    """
+    2×2 众数降采样：(2H, 2W) → (H, W)，忽略索引0，票数相同时取较小索引（即较小类别值）
+    """
+    h, w = index.shape[0] // 2, index.shape[1] // 2
+    blocks = index.reshape(h, 2, w, 2).transpose(0, 2, 1, 3).reshape(h, w, 4)
+    counts = (blocks[..., :, None] == blocks[..., None, :]).sum(axis=-1)
+    score = np.where(blocks > 0, counts.astype(np.int32) * 256 + (255 - blocks.astype(np.int32)), -1)
+    best = np.take_along_axis(blocks, score.argmax(axis=-1)[..., None], axis=-1)[..., 0]
+    return np.where(score.max(axis=-1) >= 0, best, 0).astype(np.uint8)
+
+
+# --------------------------
+# 瓦片读写（工作进程）
+# --------------------------
+_worker = {}
+
+
+def _init_worker(raster_path, grid, classes, colors, output_dir, fmt):
+    """工作进程初始化：打开源数据并建立覆盖最高级别瓦片网格的WarpedVRT（每进程一次）"""
+    _worker.update(classes=classes, colors=colors, output_dir=output_dir, fmt=fmt, grid=grid)
+    if raster_path:
+        src = rasterio.open(raster_path)
+        zoom, xmin, ymin, xmax, ymax = grid
+        res = zoom_resolution(zoom)
+        left, _, _, top = tile_bounds(xmin, ymin, zoom)
+        _worker["src"] = src
+        # 源数据没有nodata时添加alpha波段，区分范围外像元与类别0
+        _worker["vrt"] = WarpedVRT(
+            src, crs=WEB_MERCATOR, resampling=Resampling.nearest,
+            transform=rasterio.Affine(res, 0, left, 0, -res, top),
+            width=(xmax - xmin + 1) * TILE_SIZE, height=(ymax - ymin + 1) * TILE_SIZE,
+            nodata=src.nodata, add_alpha=src.nodata is None
+        )
+
+
+def tile_path(output_dir, zoom, x, y, fmt="png"):
+    return os.path.join(output_dir, str(zoom), str(x), f"{y}.{fmt}")
+
+
+def _save_tile(index, zoom, x, y):
+    """保存瓦片；全空瓦片不写出（并删除旧瓦片），返回是否写出"""
+    path = tile_path(_worker["output_dir"], zoom, x, y, _worker["fmt"])
+    if not index.any():
+        if os.path.exists(path):
+            os.remove(path)
+        return False
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    colors = _worker["colors"]
+    if _worker["fmt"] == "png":
+        # 调色板PNG：像元值即调色板索引，低级别瓦片可直接由其还原
+        image = Image.fromarray(index)
+        image.putpalette(colors[:, :3].tobytes(), rawmode="RGB")
+        image.save(path, transparency=colors[:, 3].tobytes(), compress_level=6)
+    else:
+        Image.fromarray(colors[index], "RGBA").save(path, lossless=True, quality=100, method=4)
+    return True
+
+
+def _load_tile(zoom, x, y):
+    """读取已生成瓦片的调色板索引，不存在时返回None"""
+    path = tile_path(_worker["output_dir"], zoom, x, y, _worker["fmt"])
+    if not os.path.exists(path):
+        return None
+    with Image.open(path) as image:
+        if image.mode == "P":
+            return np.asarray(image, dtype=np.uint8)
+        rgba = np.asarray(image.convert("RGBA"), dtype=np.uint8)
+
+    # WebP（无损）按颜色反查调色板索引
+    colors = _worker["colors"]
+    packed = rgba.view(np.uint32)[..., 0]
+    keys = colors[1:].copy().view(np.uint32)[:, 0]
+    order = np.argsort(keys)
+    pos = np.clip(np.searchsorted(keys[order], packed), 0, len(keys) - 1)
+    index = (order[pos] + 1).astype(np.uint8)
+    index[(keys[order][pos] != packed) | (rgba[..., 3] == 0)] = 0
+    return index
+
+
+def _render_base_tiles(tiles):
+    """生成最高级别瓦片：从WarpedVRT按瓦片窗口读取（窗口与瓦片网格严格对齐）"""
+    zoom, xmin, ymin, _, _ = _worker["grid"]
+    vrt, src = _worker["vrt"], _worker["src"]
+    written = 0
+    for x, y in tiles:
+        window = Window((x - xmin) * TILE_SIZE, (y - ymin) * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        index = classify(vrt.read(1, window=window), _worker["classes"], src.nodata)
+        if src.nodata is None:
+            index[vrt.read(vrt.count, window=window) == 0] = 0
+        written += _save_tile(index, zoom, x, y)
+    return written
+
+
+def _render_parent_tiles(zoom, tiles):
+    """由下一级的4个子瓦片众数合成上一级瓦片，不再读取源数据"""
+    written = 0
+    for x, y in tiles:
+        mosaic = np.zeros((TILE_SIZE * 2, TILE_SIZE * 2), dtype=np.uint8)
+        for dy in (0, 1):
+            for dx in (0, 1):
+                child = _load_tile(zoom + 1, 2 * x + dx, 2 * y + dy)
+                if child is not None:
+                    mosaic[dy * TILE_SIZE:(dy + 1) * TILE_SIZE, dx * TILE_SIZE:(dx + 1) * TILE_SIZE] = child
+        written += _save_tile(mode_2x2(mosaic), zoom, x, y)
+    return written
+
+
+# --------------------------
+# 增量更新：按源数据块哈希判断需要重新生成的瓦片
+# --------------------------
+def _hash_windows(src, hash_block):
+    """按与内部分块对齐的窗口切分源数据"""
+    by, bx = src.block_shapes[0]
+    step_y = max(by, hash_block // by * by)
+    step_x = max(bx, hash_block // bx * bx)
+    return [
+        Window(col, row, min(step_x, src.width - col), min(step_y, src.height - row))
+        for row in range(0, src.height, step_y)
+        for col in range(0, src.width, step_x)
+    ]
+
+
+def source_block_hashes(src, hash_block=1024):
+    """计算源数据各窗口的内容哈希 {"行_列": 哈希}"""
+    hashes = {}
+    for window in _hash_windows(src, hash_block):
+        data = src.read(1, window=window)
+        hashes[f"{window.row_off}_{window.col_off}"] = hashlib.blake2b(data.tobytes(), digest_size=8).hexdigest()
+    return hashes
+
+
+def _window_tiles(src, window, zoom):
+    """源数据窗口（外扩1像元，考虑最邻近采样的边缘效应）覆盖的最高级别瓦片"""
+    window = Window(window.col_off - 1, window.row_off - 1, window.width + 2, window.height + 2)
+    bounds = transform_bounds(src.crs, WEB_MERCATOR, *window_bounds(window, src.transform), densify_pts=21)
+    xmin, ymin, xmax, ymax = tile_range(bounds, zoom)
+    return {(x, y) for x in range(xmin, xmax + 1) for y in range(ymin, ymax + 1)}
+
+
+def _chunks(items, size):
+    items = sorted(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def export_tiles(raster_path, output_dir, palette, min_zoom=0, max_zoom=None, fmt="png",
+                 num_workers=4, tiles_per_task=64, hash_block=1024, force=False):
+    """
+    将分类栅格导出为Web墨卡托XYZ瓦片金字塔（{z}/{x}/{y}.png|webp）
+
+    最高级别由源数据（WarpedVRT最邻近重采样）直接生成，其余级别由下一级瓦片
+    2×2众数合成；全空/nodata瓦片不写出。再次运行时仅重新生成源数据块发生变化的瓦片
+
+    :param raster_path: 分类栅格路径（如裁剪后的土地覆盖、退化结果）
+    :param output_dir: 瓦片输出目录
+    :param palette: 调色板 {类别值: 颜色}，未列出的类别值视为透明
+    :param min_zoom: 最低级别
+    :param max_zoom: 最高级别，默认与源分辨率匹配
+    :param fmt: 'png'（调色板PNG）或 'webp'（无损WebP）
+    :param num_workers: 进程数
+    :param tiles_per_task: 每个任务处理的瓦片数
+    :param hash_block: 增量判断时源数据块大小（像元）
+    :param force: 是否忽略清单强制全部重新生成
+    :return: 各级别写出的瓦片数 {级别: 数量}
+    """
+    fmt = fmt.lower()
+    if fmt not in ("png", "webp"):
+        raise ValueError("瓦片格式仅支持 png 或 webp")
+    classes, colors = build_palette(palette)
+    os.makedirs(output_dir, exist_ok=True)
+
+    with rasterio.open(raster_path) as src:
+        if src.crs is None:
+            raise ValueError(f"栅格缺少坐标系: {raster_path}")
+        max_zoom = native_max_zoom(src) if max_zoom is None else max_zoom
+        min_zoom = min(min_zoom, max_zoom)
+        merc_bounds = transform_bounds(src.crs, WEB_MERCATOR, *src.bounds, densify_pts=21)
+        grid = (max_zoom,) + tile_range(merc_bounds, max_zoom)
+
+        stat = os.stat(raster_path)
+        manifest = {
+            "source": os.path.abspath(raster_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "grid": grid_signature(src),
+            "palette": palette_hash(palette),
+            "format": fmt,
+            "zooms": [min_zoom, max_zoom],
+            "hash_block": hash_block,
+        }
+
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        previous = None
+        if not force and os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        reusable = previous is not None and all(
+            previous.get(k) == manifest[k] for k in ("source", "grid", "palette", "format", "zooms", "hash_block"))
+
+        if reusable and previous["size"] == manifest["size"] and previous["mtime_ns"] == manifest["mtime_ns"]:
+            print(f"源数据未变化，瓦片已是最新: {output_dir}")
+            return {}
+
+        print(f"计算源数据块哈希: {os.path.basename(raster_path)}")
+        manifest["blocks"] = source_block_hashes(src, hash_block)
+        if reusable:
+            old_blocks = previous.get("blocks", {})
+            dirty = set()
+            for window in _hash_windows(src, hash_block):
+                key = f"{window.row_off}_{window.col_off}"
+                if old_blocks.get(key) != manifest["blocks"][key]:
+                    dirty |= _window_tiles(src, window, max_zoom)
+            print(f"源数据变化块涉及 {len(dirty)} 个最高级别瓦片")
+        else:
+            _, xmin, ymin, xmax, ymax = grid
+            dirty = {(x, y) for x in range(xmin, xmax + 1) for y in range(ymin, ymax + 1)}
+        _, xmin, ymin, xmax, ymax = grid
+        dirty = {(x, y) for x, y in dirty if xmin <= x <= xmax and ymin <= y <= ymax}
+
+    counts = {}
+    with ProcessPoolExecutor(max_workers=max(1, num_workers), initializer=_init_worker,
+                             initargs=(raster_path, grid, classes, colors, output_dir, fmt)) as executor:
+        # 最高级别：读取源数据，瓦片分批并行
+        counts[max_zoom] = sum(executor.map(_render_base_tiles, _chunks(dirty, tiles_per_task)))
+        print(f"级别 {max_zoom}: 更新 {len(dirty)} 个瓦片，写出 {counts[max_zoom]} 个")
+
+        # 其余级别：逐级向上合成，仅处理子瓦片有变化的父瓦片
+        for zoom in range(max_zoom - 1, min_zoom - 1, -1):
+            dirty = {(x // 2, y // 2) for x, y in dirty}
+            chunks = _chunks(dirty, tiles_per_task)
+            counts[zoom] = sum(executor.map(_render_parent_tiles, [zoom] * len(chunks), chunks))
+            print(f"级别 {zoom}: 更新 {len(dirty)} 个瓦片，写出 {counts[zoom]} 个")
+
+    # 瓦片元数据（TileJSON）与增量清单
+    lon_lat = transform_bounds(WEB_MERCATOR, "EPSG:4326", *merc_bounds)
+    tilejson = {
+        "tilejson": "3.0.0",
+        "name": os.path.splitext(os.path.basename(raster_path))[0],
+        "tiles": [f"{{z}}/{{x}}/{{y}}.{fmt}"],
+        "minzoom": min_zoom,
+        "maxzoom": max_zoom,
+        "bounds": [round(v, 6) for v in lon_lat],
+        "legend": {str(v): "#%02x%02x%02x" % tuple(colors[i, :3]) for i, v in enumerate(classes, 1)},
+    }
+    with open(os.path.join(output_dir, "tiles.json"), "w", encoding="utf-8") as f:
+        json.dump(tilejson, f, ensure_ascii=False, indent=2)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    print(f"瓦片导出完成: {output_dir}")
+    return counts
+
+
+if __name__ == "__main__":
+    # 退化结果瓦片
+    export_tiles(
+        r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\degradation_engine\total_degradation.tif",
+        r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\tiles\total_degradation",
+        DEGRADATION_PALETTE,
+        min_zoom=3,
+        num_workers=6
+    )
@@ -0,0 +1,276 @@
+import os
+import sys
+import json
+import time
+import atexit
+import functools
+import threading
+import multiprocessing.util
+
+try:
+    import psutil
+except ImportError:  # 没有 psutil 时不记录内存与读写字节数
+    psutil = None
+
+# 当前追踪器；为 None 时所有埋点直接返回，开销只有一次全局变量判断
+_tracer = None
+_local = threading.local()
+
+
+class _NoopSpan:
+    """关闭追踪时使用的空埋点"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def _gdal_cache_used():
+    """GDAL 块缓存已用字节数（仅安装 osgeo 时可用）"""
+    gdal = sys.modules.get("osgeo.gdal")
+    return gdal.GetCacheUsed() if gdal is not None else None
+
+
+def _peak_rss():
+    """进程生命周期内的峰值常驻内存（字节）"""
+    if psutil is None:
+        return None
+    info = psutil.Process().memory_info()
+    peak = getattr(info, "peak_wset", None)  # Windows
+    if peak is None:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak *= 1 if sys.platform == "darwin" else 1024  # Linux 单位为KB
+        except ImportError:
+            peak = info.rss
+    return peak
+
+
+def _io_counters():
+    if psutil is None:
+        return None
+    try:
+        io = psutil.Process().io_counters()
+    except (AttributeError, psutil.Error):
+        return None
+    return getattr(io, "read_chars", io.read_bytes), getattr(io, "write_chars", io.write_bytes)
+
+
+class Span:
+    """一段计时区间；resources=True 时额外记录读写字节数、内存与GDAL缓存变化"""
+    __slots__ = ("tracer", "name", "attrs", "resources", "start_ns", "parent", "_io", "_cache")
+
+    def __init__(self, tracer, name, attrs, resources):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.resources = resources
+
+    def set(self, **attrs):
+        """追加属性，如 span.set(bytes_read=data.nbytes)"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        if self.resources:
+            self._io = _io_counters()
+            self._cache = _gdal_cache_used()
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end_ns = time.perf_counter_ns()
+        _local.stack.pop()
+        record = {
+            "name": self.name,
+            "parent": self.parent,
+            "start_us": (self.start_ns - self.tracer.origin_ns) // 1000,
+            "duration_us": (end_ns - self.start_ns) // 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if exc_type is not None:
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        if self.resources:
+            io = _io_counters()
+            if io and self._io:
+                record["bytes_read"] = io[0] - self._io[0]
+                record["bytes_written"] = io[1] - self._io[1]
+            cache = _gdal_cache_used()
+            if cache is not None:
+                record["gdal_cache_used"] = cache
+                record["gdal_cache_delta"] = cache - (self._cache or 0)
+            if psutil is not None:
+                record["rss_mb"] = round(psutil.Process().memory_info().rss / 1024 ** 2, 1)
+                record["peak_rss_mb"] = round(_peak_rss() / 1024 ** 2, 1)
+        if self.attrs:
+            record["attrs"] = self.attrs
+        self.tracer.emit(record)
+        return False
+
+
+class Tracer:
+    """收集埋点记录，输出 JSON Lines（逐条追加）和/或 Chrome 追踪格式（chrome://tracing、Perfetto）"""
+
+    def __init__(self, jsonl_path=None, chrome_path=None, flush_every=1000, origin_ns=None):
+        self.jsonl_path = jsonl_path
+        self.chrome_path = chrome_path
+        self.flush_every = flush_every
+        self.origin_ns = time.perf_counter_ns() if origin_ns is None else origin_ns
+        self.records = []
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        with self._lock:
+            self.records.append(record)
+            self._pending.append(record)
+            if len(self._pending) >= self.flush_every:
+                self._flush_jsonl()
+
+    def _flush_jsonl(self):
+        if self.jsonl_path and self._pending:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                for record in self._pending:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._pending = []
+
+    def chrome_events(self):
+        events = []
+        for r in self.records:
+            args = dict(r.get("attrs", {}))
+            args.update({k: v for k, v in r.items()
+                         if k not in ("name", "start_us", "duration_us", "pid", "tid", "attrs", "parent")})
+            events.append({"name": r["name"], "cat": r["name"].split(".")[0], "ph": "X",
+                           "ts": r["start_us"], "dur": r["duration_us"], "pid": r["pid"], "tid": r["tid"],
+                           "args": args})
+        return events
+
+    def close(self):
+        with self._lock:
+            self._flush_jsonl()
+            if self.chrome_path:
+                with open(self.chrome_path, "w", encoding="utf-8") as f:
+                    json.dump({"traceEvents": self.chrome_events(), "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+
+def _process_path(path, pid=None):
+    """子进程的输出路径：文件名后加进程号（trace.jsonl → trace.1234.jsonl），避免多个进程写同一文件"""
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{pid or os.getpid()}{ext}"
+
+
+def enable_tracing(jsonl_path=None, chrome_path=None, flush_every=1000):
+    """
+    开启追踪。fork 出的子进程（进程池工作进程等）自动改为写入带进程号的文件
+
+    :param jsonl_path: JSON Lines 输出路径（每个埋点一行）
+    :param chrome_path: Chrome 追踪格式输出路径（关闭追踪时写出）
+    :return: Tracer
+    """
+    global _tracer
+    if _tracer is not None:
+        disable_tracing()
+    for path in (jsonl_path, chrome_path):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    _tracer = Tracer(jsonl_path, chrome_path, flush_every)
+    return _tracer
+
+
+def disable_tracing():
+    """关闭追踪并写出全部结果，返回已收集的记录"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return []
+    tracer.close()
+    return tracer.records
+
+
+def tracing_enabled():
+    return _tracer is not None
+
+
+def _reset_in_child():
+    """
+    fork 后的子进程：丢弃从父进程继承的记录和未写出的缓冲（否则会重复写出），
+    改为写入本进程自己的文件；逐条写出，进程池被 terminate 时 JSON Lines 也不丢失
+    """
+    global _tracer
+    _local.__dict__.clear()
+    parent = _tracer
+    if parent is None:
+        return
+    _tracer = Tracer(_process_path(parent.jsonl_path), _process_path(parent.chrome_path),
+                     flush_every=1, origin_ns=parent.origin_ns)
+
+
+def _flush_at_child_exit(_):
+    # multiprocessing 子进程以 os._exit 退出，不执行 atexit；注册为进程退出时的终结函数
+    if _tracer is not None:
+        multiprocessing.util.Finalize(None, disable_tracing, exitpriority=10)
+
+
+if hasattr(os, "register_at_fork"):  # Windows 只有 spawn，子进程重新导入本模块
+    os.register_at_fork(after_in_child=_reset_in_child)
+multiprocessing.util.register_after_fork(Tracer, _flush_at_child_exit)  # 以常驻的类对象为键（弱引用）
+
+
+def span(name, resources=False, **attrs):
+    """
+    计时上下文：with span("merge.window", row=i, col=j) as s: ...; s.set(bytes_read=n)
+
+    :param name: 埋点名称，建议 "阶段.子步骤" 形式
+    :param resources: 是否记录读写字节数、内存与GDAL缓存（阶段级埋点使用，逐窗口埋点保持关闭）
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP
+    return Span(tracer, name, attrs, resources)
+
+
+def traced(name=None, resources=True):
+    """装饰器：将函数调用记录为阶段级埋点（默认记录资源占用）"""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            with Span(tracer, span_name, {}, resources):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# 设置环境变量 LANDUSE_TRACE=<路径.jsonl> 即可在不改代码的情况下开启追踪
+if os.environ.get("LANDUSE_TRACE"):
+    _trace_path = os.environ["LANDUSE_TRACE"]
+    _chrome_path = os.path.splitext(_trace_path)[0] + ".trace.json"
+    if os.environ.setdefault("LANDUSE_TRACE_OWNER", str(os.getpid())) != str(os.getpid()):
+        # spawn 启动的子进程或子脚本继承了环境变量：写入带进程号的文件
+        enable_tracing(_process_path(_trace_path), _process_path(_chrome_path), flush_every=1)
+    else:
+        enable_tracing(_trace_path, _chrome_path)
+    atexit.register(disable_tracing)
@@ -0,0 +1,344 @@
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.windows import Window
+from scipy import stats
+
+from raster_io import with_gdal_env, write_profile
+from tracing import span, traced
+
+TREND_NODATA = -9999.0
+TREND_OUTPUTS = ["slope", "intercept", "r2", "p_value", "sen_slope", "mk_z", "mk_p"]
+
+
+# --------------------------
+# 1. 向量化趋势统计核心（输入形状为 (时间, 像元数)）
+# --------------------------
+def ols_trend(y, t):
+    """
+    逐列最小二乘线性趋势
+
+    :param y: (T, N) 数组，每列为一条时间序列
+    :param t: 长度为T的时间（年份）
+    :return: slope, intercept, r2, p_value，均为长度N的数组
+    """
+    y = np.asarray(y, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    n = t.size
+
+    t_mean = t.mean()
+    tc = t - t_mean
+    sxx = np.sum(tc ** 2)
+
+    y_mean = y.mean(axis=0)
+    yc = y - y_mean
+    syy = np.sum(yc ** 2, axis=0)
+
+    slope = tc @ yc / sxx
+    intercept = y_mean - slope * t_mean
+    ss_res = np.maximum(syy - slope ** 2 * sxx, 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # 常数序列：与 stats.linregress 保持一致，R²=0，P=1
+        r2 = np.where(syy > 0, 1.0 - ss_res / syy, 0.0)
+        if n > 2:
+            std_err = np.sqrt(ss_res / (n - 2) / sxx)
+            t_stat = np.where(std_err > 0, slope / std_err, np.where(slope == 0, 0.0, np.inf))
+            p_value = 2 * stats.t.sf(np.abs(t_stat), n - 2)
+        else:
+            p_value = np.full(slope.shape, np.nan)
+    p_value = np.where(syy > 0, p_value, 1.0)
+
+    return slope, intercept, r2, p_value
+
+
+def mann_kendall(y):
+    """
+    逐列Mann-Kendall趋势检验（含结值修正）
+
+    :param y: (T, N) 数组
+    :return: s, z, p_value，均为长度N的数组
+    """
+    y = np.asarray(y)
+    n = y.shape[0]
+
+    s = np.zeros(y.shape[1:], dtype=np.int64)
+    tie_sum = np.zeros(y.shape[1:], dtype=np.float64)
+    for i in range(n):
+        s += np.sign(y[i + 1:] - y[i]).sum(axis=0).astype(np.int64)
+        # c 为与第i个值相等的个数（含自身），结值组大小为t时共贡献 t(t-1)(2t+5)
+        c = (y == y[i]).sum(axis=0)
+        tie_sum += (c - 1) * (2 * c + 5)
+
+    var_s = (n * (n - 1) * (2 * n + 5) - tie_sum) / 18.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sd = np.sqrt(var_s)
+        z = np.where(s > 0, (s - 1) / sd, np.where(s < 0, (s + 1) / sd, 0.0))
+    z = np.where(var_s > 0, z, 0.0)
+    p_value = 2 * stats.norm.sf(np.abs(z))
+
+    return s, z, p_value
+
+
+def sen_slope(y, t, max_elements=2 ** 25):
+    """
+    逐列Sen斜率（所有两两斜率的中位数），按像元分批控制内存
+
+    :param y: (T, N) 数组
+    :param t: 长度为T的时间
+    :param max_elements: 单批两两斜率数组的最大元素数
+    :return: 长度N的数组
+    """
+    y = np.asarray(y, dtype=np.float32)
+    t = np.asarray(t, dtype=np.float64)
+    i_idx, j_idx = np.triu_indices(t.size, k=1)
+    dt = (t[j_idx] - t[i_idx]).astype(np.float32)[:, None]
+
+    n_pixels = y.shape[1]
+    batch = max(1, max_elements // max(1, i_idx.size))
+    result = np.empty(n_pixels, dtype=np.float64)
+    for start in range(0, n_pixels, batch):
+        block = y[:, start:start + batch]
+        pair_slopes = (block[j_idx] - block[i_idx]) / dt
+        result[start:start + batch] = np.median(pair_slopes, axis=0)
+    return result
+
+
+def trend_block(stack, t, valid=None):
+    """
+    计算一个数据块 (T, rows, cols) 的全部趋势指标
+
+    :param stack: (T, rows, cols) 数组
+    :param t: 长度为T的时间
+    :param valid: 可选 (rows, cols) 布尔数组，False 的像元输出 TREND_NODATA
+    :return: {指标名: (rows, cols) float32 数组}
+    """
+    n_time, rows, cols = stack.shape
+    flat = stack.reshape(n_time, -1)
+    valid_flat = np.ones(flat.shape[1], dtype=bool) if valid is None else valid.reshape(-1)
+
+    outputs = {name: np.full(flat.shape[1], TREND_NODATA, dtype=np.float32) for name in TREND_OUTPUTS}
+    if valid_flat.any():
+        series = flat[:, valid_flat]
+        slope, intercept, r2, p_value = ols_trend(series, t)
+        _, z, mk_p = mann_kendall(series)
+        values = {
+            "slope": slope,
+            "intercept": intercept,
+            "r2": r2,
+            "p_value": p_value,
+            "sen_slope": sen_slope(series, t),
+            "mk_z": z,
+            "mk_p": mk_p
+        }
+        for name, value in values.items():
+            outputs[name][valid_flat] = value
+
+    return {name: value.reshape(rows, cols) for name, value in outputs.items()}
+
+
+def _kendall_exact_pvalue(n, c):
+    """
+    无结值时Kendall检验的精确双侧P值（与 scipy.stats.kendalltau 的 exact 方法一致）
+
+    :param n: 样本量
+    :param c: 数组，min(不一致对数, 总对数 - 不一致对数)
+    """
+    # 逆序数分布：dist[k] 为n元排列中恰有k个逆序对的排列数
+    dist = np.ones(1)
+    for m in range(2, n + 1):
+        dist = np.convolve(dist, np.ones(m))
+    cdf = np.cumsum(dist) / dist.sum()
+    return np.minimum(1.0, 2.0 * cdf[np.asarray(c, dtype=np.int64)])
+
+
+def batch_trend_stats(values, years, names=None):
+    """
+    批量计算多条序列的线性趋势与Kendall检验（闭式向量化，无Python逐列循环）
+
+    :param values: (序列数, 年份数) 数组，如各分区、各类别的面积序列
+    :param years: 长度为年份数的时间
+    :param names: 可选，序列名称，作为结果索引
+    :return: DataFrame，列为 slope, intercept, r2, tau, p_value, change_percent
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    years = np.asarray(years, dtype=np.float64)
+    n = years.size
+    if values.shape[1] != n:
+        raise ValueError("序列长度与年份个数不一致")
+
+    y = values.T  # (时间, 序列)
+    slope, intercept, r2, _ = ols_trend(y, years)
+
+    # Kendall tau-b：一致对与不一致对计数，及年份/序列的结值统计
+    con_minus_dis = np.zeros(values.shape[0], dtype=np.float64)
+    dis = np.zeros(values.shape[0], dtype=np.float64)
+    x_ties = np.zeros(3)   # Σt(t-1), Σt(t-1)(t-2), Σt(t-1)(2t+5)
+    y_ties = np.zeros((3, values.shape[0]))
+    for i in range(n):
+        sign = np.sign(years[i + 1:] - years[i])[:, None] * np.sign(y[i + 1:] - y[i])
+        con_minus_dis += sign.sum(axis=0)
+        dis += (sign < 0).sum(axis=0)
+
+        cx = np.sum(years == years[i])
+        cy = (y == y[i]).sum(axis=0)
+        x_ties += [cx - 1, (cx - 1) * (cx - 2), (cx - 1) * (2 * cx + 5)]
+        y_ties += [cy - 1, (cy - 1) * (cy - 2), (cy - 1) * (2 * cy + 5)]
+
+    tot = n * (n - 1) / 2.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tau = con_minus_dis / np.sqrt(tot - x_ties[0] / 2.0) / np.sqrt(tot - y_ties[0] / 2.0)
+
+        # 渐近方法（含结值修正方差）
+        m = n * (n - 1.0)
+        var = ((m * (2 * n + 5) - x_ties[2] - y_ties[2]) / 18.0
+               + 2 * x_ties[0] * y_ties[0] / m
+               + (x_ties[1] * y_ties[1] / (9 * m * (n - 2)) if n > 2 else 0.0))
+        p_value = 2 * stats.norm.sf(np.abs(con_minus_dis) / np.sqrt(var))
+
+        # 无结值且样本较小时使用精确分布
+        c = np.minimum(dis, tot - dis)
+        exact = (x_ties[0] == 0) & (y_ties[0] == 0) & ((n <= 33) | (c <= 1))
+        if exact.any() and n <= 170:
+            p_value = np.where(exact, _kendall_exact_pvalue(n, np.where(exact, c, 0)), p_value)
+
+        mean = values.mean(axis=1)
+        change_percent = np.where(mean != 0, slope / mean * 100, 0.0)
+
+    tau = np.where(np.isfinite(tau), tau, np.nan)
+    p_value = np.where(np.isfinite(tau), p_value, np.nan)
+
+    return pd.DataFrame({
+        "slope": slope,
+        "intercept": intercept,
+        "r2": r2,
+        "tau": tau,
+        "p_value": p_value,
+        "change_percent": change_percent
+    }, index=names)
+
+
+# --------------------------
+# 2. 栅格时间序列分块处理
+# --------------------------
+def parse_period_year(file_name):
+    """从文件名中提取时间（取最后一个四位年份，如 fused_1961_1965_TTOP.tif → 1965）"""
+    years = re.findall(r"(?<!\d)(1[89]\d{2}|20\d{2})(?!\d)", file_name)
+    if not years:
+        raise ValueError(f"无法从文件名解析年份: {file_name}")
+    return int(years[-1])
+
+
+def _read_stack(sources, window):
+    """读取所有时相的同一窗口，返回数据块和有效像元掩膜"""
+    layers = []
+    valid = np.ones((int(window.height), int(window.width)), dtype=bool)
+    for src in sources:
+        data = src.read(1, window=window)
+        if src.nodata is not None:
+            valid &= data != src.nodata
+        if np.issubdtype(data.dtype, np.floating):
+            valid &= np.isfinite(data)
+        layers.append(data)
+    return np.stack(layers), valid
+
+
+def _trend_rasters(read_stack, meta, windows, times, output_dir, prefix, num_workers, profile):
+    """逐块读取 (时间, 行, 列) 数据块并计算趋势，写出各指标栅格"""
+    if len(times) < 3:
+        raise ValueError("趋势分析至少需要3期数据")
+    times = np.asarray(times, dtype=np.float64)
+    os.makedirs(output_dir, exist_ok=True)
+    meta = write_profile(meta, profile, count=1, dtype="float32", nodata=TREND_NODATA)
+
+    output_paths = {name: os.path.join(output_dir, f"{prefix}_{name}.tif") for name in TREND_OUTPUTS}
+    dsts = {name: rasterio.open(path, "w", **meta) for name, path in output_paths.items()}
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+            pending = deque()
+            for k, window in enumerate(windows, 1):
+                with span("statistics.pixel_trend.read", row=window.row_off, col=window.col_off) as s:
+                    stack, valid = read_stack(window)
+                    s.set(bytes_read=stack.nbytes)
+                pending.append((window, executor.submit(trend_block, stack, times, valid)))
+
+                # 限制在途数据块数量，保证内存有界
+                while len(pending) > max(1, num_workers) * 2 or (k == len(windows) and pending):
+                    done_window, future = pending.popleft()
+                    for name, value in future.result().items():
+                        dsts[name].write(value, 1, window=done_window)
+
+                print(f"\r趋势计算进度: {k / len(windows):.1%}", end="")
+    finally:
+        for dst in dsts.values():
+            dst.close()
+    print()
+    return output_paths
+
+
+@traced("statistics.pixel_trend")
+@with_gdal_env
+def pixel_trend_rasters(raster_paths, output_dir, times=None, prefix="trend", block_size=512, num_workers=4,
+                        profile="float-fast"):
+    """
+    逐像元计算时间序列趋势栅格：OLS斜率、截距、R²、P值、Sen斜率、MK检验Z值及P值
+
+    :param raster_paths: 按时间排序的栅格路径（网格需一致），或 rechunk.py 生成的 .zarr 时间序列存储
+    :param output_dir: 输出文件夹
+    :param times: 各期对应时间，默认从文件名解析年份（.zarr 存储使用其中记录的时间）
+    :param prefix: 输出文件名前缀
+    :param block_size: 分块大小
+    :param num_workers: 计算线程数（NumPy运算释放GIL，读写在主线程）
+    :param profile: 输出写出配置（见 raster_io.WRITE_PROFILES）
+    :return: {指标名: 输出路径}
+    """
+    if isinstance(raster_paths, str):
+        # 时间维不分块的 zarr 存储：每个数据块的完整时间序列只需解压一个分块
+        from rechunk import SeriesStore
+        series = SeriesStore(raster_paths)
+        return _trend_rasters(series.read_stack, series.meta, series.windows(block_size), series.times,
+                              output_dir, prefix, num_workers, profile)
+
+    if len(raster_paths) < 3:
+        raise ValueError("趋势分析至少需要3期数据")
+    if times is None:
+        times = [parse_period_year(os.path.basename(p)) for p in raster_paths]
+
+    sources = [rasterio.open(p) for p in raster_paths]
+    try:
+        ref = sources[0]
+        for src, path in zip(sources[1:], raster_paths[1:]):
+            if src.shape != ref.shape or src.transform != ref.transform or src.crs != ref.crs:
+                raise ValueError(f"{os.path.basename(path)} 与第一期数据网格不一致")
+
+        windows = [
+            Window(col, row, min(block_size, ref.width - col), min(block_size, ref.height - row))
+            for row in range(0, ref.height, block_size)
+            for col in range(0, ref.width, block_size)
+        ]
+        output_paths = _trend_rasters(lambda window: _read_stack(sources, window), ref.meta, windows, times,
+                                      output_dir, prefix, num_workers, profile)
+    finally:
+        for src in sources:
+            src.close()
+
+    return output_paths
+
+
+if __name__ == "__main__":
+    from glob import glob
+
+    # 12期冻土数据（fused_1961_1965_TTOP.tif ...），时间取各时段末年
+    input_folder = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\result1"
+    output_folder = r"E:\GEOdata\pemefrost\QTP_permfrost_change_data_1961_2020\trend_rasters"
+
+    raster_files = sorted(glob(os.path.join(input_folder, "fused_*.tif")))
+    results = pixel_trend_rasters(raster_files, output_folder, prefix="frozen", num_workers=6)
+    for name, path in results.items():
+        print(f"{name}: {path}")
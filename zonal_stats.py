@@ -0,0 +1,294 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+import rasterio
+import fiona
+from rasterio.features import bounds as geometry_bounds, rasterize
+from rasterio.warp import transform_geom
+from rasterio.windows import Window, bounds as window_bounds, transform as window_transform
+from multiprocessing import Pool
+
+try:
+    from pyproj import CRS as ProjCRS
+except ImportError:  # 没有 pyproj 时地理坐标系按 WGS84 椭球计算像元面积
+    ProjCRS = None
+
+from raster_io import write_profile
+from tracing import traced
+
+
+def grid_signature(src):
+    """根据坐标系、仿射变换和行列数生成栅格网格签名（网格一致则签名一致）"""
+    crs_wkt = src.crs.to_wkt() if src.crs else ""
+    key = f"{crs_wkt}|{tuple(round(v, 9) for v in src.transform[:6])}|{src.width}x{src.height}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+# 分区栅格化的窗口大小（uint16 分区约 8MB）
+ZONE_WINDOW_SIZE = 2048
+# WGS84 椭球长半轴（m）与扁率
+WGS84_ELLIPSOID = (6378137.0, 1 / 298.257223563)
+
+
+def _ellipsoid(crs):
+    """坐标系所用椭球的 (长半轴, 扁率)"""
+    if ProjCRS is not None:
+        geod = ProjCRS.from_wkt(crs.to_wkt()).get_geod()
+        if geod is not None:
+            return geod.a, geod.f
+    return WGS84_ELLIPSOID
+
+
+def row_pixel_areas(src):
+    """
+    每行像元面积（km²）。投影坐标系按像元宽×高（单位米）；
+    地理坐标系按椭球上经纬度网格的面积（随纬度变化，逐行计算）
+    """
+    transform = src.transform
+    if src.crs is None or not src.crs.is_geographic:
+        return np.full(src.height, abs(transform.a * transform.e) / 1e6)
+    if transform.b or transform.d:
+        raise ValueError("地理坐标系下不支持旋转的仿射变换")
+
+    a, f = _ellipsoid(src.crs)
+    e2 = f * (2 - f)
+    e = np.sqrt(e2)
+    b2 = (a * (1 - f)) ** 2
+
+    def zone_area(lat):
+        # 赤道到纬度 lat、经度跨 1 弧度的椭球面积
+        s = np.sin(np.radians(np.clip(lat, -90, 90)))
+        if e == 0:
+            return b2 * s
+        return b2 / 2 * (s / (1 - e2 * s * s) + np.log((1 + e * s) / (1 - e * s)) / (2 * e))
+
+    edges = transform.f + transform.e * np.arange(src.height + 1)
+    return np.abs(zone_area(edges[:-1]) - zone_area(edges[1:])) * np.radians(abs(transform.a)) / 1e6
+
+
+def _zone_cache_key(vector_file, reference_raster, id_field, all_touched):
+    """分区栅格缓存键：矢量文件状态 + 参数 + 参考网格签名"""
+    stat = os.stat(vector_file)
+    with rasterio.open(reference_raster) as src:
+        grid_sig = grid_signature(src)
+    key = f"{os.path.abspath(vector_file)}|{stat.st_size}|{stat.st_mtime_ns}|{id_field}|{all_touched}|{grid_sig}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def build_zone_raster(vector_file, reference_raster, id_field=None, cache_dir=None, all_touched=False):
+    """
+    将所有分区多边形栅格化为与数据网格对齐的分区ID栅格（按窗口逐块栅格化写出，内存只占一个窗口），并缓存到磁盘
+
+    参数:
+        vector_file: 分区矢量文件（.shp/.gpkg/.geojson），每个要素为一个分区（如子流域）
+        reference_raster: 参考栅格，分区栅格与其网格（坐标系、变换、行列数）完全一致
+        id_field: 可选，用作分区名称的属性字段；为空时使用要素序号
+        cache_dir: 缓存目录，默认与矢量文件同目录
+        all_touched: 是否将与多边形接触的像元全部计入分区
+    返回:
+        (分区栅格路径, 分区名称列表)，分区ID从1开始，0表示不属于任何分区
+    """
+    cache_dir = cache_dir or os.path.dirname(os.path.abspath(vector_file))
+    os.makedirs(cache_dir, exist_ok=True)
+
+    stem = os.path.splitext(os.path.basename(vector_file))[0]
+    cache_key = _zone_cache_key(vector_file, reference_raster, id_field, all_touched)
+    zone_path = os.path.join(cache_dir, f"{stem}_zones_{cache_key}.tif")
+    names_path = zone_path.replace(".tif", ".json")
+
+    # 命中缓存直接返回
+    if os.path.exists(zone_path) and os.path.exists(names_path):
+        with open(names_path, "r", encoding="utf-8") as f:
+            return zone_path, json.load(f)["zones"]
+
+    with rasterio.open(reference_raster) as ref:
+        meta = ref.meta.copy()
+        out_shape = ref.shape
+        transform = ref.transform
+        dst_crs = ref.crs
+
+    # 读取全部分区，必要时将几何转换到栅格坐标系
+    shapes = []
+    names = []
+    with fiona.open(vector_file, "r") as src:
+        src_crs = src.crs
+        for i, feature in enumerate(src, 1):
+            geom = feature["geometry"]
+            if geom is None:
+                continue
+            if src_crs and dst_crs and src_crs != dst_crs:
+                geom = transform_geom(src_crs, dst_crs, geom)
+            shapes.append((geom, len(shapes) + 1))
+            names.append(str(feature["properties"][id_field]) if id_field else str(i))
+
+    if not shapes:
+        raise ValueError(f"矢量文件中没有有效的分区要素: {vector_file}")
+
+    dtype = "uint16" if len(shapes) < np.iinfo(np.uint16).max else "uint32"
+    shape_bounds = np.array([geometry_bounds(geom) for geom, _ in shapes])
+
+    # 逐窗口栅格化：只传入外包框与窗口相交的分区（保持原顺序，重叠处结果与整图栅格化一致）
+    meta = write_profile(meta, "class-uint8-fast", count=1, dtype=dtype, nodata=0)
+    with rasterio.open(zone_path, "w", **meta) as dst:
+        for window in _iter_windows(out_shape[0], out_shape[1], ZONE_WINDOW_SIZE):
+            left, bottom, right, top = window_bounds(window, transform)
+            hit = np.nonzero((shape_bounds[:, 0] <= right) & (shape_bounds[:, 2] >= left) &
+                             (shape_bounds[:, 1] <= top) & (shape_bounds[:, 3] >= bottom))[0]
+            if not hit.size:
+                continue  # 稀疏写出：全0块不落盘
+            zones = rasterize(
+                [shapes[i] for i in hit],
+                out_shape=(int(window.height), int(window.width)),
+                transform=window_transform(window, transform),
+                fill=0,
+                all_touched=all_touched,
+                dtype=dtype
+            )
+            dst.write(zones, 1, window=window)
+
+    with open(names_path, "w", encoding="utf-8") as f:
+        json.dump({"vector_file": os.path.abspath(vector_file), "zones": names}, f, ensure_ascii=False)
+
+    print(f"分区栅格已生成: {zone_path}（共 {len(names)} 个分区）")
+    return zone_path, names
+
+
+def _iter_windows(height, width, block_size):
+    """按固定大小生成覆盖全图的读取窗口"""
+    for row in range(0, height, block_size):
+        for col in range(0, width, block_size):
+            yield Window(col, row, min(block_size, width - col), min(block_size, height - row))
+
+
+def zonal_class_counts(data_path, zone_path, n_zones, n_classes=256, block_size=1024):
+    """
+    单次遍历数据栅格，统计每个分区内各类别的像元数
+
+    每个窗口只做一次 bincount(zone * K + class)，不需要按多边形裁剪。
+
+    参数:
+        data_path: 分类栅格路径（整数类别值）
+        zone_path: build_zone_raster 生成的分区栅格
+        n_zones: 分区个数
+        n_classes: 类别上限K，类别值需位于 [0, K)，默认256覆盖uint8
+        block_size: 读取窗口大小
+    返回:
+        (counts, areas_km2)，形状均为 (n_zones + 1, K)，第0行为分区外像元；
+        地理坐标系下像元面积随纬度变化，面积按行累加
+    """
+    counts = np.zeros((n_zones + 1) * n_classes, dtype=np.int64)
+    areas = np.zeros(counts.size, dtype=np.float64)
+
+    with rasterio.open(data_path) as src, rasterio.open(zone_path) as zsrc:
+        if src.shape != zsrc.shape or src.transform != zsrc.transform or src.crs != zsrc.crs:
+            raise ValueError(f"数据栅格与分区栅格网格不一致: {os.path.basename(data_path)}")
+
+        nodata = src.nodata
+        row_areas = row_pixel_areas(src)  # 单位: km²
+        uniform = np.all(row_areas == row_areas[0])
+
+        for window in _iter_windows(src.height, src.width, block_size):
+            data = src.read(1, window=window)
+            zone = zsrc.read(1, window=window)
+
+            valid = (zone > 0) & (data >= 0) & (data < n_classes)
+            if nodata is not None:
+                valid &= data != nodata
+
+            index = zone[valid].astype(np.int64) * n_classes + data[valid].astype(np.int64)
+            counts += np.bincount(index, minlength=counts.size)
+            if not uniform:
+                rows = np.nonzero(valid)[0] + window.row_off
+                areas += np.bincount(index, weights=row_areas[rows], minlength=areas.size)
+
+    counts = counts.reshape(n_zones + 1, n_classes)
+    if uniform:
+        return counts, counts * row_areas[0]
+    return counts, areas.reshape(n_zones + 1, n_classes)
+
+
+def _counts_to_table(counts, areas, zone_names, label):
+    """将计数与面积矩阵转换为长表，只保留非零记录"""
+    zone_idx, class_idx = np.nonzero(counts[1:])
+    pixels = counts[1:][zone_idx, class_idx]
+    return pd.DataFrame({
+        "label": label,
+        "zone_id": zone_idx + 1,
+        "zone": [zone_names[i] for i in zone_idx],
+        "class": class_idx,
+        "pixels": pixels,
+        "area_km2": areas[1:][zone_idx, class_idx]
+    })
+
+
+def _zonal_task(args):
+    data_path, zone_path, zone_names, n_classes, block_size, label = args
+    counts, areas = zonal_class_counts(data_path, zone_path, len(zone_names), n_classes, block_size)
+    print(f"已统计: {os.path.basename(data_path)}")
+    return _counts_to_table(counts, areas, zone_names, label)
+
+
+@traced("statistics.zonal_area")
+def zonal_area_table(raster_paths, vector_file, id_field=None, labels=None, n_classes=256,
+                     cache_dir=None, all_touched=False, block_size=1024, num_workers=4):
+    """
+    计算多期分类栅格在所有分区内的各类别面积
+
+    分区栅格只生成一次（并缓存），每期数据只读一遍，可扩展到上千个分区和40年以上的时间序列。
+
+    参数:
+        raster_paths: 分类栅格路径列表（各期网格需一致）
+        vector_file: 分区矢量文件
+        id_field: 分区名称字段
+        labels: 每期数据的标签（如年份），默认使用文件名
+        n_classes: 类别上限K
+        cache_dir: 分区栅格缓存目录
+        all_touched: 栅格化时是否计入接触像元
+        block_size: 读取窗口大小
+        num_workers: 并行进程数
+    返回:
+        DataFrame，列为 label, zone_id, zone, class, pixels, area_km2
+    """
+    if not raster_paths:
+        raise ValueError("没有需要统计的栅格文件")
+
+    labels = labels or [os.path.splitext(os.path.basename(p))[0] for p in raster_paths]
+    zone_path, zone_names = build_zone_raster(
+        vector_file, raster_paths[0], id_field=id_field, cache_dir=cache_dir, all_touched=all_touched
+    )
+
+    task_args = [
+        (path, zone_path, zone_names, n_classes, block_size, label)
+        for path, label in zip(raster_paths, labels)
+    ]
+
+    if num_workers > 1 and len(task_args) > 1:
+        with Pool(processes=min(num_workers, len(task_args))) as pool:
+            tables = pool.map(_zonal_task, task_args)
+    else:
+        tables = [_zonal_task(args) for args in task_args]
+
+    return pd.concat(tables, ignore_index=True)
+
+
+if __name__ == "__main__":
+    # 设置路径
+    input_directory = r"E:\GEOdata\LUCC\1980-2023_1kmCNLUCC\CNLUCC_clipped"
+    zone_shapefile = r"E:\GEOdata\长江源\子流域\cjy_subbasins.shp"
+    output_csv = r"E:\GEOdata\LUCC\1980-2023_1kmCNLUCC\Grassland_Analysis\zonal_class_area.csv"
+
+    # 每个年份子文件夹取一个TIF
+    raster_files, years = [], []
+    for year_dir in sorted(os.listdir(input_directory)):
+        year_path = os.path.join(input_directory, year_dir)
+        tifs = [f for f in os.listdir(year_path) if f.endswith(".tif")] if os.path.isdir(year_path) else []
+        if tifs:
+            raster_files.append(os.path.join(year_path, tifs[0]))
+            years.append(year_dir)
+
+    table = zonal_area_table(raster_files, zone_shapefile, labels=years, num_workers=6)
+    os.makedirs(os.path.dirname(output_csv), exist_ok=True)
+    table.to_csv(output_csv, index=False, encoding="utf-8-sig")
+    print(f"分区面积统计已保存至: {output_csv}")